@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""
+Benchmarks for forms and formsets on bundled ``testapp`` with SQLite.
+
+Measure wall time and number of queries for ``ClassifierFormSet``
+construction, validation and save with different number of forms and labels,
+and ``ClassifierFormMixin`` clean throughput for every ``value_type``.
+
+Results are printed as JSON (or written to file with ``--output``)::
+
+    python benchmarks/run.py --output bench.json
+    python benchmarks/run.py --forms 10 100 --labels 10 --repeat 3
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter(object):
+    """
+    Count executed queries without limit of ``connection.queries`` log.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(func, repeat):
+    """
+    :return: best wall time of ``repeat`` runs and number of queries in it
+    """
+    from django.db import connection
+
+    best = None
+    queries = None
+    for i in range(repeat):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.time()
+            func()
+            elapsed = time.time() - started
+
+        if best is None or elapsed < best:
+            best = elapsed
+            queries = counter.count
+
+    return best, queries
+
+
+def rollback(func):
+    """
+    Run ``func`` in transaction which is rolled back after it.
+    """
+    from django.db import transaction
+
+    def wrapper():
+        try:
+            with transaction.atomic():
+                func()
+                raise Rollback()
+        except Rollback:
+            pass
+
+    return wrapper
+
+
+def create_schema(labels_count, kind_size=10):
+    """
+    Create classifiers with ``kind_size`` labels each, first label of each
+    classifier is required.
+    """
+    from testapp.models import ContactClassifier, ContactClassifierLabel
+
+    ContactClassifier.objects.all().delete()
+
+    labels = []
+    for i in range(0, labels_count, kind_size):
+        classifier = ContactClassifier.objects.create(
+            kind='kind{}'.format(i),
+            value_type=ContactClassifier.TYPES.STRING,
+            value_validator=r'^\w+$'
+        )
+        for j in range(min(kind_size, labels_count - i)):
+            labels.append(ContactClassifierLabel.objects.create(
+                classifier=classifier,
+                label='Label {}'.format(i + j),
+                required=j == 0
+            ))
+
+    return labels
+
+
+def get_formset_data(user, labels, forms_count):
+    data = {
+        'form-TOTAL_FORMS': forms_count,
+        'form-INITIAL_FORMS': 0,
+        'form-MIN_NUM_FORMS': 0,
+        'form-MAX_NUM_FORMS': forms_count,
+    }
+    # required labels go first to make formset valid where it is possible
+    labels = sorted(labels, key=lambda label: not label.required)
+    for i in range(forms_count):
+        data.update({
+            'form-{}-user'.format(i): user.pk,
+            'form-{}-kind'.format(i): labels[i % len(labels)].pk,
+            'form-{}-value'.format(i): 'value{}'.format(i),
+        })
+
+    return data
+
+
+def bench_formsets(forms_counts, labels_counts, repeat):
+    from django.contrib.auth import get_user_model
+    from django.forms import modelformset_factory
+
+    from classifier.formsets import ClassifierFormSet
+    from classifier.registry import registry
+    from testapp.forms import ContactForm
+    from testapp.models import Contact, ContactClassifierLabel
+
+    ContactFormSet = modelformset_factory(
+        Contact,
+        formset=ClassifierFormSet,
+        form=ContactForm,
+        max_num=max(forms_counts)
+    )
+    user, _ = get_user_model().objects.get_or_create(username='benchmark')
+
+    results = []
+    for labels_count in labels_counts:
+        labels = create_schema(labels_count)
+        registry.get_schema(ContactClassifierLabel)
+
+        for forms_count in forms_counts:
+            data = get_formset_data(user, labels, forms_count)
+
+            def construct():
+                ContactFormSet(data, queryset=user.contacts.all()).forms
+
+            def validate():
+                ContactFormSet(data, queryset=user.contacts.all()).is_valid()
+
+            @rollback
+            def save():
+                formset = ContactFormSet(data, queryset=user.contacts.all())
+                formset.is_valid()
+                formset.save()
+
+            for name, func in [
+                ('formset.construct', construct),
+                ('formset.validate', validate),
+                ('formset.save', save),
+            ]:
+                seconds, queries = measure(func, repeat)
+                results.append({
+                    'benchmark': name,
+                    'forms': forms_count,
+                    'labels': labels_count,
+                    'seconds': seconds,
+                    'forms_per_second': forms_count / seconds if seconds else None,
+                    'queries': queries,
+                })
+
+    return results
+
+
+def bench_form_clean(iterations, repeat):
+    from django.contrib.auth import get_user_model
+
+    from classifier.registry import registry
+    from testapp.forms import ContactForm
+    from testapp.models import ContactClassifier, ContactClassifierLabel
+
+    values = {
+        ContactClassifier.TYPES.INT: '12345',
+        ContactClassifier.TYPES.FLOAT: '123.45',
+        ContactClassifier.TYPES.STRING: '+380501234567',
+        ContactClassifier.TYPES.BOOLEAN: 'yes',
+        ContactClassifier.TYPES.DATE: '2016-08-29',
+        ContactClassifier.TYPES.DATETIME: '2016-08-29 10:13:29',
+    }
+
+    ContactClassifier.objects.all().delete()
+    user, _ = get_user_model().objects.get_or_create(username='benchmark')
+
+    results = []
+    for value_type, _ in ContactClassifier.TYPES.ALL:
+        classifier = ContactClassifier.objects.create(
+            kind=value_type,
+            value_type=value_type,
+            value_validator=r'^.+$'
+        )
+        label = ContactClassifierLabel.objects.create(
+            classifier=classifier,
+            label=value_type
+        )
+        registry.get_schema(ContactClassifierLabel)
+        data = {'user': user.pk, 'kind': label.pk, 'value': values[value_type]}
+
+        def clean():
+            for i in range(iterations):
+                ContactForm(data).is_valid()
+
+        seconds, queries = measure(clean, repeat)
+        results.append({
+            'benchmark': 'form.clean',
+            'value_type': value_type,
+            'iterations': iterations,
+            'seconds': seconds,
+            'forms_per_second': iterations / seconds if seconds else None,
+            'queries_per_form': queries / float(iterations),
+        })
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--forms', type=int, nargs='+', default=[10, 100, 1000],
+        help='numbers of forms in formset'
+    )
+    parser.add_argument(
+        '--labels', type=int, nargs='+', default=[10, 100, 1000],
+        help='numbers of labels in classifier schema'
+    )
+    parser.add_argument(
+        '--clean-iterations', type=int, default=1000,
+        help='number of forms to clean for each value type'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=3,
+        help='number of runs for each measurement, best one is reported'
+    )
+    parser.add_argument('--output', help='file to write JSON results to')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testapp.settings')
+
+    import django
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment, teardown_test_environment
+    )
+
+    django.setup()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+
+    try:
+        results = bench_formsets(args.forms, args.labels, args.repeat)
+        results += bench_form_clean(args.clean_iterations, args.repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    report = json.dumps({
+        'meta': {
+            'created': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }, indent=2, sort_keys=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,3 @@
 VERSION = (0, 2, 2, 1)
+
+default_app_config = 'classifier.apps.ClassifierConfig'
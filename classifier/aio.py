@@ -0,0 +1,116 @@
+"""
+Awaitable validation for async views (Python 3.5+).
+
+Django versions supported by this package don't have async ORM, so all
+database work of validation is done in one call in thread: schema is taken
+from :py:data:`~classifier.registry.registry`, labels are evaluated once per
+formset and other checks of classifier values don't touch database at all.
+"""
+import asyncio
+import functools
+
+from django.db import close_old_connections
+
+from .formsets import ClassifierFormSet
+from .forms import ClassifierFormMixin
+
+
+def close_connections(func):
+    """
+    Wrap ``func`` to close obsolete database connections of thread before
+    and after call, like Django does it for requests, so connections opened
+    in threads of executor respect ``CONN_MAX_AGE`` and don't leak.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return wrapper
+
+
+def run_sync(func, *args, **kwargs):
+    """
+    Run blocking ``func`` in thread without blocking event loop.
+
+    :py:func:`asgiref.sync.sync_to_async` is used when installed to keep
+    database connection of request thread, otherwise default executor of
+    event loop. Connections of executor threads are closed with
+    :py:func:`close_connections`.
+    """
+    func = functools.partial(func, *args, **kwargs)
+    try:
+        from asgiref.sync import sync_to_async
+    except ImportError:
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(None, close_connections(func))
+
+    try:
+        sync_func = sync_to_async(func, thread_sensitive=True)
+    except TypeError:
+        # asgiref without thread_sensitive runs func in thread pool
+        sync_func = sync_to_async(close_connections(func))
+
+    return sync_func()
+
+
+class AsyncClassifierFormMixin(ClassifierFormMixin):
+    """
+    :py:class:`~classifier.forms.ClassifierFormMixin` with awaitable
+    validation.
+    """
+
+    async def aclean(self):
+        """
+        Awaitable ``full_clean``.
+
+        :return: errors of form
+        """
+        return await run_sync(lambda: self.errors)
+
+    async def ais_valid(self):
+        """
+        Awaitable ``is_valid``.
+        """
+        return await run_sync(self.is_valid)
+
+
+class AsyncClassifierFormSet(ClassifierFormSet):
+    """
+    :py:class:`~classifier.formsets.ClassifierFormSet` with awaitable
+    construction and validation::
+
+        formset = await ContactFormSet.acreate(request.POST, queryset=qs)
+        if await formset.ais_valid():
+            ...
+    """
+
+    @classmethod
+    async def acreate(cls, *args, **kwargs):
+        """
+        Awaitable constructor, formset and its forms are created with all
+        needed data in one thread call.
+        """
+        def create():
+            formset = cls(*args, **kwargs)
+            formset.forms
+            return formset
+
+        return await run_sync(create)
+
+    async def aclean(self):
+        """
+        Awaitable ``full_clean`` made in one thread call.
+
+        :return: errors of forms
+        """
+        return await run_sync(lambda: self.errors)
+
+    async def ais_valid(self):
+        """
+        Awaitable ``is_valid`` made in one thread call.
+        """
+        return await run_sync(self.is_valid)
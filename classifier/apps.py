@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.core.signals import request_started
+
+
+class ClassifierConfig(AppConfig):
+    name = 'classifier'
+    verbose_name = 'Classifier'
+
+    def ready(self):
+        from .materialization import get_wide_tables
+        from .registry import connect_signals, registry
+
+        connect_signals()
+        request_started.connect(
+            registry.check_version,
+            dispatch_uid='classifier_check_schema_version'
+        )
+        get_wide_tables()
@@ -8,3 +8,11 @@ class ClassifierLabelModelNotFound(Exception):
 
 class NoValueFieldNameSpecified(Exception):
     pass
+
+
+class ValueTypeNotFound(Exception):
+    pass
+
+
+class NormalizerNotFound(Exception):
+    pass
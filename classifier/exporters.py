@@ -0,0 +1,158 @@
+"""
+Streaming export of values connected to classifier labels.
+
+Values are read with one query through server side iterator with label and
+classifier joined in, so memory usage doesn't depend on size of table::
+
+    from classifier.exporters import ValueExporter, write_jsonl
+
+    with open('contacts.jsonl', 'w') as f:
+        write_jsonl(ValueExporter(Contact.objects.all()).rows(), f)
+
+Rows have same format as rows of
+:py:class:`~classifier.importers.ValueImporter`: primary key and not
+editable fields, like typed columns, are left out, so exported file can be
+imported back.
+"""
+import csv
+import json
+from collections import OrderedDict
+
+import six
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils.encoding import force_text
+
+from .managers import get_classifier_label_related_field
+
+
+def write_csv(rows, f):
+    """
+    Write ``rows`` to CSV file with header taken from first row.
+
+    :return: number of written rows
+    """
+    writer = None
+    count = 0
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(f, fieldnames=list(row))
+            writer.writeheader()
+        if six.PY2:
+            row = dict(
+                (key, force_text(value).encode('utf-8'))
+                for key, value in row.items()
+            )
+        writer.writerow(row)
+        count += 1
+
+    return count
+
+
+def write_jsonl(rows, f):
+    """
+    Write ``rows`` to file as JSON objects, one per line.
+
+    :return: number of written rows
+    """
+    count = 0
+    for row in rows:
+        f.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+        count += 1
+
+    return count
+
+
+class ValueExporter(object):
+    """
+    Export values of model with relation to model inherited from
+    :py:class:`~classifier.models.ClassifierLabelAbstract`.
+    """
+
+    CLASSIFIER_VALUE_FIELD = 'value'
+    """Name of field for value used in relation with classifier"""
+
+    def __init__(self, queryset, label_attr='label', chunk_size=2000):
+        """
+        :param queryset: queryset or model of values to export
+        :param label_attr: attribute of label written instead of its key
+        :param chunk_size: number of rows fetched from database at once
+        """
+        if not isinstance(queryset, models.QuerySet):
+            queryset = queryset._default_manager.all()
+
+        self.queryset = queryset
+        self.label_attr = label_attr
+        self.chunk_size = chunk_size
+        self.label_field = get_classifier_label_related_field(queryset.model)
+        self.classifier_field = (
+            self.label_field.related_model.get_classifier_related_field()
+        )
+        self.fields = [
+            field for field in queryset.model._meta.concrete_fields
+            if field.editable and not field.primary_key
+        ]
+        self._converters = {}
+
+    def iterator(self):
+        """
+        :return: iterator over values with label and classifier
+        """
+        queryset = self.queryset.select_related('{}__{}'.format(
+            self.label_field.name,
+            self.classifier_field.name
+        ))
+
+        try:
+            return queryset.iterator(chunk_size=self.chunk_size)
+        except TypeError:
+            # Django < 2.0 fetches rows by chunks of fixed size
+            return queryset.iterator()
+
+    def get_converter(self, classifier):
+        """
+        :return: converter of value for ``classifier``, cached by its primary
+          key and ``value_type``
+        """
+        key = (classifier.pk, classifier.value_type)
+        try:
+            return self._converters[key]
+        except KeyError:
+            converter = classifier.get_converter(classifier.value_type)
+            self._converters[key] = converter
+
+            return converter
+
+    def to_python(self, obj):
+        """
+        :return: value of ``obj`` converted to ``value_type`` of classifier,
+          raw value if it can't be converted
+        """
+        value = getattr(obj, self.CLASSIFIER_VALUE_FIELD)
+        if not value:
+            return value
+
+        label = getattr(obj, self.label_field.name)
+        classifier = getattr(label, self.classifier_field.name)
+        try:
+            return self.get_converter(classifier)(value)
+        except ValueError:
+            return value
+
+    def rows(self):
+        """
+        :return: iterator of dicts with values of editable model fields,
+          value converted to ``value_type`` and ``label_attr`` of label
+        """
+        for obj in self.iterator():
+            row = OrderedDict()
+            for field in self.fields:
+                if field is self.label_field:
+                    value = getattr(getattr(obj, field.name), self.label_attr)
+                elif field.name == self.CLASSIFIER_VALUE_FIELD:
+                    value = self.to_python(obj)
+                else:
+                    value = getattr(obj, field.attname)
+                row[field.name] = value
+
+            yield row
@@ -1,10 +1,85 @@
-import re
+import six
 from django import forms
+from django.forms.models import ModelChoiceIterator
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 
 from .exceptions import ClassifierLabelModelNotFound, NoValueFieldNameSpecified
+from .instrumentation import stage
 from .models import ClassifierLabelAbstract
+from .registry import registry
+
+
+class ClassifierLabelChoiceIterator(ModelChoiceIterator):
+    """
+    Iterate over labels evaluated beforehand instead of queryset.
+    """
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.labels:
+            yield self.choice(obj)
+
+    def __len__(self):
+        return (
+            len(self.field.labels)
+            + (1 if self.field.empty_label is not None else 0)
+        )
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.labels)
+
+    __nonzero__ = __bool__
+
+
+class ClassifierLabelChoiceField(forms.ModelChoiceField):
+    """
+    Field for relation to label with choices evaluated beforehand, so several
+    fields can share one list of labels without extra queries for rendering
+    and cleaning.
+    """
+
+    iterator = ClassifierLabelChoiceIterator
+
+    @classmethod
+    def from_field(cls, field, labels):
+        """
+        :param field: :py:class:`~django.forms.ModelChoiceField` to take
+          settings from
+        :param labels: evaluated labels from ``field.queryset``
+        :return: new field with same settings as ``field``
+        """
+        shared_field = cls.__new__(cls)
+        shared_field.__dict__.update(field.__dict__)
+        shared_field.labels = labels
+
+        return shared_field
+
+    def _get_labels(self):
+        return self._labels
+
+    def _set_labels(self, labels):
+        self._labels = labels
+        self._labels_by_key = dict(
+            (six.text_type(self.prepare_value(obj)), obj) for obj in labels
+        )
+        self.widget.choices = self.choices
+
+    labels = property(_get_labels, _set_labels)
+    """evaluated labels used as choices"""
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+
+        try:
+            return self._labels_by_key[six.text_type(self.prepare_value(value))]
+        except KeyError:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice'
+            )
 
 
 class ClassifierFormMixin(object):
@@ -24,6 +99,31 @@ class ClassifierFormMixin(object):
         super(ClassifierFormMixin, self).__init__(*args, **kwargs)
         self.setup_value_validators()
 
+    def _post_clean(self):
+        # label cleaned by ClassifierLabelChoiceField is already found among
+        # its choices, so model validation shouldn't query it again
+        self._exclude_shared_labels = True
+        try:
+            super(ClassifierFormMixin, self)._post_clean()
+        finally:
+            self._exclude_shared_labels = False
+
+    def validate_unique(self):
+        # unique checks, including checks of formset, keep labels
+        self._exclude_shared_labels = False
+        super(ClassifierFormMixin, self).validate_unique()
+
+    def _get_validation_exclusions(self):
+        exclude = super(ClassifierFormMixin, self)._get_validation_exclusions()
+        if getattr(self, '_exclude_shared_labels', False):
+            exclude = list(exclude) + [
+                name for name, field in self.fields.items()
+                if isinstance(field, ClassifierLabelChoiceField)
+                and name not in exclude
+            ]
+
+        return exclude
+
     @cached_property
     def classifier_label_model(self):
         """
@@ -83,25 +183,48 @@ class ClassifierFormMixin(object):
         :py:meth:`~ClassifierFormMixin.setup_value_validators`
         in :py:meth:`~ClassifierFormMixin.__init__`
         """
-        classifier_label = self.cleaned_data[self.classifier_label_fieldname]
-        classifier = classifier_label.get_classifier_instance()
+        with stage('form.validate_value_field'):
+            return self._validate_value_field()
+
+    def _validate_value_field(self):
+        classifier_label = self.cleaned_data.get(self.classifier_label_fieldname)
         value = self.cleaned_data[self.CLASSIFIER_VALUE_FIELD]
+        if classifier_label is None:
+            # label field has own error
+            return value
+
+        classifier = (
+            registry
+            .get_schema(self.classifier_label_model)
+            .get_classifier(classifier_label)
+        ) or classifier_label.get_classifier_instance()
+
+        with stage('form.regex'):
+            regex = classifier.get_value_validator_regex()
+            wrong_format = value and regex and not regex.match(value)
 
-        if (
-            value
-            and classifier.value_validator
-            and not re.match(classifier.value_validator, value)
-        ):
+        if wrong_format:
             raise forms.ValidationError(
                 self.error_messages['wrong_value_format']
             )
 
         if value:
             try:
-                value = classifier.to_python(value)
+                with stage('form.to_python'):
+                    typed_value = classifier.to_python(value)
             except ValueError:
                 raise forms.ValidationError(
                     self.error_messages['wrong_type']
                 )
 
+            try:
+                with stage('form.normalize'):
+                    classifier.normalize(value)
+            except ValueError:
+                raise forms.ValidationError(
+                    self.error_messages['wrong_value_format']
+                )
+
+            value = typed_value
+
         return value
@@ -1,21 +1,38 @@
 import six
-from django import VERSION as DJANGO_VERSION
+from django import forms
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from django.db import transaction
 from django.forms.models import BaseModelFormSet
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 
 from .exceptions import ClassifierLabelModelNotFound
-from .models import ClassifierLabelAbstract
+from .forms import ClassifierLabelChoiceField
+from .instrumentation import stage
+from .models import (
+    ClassifierLabelAbstract, ClassifierValueAbstract, get_related_field
+)
+from .registry import registry
 
 
 class ClassifierFormSet(BaseModelFormSet):
 
+    bulk_save = False
+    """
+    Save objects with ``bulk_create``, ``bulk_update`` and one delete query
+    in one transaction instead of query per form.
+
+    .. caution::
+        ``save()`` of models isn't called and signals aren't sent, primary keys
+        of new objects are set only on databases which return them from
+        ``bulk_create`` (like PostgreSQL)
+    """
+
     def __init__(self, *args, **kwargs):
         super(ClassifierFormSet, self).__init__(*args, **kwargs)
 
-        self.add_required_to_extra()
+        with stage('formset.add_required_to_extra'):
+            self.add_required_to_extra()
 
     def add_required_to_extra(self):
         """
@@ -39,56 +56,148 @@ class ClassifierFormSet(BaseModelFormSet):
             return initial
 
         initial_extra = []
-        ClassifierLabelModel = self.classifier_label_model
-        ClassifierModel = ClassifierLabelModel.get_classifier_model()
+        schema = self.classifier_schema
 
-        exists_items = self.get_queryset().values_list(
-            self.classifier_label_related_fieldname,
-            flat=True
+        # queryset is evaluated once and reused by formset for initial forms
+        label_attname = self.model._meta.get_field(
+            self.classifier_label_related_fieldname
+        ).attname
+        exists_items = set(
+            getattr(obj, label_attname) for obj in self.get_queryset()
         )
 
-        required_labels = (
-            ClassifierLabelModel.objects
-            .filter(required=True)
-            .exclude(pk__in=exists_items)
-        )
+        required_labels = [
+            label for label in schema.required_labels
+            if label.pk not in exists_items
+        ]
         for i, label in enumerate(required_labels):
             initial_extra.append(get_form_initial(label, i))
 
-        required_classifiers = ClassifierModel.objects.filter(
-            only_one_required=True
-        )
+        for i, labels in enumerate(schema.only_one_required.values()):
+            if not any(label.pk in exists_items for label in labels):
+                initial_extra.append(get_form_initial(labels[0], i))
 
-        # Django 1.9+
-        # https://docs.djangoproject.com/en/1.9/releases/1.9/#field-rel-changes
-        if DJANGO_VERSION[0] == 1 and DJANGO_VERSION[1] < 9:
-            related_name = (
-                ClassifierLabelModel
-                .get_classifier_related_field()
-                .rel.get_accessor_name()
+        if initial_extra:
+            self.initial_extra = initial_extra
+        elif isinstance(self.initial_extra, dict):
+            self.initial_extra = [self.initial_extra]
+
+        self.extra = max(self.extra, len(initial_extra))
+
+    def add_fields(self, form, index):
+        """
+        Replace field for relation to label in each form with
+        :py:class:`~classifier.forms.ClassifierLabelChoiceField` that use
+        labels shared between all forms of formset.
+        """
+        super(ClassifierFormSet, self).add_fields(form, index)
+
+        fieldname = self.classifier_label_related_fieldname
+        field = form.fields.get(fieldname)
+        if type(field) is forms.ModelChoiceField:
+            form.fields[fieldname] = ClassifierLabelChoiceField.from_field(
+                field,
+                self.get_classifier_labels(field.queryset)
             )
-        else:
+
+    def get_classifier_labels(self, queryset):
+        """
+        Evaluate labels for relation field of forms once per formset.
+
+        :param queryset: queryset of label field of first form
+        :return: labels with attached classifiers
+        """
+        if not hasattr(self, '_classifier_labels'):
             related_name = (
-                ClassifierLabelModel
+                self.classifier_label_model
                 .get_classifier_related_field()
-                .remote_field.get_accessor_name()
+                .name
+            )
+            self._classifier_labels = tuple(
+                queryset.select_related(related_name)
             )
 
-        for i, classifier in enumerate(required_classifiers):
-            labels = getattr(classifier, related_name)
-            if not labels.filter(pk__in=exists_items).exists():
-                initial_extra.append(get_form_initial(labels.first(), i))
+        return self._classifier_labels
 
-        if initial_extra:
-            self.initial_extra = initial_extra
-        elif isinstance(self.initial_extra, dict):
-            self.initial_extra = [self.initial_extra]
+    def save(self, commit=True):
+        """
+        Save forms, with bulk queries when
+        :py:attr:`~ClassifierFormSet.bulk_save` is enabled.
+        """
+        if not (commit and self.bulk_save):
+            return super(ClassifierFormSet, self).save(commit)
 
-        self.extra = max(self.extra, len(initial_extra))
+        with stage('formset.bulk_save'):
+            return self.bulk_save_objects()
+
+    def bulk_save_objects(self):
+        """
+        :return: new and changed objects
+        """
+        manager = self.model._default_manager
+        with transaction.atomic(using=manager.db):
+            objects = super(ClassifierFormSet, self).save(commit=False)
+            for obj in objects:
+                if isinstance(obj, ClassifierValueAbstract):
+                    obj.fill_typed_values()
+                    obj.fill_canonical_value()
+                    obj.fill_validated_version()
+
+            if self.new_objects:
+                manager.bulk_create(self.new_objects)
+
+            if self.changed_objects:
+                self.bulk_update_objects(
+                    [obj for obj, changed_data in self.changed_objects],
+                    self.get_changed_fields()
+                )
+
+            pks = [obj.pk for obj in self.deleted_objects if obj.pk is not None]
+            if pks:
+                manager.filter(pk__in=pks).delete()
+
+            self.save_m2m()
+
+        return objects
+
+    def get_changed_fields(self):
+        """
+        :return: names of concrete model fields changed in any form
+        """
+        concrete_fields = dict(
+            (field.name, field) for field in self.model._meta.concrete_fields
+            if not field.primary_key
+        )
+        fields = set()
+        for obj, changed_data in self.changed_objects:
+            fields.update(
+                name for name in changed_data if name in concrete_fields
+            )
+        if fields and issubclass(self.model, ClassifierValueAbstract):
+            fields.update(self.model.TYPED_VALUE_FIELDS.values())
+            fields.add('value_canonical')
+            fields.add('validated_version')
+
+        return sorted(fields)
+
+    def bulk_update_objects(self, objs, fields):
+        if not fields:
+            return
+
+        manager = self.model._default_manager
+        # Django 2.2+
+        if hasattr(manager, 'bulk_update'):
+            manager.bulk_update(objs, fields)
+        else:
+            for obj in objs:
+                manager.filter(pk=obj.pk).update(**dict(
+                    (name, getattr(obj, name)) for name in fields
+                ))
 
     def clean(self):
         super(ClassifierFormSet, self).clean()
-        self.validate_required()
+        with stage('formset.validate_required'):
+            self.validate_required()
 
     def validate_required(self):
         """
@@ -97,45 +206,25 @@ class ClassifierFormSet(BaseModelFormSet):
         :raises django.core.exceptions.ValidationError: if one or mode records
           are absent
         """
-        ClassifierLabelModel = self.classifier_label_model
-        label_related = ClassifierLabelModel.get_classifier_related_field().name
+        schema = self.classifier_schema
 
-        qs = ClassifierLabelModel.objects.filter(
-            Q(required=True)
-            | Q(**{'{}__only_one_required'.format(ClassifierLabelModel.get_classifier_related_field().name): True})
-        )
+        submitted = set()
         for form in self.forms:
             kind = form.cleaned_data.get(
                 self.classifier_label_related_fieldname
             )
-            if kind and kind.required:
-                qs = qs.exclude(pk=kind.pk)
-            elif kind and kind.get_classifier_instance().only_one_required:
-                labels_ids = (
-                    ClassifierLabelModel.objects
-                    .filter(**{
-                        label_related: kind.get_classifier_instance(),
-                    })
-                    .values_list('pk', flat=True)
-                )
-                qs = qs.exclude(pk__in=labels_ids)
-
-        if qs.count() > 0:
-            fields = set()
-            for label in qs:
-                if label.required:
-                    fields.add(six.text_type(label))
-                elif label.get_classifier_instance().only_one_required:
-                    labels = '/'.join(
-                        map(
-                            six.text_type,
-                            ClassifierLabelModel.objects.filter(**{
-                                label_related: label.get_classifier_instance(),
-                            })
-                        )
-                    )
-                    fields.add(labels)
+            if kind:
+                submitted.add(kind.pk)
+
+        fields = [
+            six.text_type(label) for label in schema.required_labels
+            if label.pk not in submitted
+        ]
+        for labels in schema.only_one_required.values():
+            if not any(label.pk in submitted for label in labels):
+                fields.append('/'.join(map(six.text_type, labels)))
 
+        if fields:
             msg = _('This data required: {}').format(', '.join(fields))
             raise ValidationError(msg)
 
@@ -145,14 +234,11 @@ class ClassifierFormSet(BaseModelFormSet):
         Return name of field related to model inherited from
         :py:class:`~classifier.models.ClassifierLabelAbstract`.
         """
-        for field in self.model._meta.fields:
-            if (
-                field.related_model
-                and issubclass(field.related_model, ClassifierLabelAbstract)
-            ):
-                return field.name
+        field = get_related_field(self.model, ClassifierLabelAbstract)
+        if field is None:
+            raise ClassifierLabelModelNotFound()
 
-        raise ClassifierLabelModelNotFound()
+        return field.name
 
     @cached_property
     def classifier_label_model(self):
@@ -164,11 +250,16 @@ class ClassifierFormSet(BaseModelFormSet):
         :return: model inherited from :py:class:`~classifier.models.ClassifierLabelAbstract`
         :raises ClassifierLabelModelNotFound: field can not be found
         """
-        for field in self.model._meta.fields:
-            if (
-                field.related_model
-                and issubclass(field.related_model, ClassifierLabelAbstract)
-            ):
-                return field.related_model
+        field = get_related_field(self.model, ClassifierLabelAbstract)
+        if field is None:
+            raise ClassifierLabelModelNotFound()
+
+        return field.related_model
 
-        raise ClassifierLabelModelNotFound()
+    @cached_property
+    def classifier_schema(self):
+        """
+        :return: :py:class:`~classifier.registry.ClassifierSchema` for
+          :py:attr:`~ClassifierFormSet.classifier_label_model`
+        """
+        return registry.get_schema(self.classifier_label_model)
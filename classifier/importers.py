@@ -0,0 +1,339 @@
+"""
+Streaming import of values connected to classifier labels.
+
+Rows are read one by one, validated same way as
+:py:class:`~classifier.forms.ClassifierFormMixin` does it and written with
+``bulk_create`` in chunks, so memory usage doesn't depend on size of source
+and there are no queries per row::
+
+    from classifier.importers import ValueImporter, read_csv, CsvErrorWriter
+
+    with open('contacts.csv') as source, open('errors.csv', 'w') as errors:
+        importer = ValueImporter(Contact, errors=CsvErrorWriter(errors))
+        result = importer.run(read_csv(source))
+"""
+import csv
+import json
+from collections import namedtuple
+
+import six
+from django.core.exceptions import ValidationError
+from django.utils.encoding import force_text
+from django.utils.translation import ugettext_lazy as _
+
+from .instrumentation import stage
+from .managers import get_classifier_label_related_field
+from .models import ClassifierValueAbstract
+from .registry import registry
+from .validators import check_value
+
+ImportResult = namedtuple('ImportResult', ['imported', 'rejected'])
+"""number of imported and rejected rows"""
+
+
+def read_csv(f):
+    """
+    :param f: file with header in first line
+    :return: iterator of rows as dicts
+    """
+    for row in csv.DictReader(f):
+        if six.PY2:
+            row = dict(
+                (force_text(key), force_text(value))
+                for key, value in row.items()
+            )
+        yield row
+
+
+def read_jsonl(f):
+    """
+    :param f: file with one JSON object per line
+    :return: iterator of rows as dicts, lines which are not valid JSON are
+      returned as is to be rejected by importer
+    """
+    for line in f:
+        line = force_text(line).strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line
+
+
+class CsvErrorWriter(object):
+    """
+    Write rejected rows to CSV file with extra ``error`` column.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.writer = None
+
+    def __call__(self, row, error):
+        if not isinstance(row, dict):
+            row = {'row': row}
+        row = dict(row, error=error)
+        if self.writer is None:
+            self.writer = csv.DictWriter(
+                self.f,
+                fieldnames=list(row),
+                extrasaction='ignore'
+            )
+            self.writer.writeheader()
+        if six.PY2:
+            row = dict(
+                (key, force_text(value).encode('utf-8'))
+                for key, value in row.items()
+            )
+        self.writer.writerow(row)
+
+
+class JsonErrorWriter(object):
+    """
+    Write rejected rows to file as JSON objects with extra ``error`` key, one
+    per line.
+    """
+
+    def __init__(self, f):
+        self.f = f
+
+    def __call__(self, row, error):
+        if not isinstance(row, dict):
+            row = {'row': row}
+        self.f.write(json.dumps(dict(row, error=error), default=force_text))
+        self.f.write('\n')
+
+
+class ValueImporter(object):
+    """
+    Import rows to ``model`` with relation to model inherited from
+    :py:class:`~classifier.models.ClassifierLabelAbstract`.
+
+    Keys of row are names of model fields, primary key and not editable
+    fields, like typed columns filled from value, are ignored. Value of
+    relation to label is
+    resolved by ``label_attr`` of label through map loaded once from
+    :py:data:`~classifier.registry.registry`, other relations take primary
+    keys and are checked with one query per chunk.
+    """
+
+    CLASSIFIER_VALUE_FIELD = 'value'
+    """Name of field for value used in relation with classifier"""
+
+    error_messages = {
+        'wrong_type': _('Wrong type of value'),
+        'wrong_value_format': _('Wrong value format'),
+        'invalid_row': _('Row should be an object'),
+        'unknown_field': _('Unknown field "{}"'),
+        'required': _('Field "{}" is required'),
+        'invalid': _('Field "{}": {}'),
+        'unknown_label': _('Unknown label "{}"'),
+        'ambiguous_label': _('Several labels found for "{}"'),
+        'not_found': _('Field "{}": object with key "{}" not found'),
+    }
+
+    def __init__(self, model, label_attr='label', chunk_size=1000,
+                 errors=None):
+        """
+        :param model: model to import values to
+        :param label_attr: attribute of label used to find label for row
+        :param chunk_size: number of objects created by one query
+        :param errors: callable with ``row`` and ``error`` arguments to
+          collect rejected rows
+        """
+        self.model = model
+        self.chunk_size = chunk_size
+        self.errors = errors
+        self.label_field = get_classifier_label_related_field(model)
+        self.schema = registry.get_schema(self.label_field.related_model)
+        self.labels = self.get_labels_map(label_attr)
+        self.fields = {}
+        self.ignored_fields = set()
+        for field in model._meta.concrete_fields:
+            if field.editable and not field.primary_key:
+                self.fields[field.name] = field
+            else:
+                self.ignored_fields.add(field.name)
+        self.required_fields = [
+            field.name for field in model._meta.concrete_fields
+            if field.name in self.fields
+            and not (field.null or field.has_default())
+        ]
+
+    def get_labels_map(self, label_attr):
+        """
+        :return: mapping of ``label_attr`` value to label, ``None`` for values
+          shared by several labels
+        """
+        labels = {}
+        for label in self.schema.labels:
+            key = six.text_type(getattr(label, label_attr))
+            labels[key] = None if key in labels else label
+
+        return labels
+
+    def run(self, rows):
+        """
+        :param rows: iterable of dicts
+        :return: :py:class:`ImportResult`
+        """
+        imported = rejected = 0
+        chunk = []
+        for row in rows:
+            obj, error = self.build(row)
+            if error is not None:
+                rejected += 1
+                self.reject(row, error)
+                continue
+
+            chunk.append((row, obj))
+            if len(chunk) >= self.chunk_size:
+                created = self.create(chunk)
+                imported += created
+                rejected += len(chunk) - created
+                chunk = []
+
+        if chunk:
+            created = self.create(chunk)
+            imported += created
+            rejected += len(chunk) - created
+
+        return ImportResult(imported, rejected)
+
+    def reject(self, row, error):
+        if self.errors is not None:
+            self.errors(row, force_text(error))
+
+    def build(self, row):
+        """
+        :return: tuple of not saved object and ``None`` or ``None`` and error
+        """
+        if not isinstance(row, dict):
+            return None, self.error_messages['invalid_row']
+
+        values = {}
+        for name, raw_value in row.items():
+            if name in self.ignored_fields:
+                continue
+            field = self.fields.get(name)
+            if field is None:
+                return None, self.error_messages['unknown_field'].format(name)
+            if raw_value in (None, '') and name in self.required_fields:
+                return None, self.error_messages['required'].format(name)
+            if name == self.label_field.name:
+                continue
+            if raw_value == '' and not field.empty_strings_allowed:
+                raw_value = None
+
+            try:
+                if field.is_relation:
+                    value = field.target_field.to_python(raw_value)
+                else:
+                    value = field.to_python(raw_value)
+            except ValidationError as e:
+                return None, self.error_messages['invalid'].format(
+                    name,
+                    ' '.join(e.messages)
+                )
+            values[field.attname] = value
+
+        for name in self.required_fields:
+            if name not in row:
+                return None, self.error_messages['required'].format(name)
+
+        label_key = six.text_type(row[self.label_field.name])
+        label = self.labels.get(label_key)
+        if label is None:
+            if label_key in self.labels:
+                return None, self.error_messages['ambiguous_label'].format(
+                    label_key
+                )
+            return None, self.error_messages['unknown_label'].format(label_key)
+
+        error = self.validate_value(
+            label,
+            values.get(self.CLASSIFIER_VALUE_FIELD)
+        )
+        if error is not None:
+            return None, error
+
+        obj = self.model(**values)
+        setattr(obj, self.label_field.name, label)
+
+        return obj, None
+
+    def validate_value(self, label, value):
+        """
+        :return: error or ``None`` if ``value`` is valid for classifier of
+          ``label``
+        """
+        classifier = (
+            self.schema.get_classifier(label)
+            or label.get_classifier_instance()
+        )
+        error = check_value(classifier, value)
+        if error is not None:
+            return self.error_messages[error]
+
+        return None
+
+    def create(self, chunk):
+        """
+        Save objects of ``chunk`` whose relations exist.
+
+        :return: number of created objects
+        """
+        with stage('importer.create'):
+            chunk = self.check_relations(chunk)
+            objs = []
+            for row, obj in chunk:
+                if isinstance(obj, ClassifierValueAbstract):
+                    # value was validated in build()
+                    classifier = obj.get_classifier_instance()
+                    obj.fill_typed_values(classifier)
+                    obj.fill_canonical_value(classifier)
+                    obj.fill_validated_version(classifier)
+                objs.append(obj)
+
+            self.model._default_manager.bulk_create(objs)
+
+        return len(objs)
+
+    def check_relations(self, chunk):
+        """
+        :return: rows of ``chunk`` with existing related objects, other rows
+          are rejected
+        """
+        for field in self.fields.values():
+            if not field.is_relation or field is self.label_field:
+                continue
+
+            keys = set(
+                getattr(obj, field.attname) for row, obj in chunk
+            ) - set([None])
+            if not keys:
+                continue
+
+            target_field = field.target_field
+            existing = set(
+                field.related_model._default_manager
+                .filter(**{'{}__in'.format(target_field.name): keys})
+                .values_list(target_field.name, flat=True)
+            )
+            valid = []
+            for row, obj in chunk:
+                key = getattr(obj, field.attname)
+                if key is None or key in existing:
+                    valid.append((row, obj))
+                else:
+                    self.reject(
+                        row,
+                        self.error_messages['not_found'].format(
+                            field.name,
+                            key
+                        )
+                    )
+            chunk = valid
+
+        return chunk
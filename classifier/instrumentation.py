@@ -0,0 +1,149 @@
+import threading
+from collections import namedtuple
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.utils.module_loading import import_string
+
+StageRecord = namedtuple('StageRecord', ['stage', 'duration', 'queries'])
+"""one measurement of stage: name, wall time in seconds and number of queries"""
+
+_UNSET = object()
+_collector = _UNSET
+
+
+class MemoryCollector(object):
+    """
+    Collector which keeps all measurements in memory, useful for tests::
+
+        collector = MemoryCollector()
+        set_collector(collector)
+        formset.is_valid()
+        collector.summary()['formset.validate_required']
+    """
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def __call__(self, stage, duration, queries):
+        with self._lock:
+            self.records.append(StageRecord(stage, duration, queries))
+
+    def summary(self):
+        """
+        :return: mapping of stage name to dict with total ``calls``,
+          ``duration`` and ``queries``
+        """
+        summary = {}
+        for record in self.records:
+            totals = summary.setdefault(
+                record.stage,
+                {'calls': 0, 'duration': 0., 'queries': 0}
+            )
+            totals['calls'] += 1
+            totals['duration'] += record.duration
+            totals['queries'] += record.queries
+
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self.records = []
+
+
+class Stage(object):
+    """
+    Context manager to measure wall time and number of queries of stage and
+    pass them to collector.
+    """
+
+    def __init__(self, name, collector):
+        self.name = name
+        self.collector = collector
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        # Django 2.0+
+        if hasattr(connection, 'execute_wrapper'):
+            self._wrapper = connection.execute_wrapper(self)
+            self._wrapper.__enter__()
+        else:
+            self._wrapper = None
+        self.started = default_timer()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = default_timer() - self.started
+        if self._wrapper is not None:
+            self._wrapper.__exit__(exc_type, exc_value, traceback)
+
+        self.collector(self.name, duration, self.queries)
+
+
+class NullStage(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+NULL_STAGE = NullStage()
+
+
+def get_collector():
+    """
+    :return: collector set by :py:func:`set_collector` or configured with
+      ``CLASSIFIER_INSTRUMENTATION_COLLECTOR`` setting (dotted path to
+      callable), ``None`` if instrumentation is disabled
+    """
+    global _collector
+
+    if _collector is _UNSET:
+        path = getattr(settings, 'CLASSIFIER_INSTRUMENTATION_COLLECTOR', None)
+        _collector = import_string(path) if path else None
+
+    return _collector
+
+
+def set_collector(collector):
+    """
+    :param collector: callable with ``stage``, ``duration`` and ``queries``
+      arguments or ``None`` to disable instrumentation
+    """
+    global _collector
+
+    _collector = collector
+
+
+def stage(name):
+    """
+    :return: context manager to measure stage with ``name``, does nothing if
+      instrumentation is disabled
+    """
+    collector = _collector
+    if collector is _UNSET:
+        collector = get_collector()
+    if collector is None:
+        return NULL_STAGE
+
+    return Stage(name, collector)
+
+
+def reset_collector(setting, **kwargs):
+    global _collector
+
+    if setting == 'CLASSIFIER_INSTRUMENTATION_COLLECTOR':
+        _collector = _UNSET
+
+
+setting_changed.connect(reset_collector)
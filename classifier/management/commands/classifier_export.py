@@ -0,0 +1,78 @@
+import io
+import os
+
+import six
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from classifier.exceptions import ClassifierLabelModelNotFound
+from classifier.exporters import ValueExporter, write_csv, write_jsonl
+
+FORMATS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Export values connected to classifier labels to CSV or JSON lines '
+        'file with values converted to type of classifier.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='model in app_label.ModelName format')
+        parser.add_argument(
+            '--output', help='file to write to, stdout by default'
+        )
+        parser.add_argument(
+            '--format', choices=sorted(FORMATS),
+            help='format of file, detected by extension of output by default'
+        )
+        parser.add_argument(
+            '--label-attr', default='label',
+            help='attribute of label written instead of its key'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='number of rows fetched from database at once'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+
+        file_format = options['format']
+        if not file_format and options['output']:
+            file_format = (
+                os.path.splitext(options['output'])[1].lstrip('.').lower()
+            )
+        file_format = file_format or 'jsonl'
+        if file_format not in FORMATS:
+            raise CommandError(
+                'Unknown format "{}", use --format option'.format(file_format)
+            )
+
+        try:
+            exporter = ValueExporter(
+                model,
+                label_attr=options['label_attr'],
+                chunk_size=options['chunk_size']
+            )
+        except ClassifierLabelModelNotFound as e:
+            raise CommandError(e)
+
+        if not options['output']:
+            FORMATS[file_format](exporter.rows(), self.stdout)
+            return
+
+        if six.PY2:
+            f = open(options['output'], 'wb')
+        else:
+            f = io.open(options['output'], 'w', encoding='utf-8', newline='')
+        with f:
+            count = FORMATS[file_format](exporter.rows(), f)
+
+        self.stderr.write('Exported: {}'.format(count))
@@ -0,0 +1,95 @@
+import io
+import os
+
+import six
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from classifier.exceptions import ClassifierLabelModelNotFound
+from classifier.importers import (
+    CsvErrorWriter, JsonErrorWriter, ValueImporter, read_csv, read_jsonl
+)
+
+FORMATS = {
+    'csv': (read_csv, CsvErrorWriter),
+    'jsonl': (read_jsonl, JsonErrorWriter),
+}
+
+
+def open_file(path, mode):
+    if six.PY2:
+        return open(path, mode + 'b')
+
+    return io.open(path, mode, encoding='utf-8', newline='')
+
+
+class Command(BaseCommand):
+    help = (
+        'Import values connected to classifier labels from CSV or JSON lines '
+        'file, rejected rows are written to errors file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='model in app_label.ModelName format')
+        parser.add_argument('path', help='file to import')
+        parser.add_argument(
+            '--format', choices=sorted(FORMATS),
+            help='format of file, detected by extension by default'
+        )
+        parser.add_argument(
+            '--errors', help='file to write rejected rows to'
+        )
+        parser.add_argument(
+            '--label-attr', default='label',
+            help='attribute of label used to find label of row'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='number of objects created by one query'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+
+        file_format = (
+            options['format']
+            or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        )
+        if file_format not in FORMATS:
+            raise CommandError(
+                'Unknown format "{}", use --format option'.format(file_format)
+            )
+        reader, error_writer = FORMATS[file_format]
+
+        errors_file = None
+        errors = None
+        if options['errors']:
+            errors_file = open_file(options['errors'], 'w')
+            errors = error_writer(errors_file)
+
+        try:
+            try:
+                importer = ValueImporter(
+                    model,
+                    label_attr=options['label_attr'],
+                    chunk_size=options['chunk_size'],
+                    errors=errors
+                )
+            except ClassifierLabelModelNotFound as e:
+                raise CommandError(e)
+
+            with open_file(options['path'], 'r') as f:
+                result = importer.run(reader(f))
+        finally:
+            if errors_file is not None:
+                errors_file.close()
+
+        self.stdout.write(
+            'Imported: {}, rejected: {}'.format(
+                result.imported,
+                result.rejected
+            )
+        )
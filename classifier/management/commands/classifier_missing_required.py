@@ -0,0 +1,84 @@
+import csv
+import io
+
+import six
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from classifier.exceptions import ClassifierLabelModelNotFound
+from classifier.reports import MissingRequiredReport
+
+
+class Command(BaseCommand):
+    help = (
+        'Report owners of values which miss required labels or all labels '
+        'of only_one_required classifiers as CSV.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'model', help='model of owners in app_label.ModelName format'
+        )
+        parser.add_argument(
+            'related_name', help='name of reverse relation to value model'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='number of owners fetched by one query'
+        )
+        parser.add_argument(
+            '--output', help='file to write report to, stdout by default'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+
+        try:
+            report = MissingRequiredReport(
+                model,
+                options['related_name'],
+                chunk_size=options['chunk_size']
+            )
+        except (
+            FieldDoesNotExist,
+            ClassifierLabelModelNotFound,
+            ImproperlyConfigured,
+        ) as e:
+            raise CommandError(e)
+
+        f = self.stdout
+        if options['output']:
+            if six.PY2:
+                f = open(options['output'], 'wb')
+            else:
+                f = io.open(
+                    options['output'],
+                    'w',
+                    encoding='utf-8',
+                    newline=''
+                )
+
+        try:
+            writer = csv.writer(f)
+            writer.writerow(['pk', 'missing'])
+            count = 0
+            for missing in report:
+                labels = ', '.join(
+                    '/'.join(map(six.text_type, labels))
+                    if isinstance(labels, tuple) else six.text_type(labels)
+                    for labels in missing.labels
+                )
+                writer.writerow([
+                    missing.owner,
+                    labels.encode('utf-8') if six.PY2 else labels
+                ])
+                count += 1
+        finally:
+            if options['output']:
+                f.close()
+
+        self.stderr.write('Owners with missing data: {}'.format(count))
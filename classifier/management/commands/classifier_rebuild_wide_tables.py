@@ -0,0 +1,42 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from classifier.materialization import get_wide_tables
+
+
+class Command(BaseCommand):
+    help = (
+        'Create wide tables configured with CLASSIFIER_WIDE_TABLES setting '
+        'for current classifiers and fill them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*',
+            help='models of values in app_label.ModelName format, all by default'
+        )
+
+    def handle(self, *args, **options):
+        wide_tables = get_wide_tables()
+        if options['models']:
+            try:
+                models = [apps.get_model(label) for label in options['models']]
+            except (LookupError, ValueError) as e:
+                raise CommandError(e)
+        else:
+            models = list(wide_tables)
+
+        for model in models:
+            if model not in wide_tables:
+                raise CommandError(
+                    'Wide table for "{}.{}" is not configured'.format(
+                        model._meta.app_label,
+                        model._meta.object_name
+                    )
+                )
+
+            count = wide_tables[model].rebuild()
+            self.stdout.write('{}: {} rows'.format(
+                wide_tables[model].table_name,
+                count
+            ))
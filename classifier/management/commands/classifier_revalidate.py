@@ -0,0 +1,141 @@
+import csv
+import io
+
+import six
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.encoding import force_text
+
+from classifier.exceptions import ClassifierLabelModelNotFound
+from classifier.revalidation import Revalidator
+
+ACTIONS = ('report', 'flag', 'delete')
+
+
+class Command(BaseCommand):
+    help = (
+        'Validate stored values against current value_validator and '
+        'value_type of classifiers. Invalid values are reported as CSV, '
+        'flagged or deleted.'
+    )
+
+    batch_size = 500
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='model in app_label.ModelName format')
+        parser.add_argument(
+            '--kind', action='append', dest='kinds',
+            help='kind of classifier to check, can be used several times'
+        )
+        parser.add_argument(
+            '--processes', type=int,
+            help='number of worker processes, number of CPUs by default'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=10000,
+            help='size of primary key range validated by one worker call'
+        )
+        parser.add_argument(
+            '--action', choices=ACTIONS, default='report',
+            help='what to do with invalid values'
+        )
+        parser.add_argument(
+            '--flag-field',
+            help='boolean field set to True for invalid values by flag action'
+        )
+        parser.add_argument(
+            '--output', help='file to write report to, stdout by default'
+        )
+        parser.add_argument(
+            '--stale', action='store_true',
+            help=(
+                'check only values validated against older schema version of '
+                'classifier, in one process'
+            )
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='number of stale values checked in one transaction'
+        )
+        parser.add_argument(
+            '--max-batches', type=int,
+            help='stop after this number of batches of stale values'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+
+        action = options['action']
+        flag_field = options['flag_field']
+        if action == 'flag':
+            if not flag_field:
+                raise CommandError('--flag-field is required by flag action')
+            try:
+                model._meta.get_field(flag_field)
+            except FieldDoesNotExist as e:
+                raise CommandError(e)
+
+        try:
+            revalidator = Revalidator(
+                model,
+                kinds=options['kinds'],
+                chunk_size=options['chunk_size']
+            )
+        except ClassifierLabelModelNotFound as e:
+            raise CommandError(e)
+
+        f = self.stdout
+        if options['output']:
+            if six.PY2:
+                f = open(options['output'], 'wb')
+            else:
+                f = io.open(
+                    options['output'],
+                    'w',
+                    encoding='utf-8',
+                    newline=''
+                )
+
+        try:
+            writer = csv.writer(f)
+            writer.writerow(['pk', 'kind', 'value', 'error'])
+            count = 0
+            if options['stale']:
+                results = revalidator.run_stale(
+                    batch_size=options['batch_size'],
+                    max_batches=options['max_batches']
+                )
+            else:
+                results = revalidator.run(options['processes'])
+
+            for invalid_values in results:
+                for invalid_value in invalid_values:
+                    writer.writerow([
+                        force_text(item).encode('utf-8') if six.PY2 else item
+                        for item in invalid_value
+                    ])
+                count += len(invalid_values)
+                self.apply(action, model, invalid_values, flag_field)
+        finally:
+            if options['output']:
+                f.close()
+
+        self.stderr.write('Invalid values: {}'.format(count))
+
+    def apply(self, action, model, invalid_values, flag_field):
+        if action == 'report' or not invalid_values:
+            return
+
+        pks = [invalid_value.pk for invalid_value in invalid_values]
+        for i in range(0, len(pks), self.batch_size):
+            queryset = model._default_manager.filter(
+                pk__in=pks[i:i + self.batch_size]
+            )
+            if action == 'flag':
+                queryset.update(**{flag_field: True})
+            elif action == 'delete':
+                queryset.delete()
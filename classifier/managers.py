@@ -0,0 +1,559 @@
+from collections import OrderedDict
+
+import six
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+
+try:
+    # Django 1.10+
+    from django.db.models.functions import Cast
+except ImportError:
+    Cast = None
+
+try:
+    # Django 1.9+
+    from django.db.models.query import ModelIterable
+except ImportError:
+    ModelIterable = None
+
+try:
+    # Django 1.10+
+    from django.db.models import prefetch_related_objects
+except ImportError:
+    from django.db.models.query import (
+        prefetch_related_objects as _prefetch_related_objects
+    )
+
+    def prefetch_related_objects(model_instances, *related_lookups):
+        _prefetch_related_objects(model_instances, related_lookups)
+
+from .exceptions import ClassifierLabelModelNotFound
+from .models import (
+    ClassifierAbstract, ClassifierLabelAbstract, ClassifierValueAbstract,
+    TypedValueDescriptor, get_related_field
+)
+from .registry import registry
+
+
+class ClassifiedQuerySet(models.QuerySet):
+    """
+    QuerySet for entity models with values connected to classifier, like user
+    with contacts or computer with properties.
+    """
+
+    CLASSIFIER_VALUE_FIELD = 'value'
+    """
+    Name of raw value field in value models not inherited from
+    :py:class:`~classifier.models.ClassifierValueAbstract`
+    """
+
+    CAST_FIELDS = {
+        ClassifierAbstract.TYPES.INT: models.BigIntegerField,
+        ClassifierAbstract.TYPES.FLOAT: models.FloatField,
+        ClassifierAbstract.TYPES.DATE: models.DateField,
+        ClassifierAbstract.TYPES.DATETIME: models.DateTimeField,
+    }
+    """output fields to cast raw value to ``value_type`` in database"""
+
+    TRUE_VALUES_REGEX = r'^(on|yes|true)$'
+    """regex for raw values converted to ``True``"""
+
+    RAW_LOOKUPS = ('isnull', 'regex', 'iregex')
+
+    CANONICAL_LOOKUPS = ('', 'exact', 'in')
+    """
+    lookups done on ``value_canonical`` column of
+    :py:class:`~classifier.models.ClassifierValueAbstract` for kinds with
+    ``value_normalizer``
+    """
+
+    def classified(self, related_name, **lookups):
+        """
+        Filter entities by typed values of classifier kinds in one query::
+
+            Computer.objects.classified('properties', ram__gte=8, cpu='i7')
+
+        Each lookup starts with ``kind`` of classifier and compare value
+        converted to ``value_type`` of classifier. Typed columns of
+        :py:class:`~classifier.models.ClassifierValueAbstract` are used when
+        available, otherwise raw value is casted in database. String values
+        for typed kinds are converted with
+        :py:meth:`~classifier.models.ClassifierAbstract.to_python`.
+
+        Exact and ``in`` lookups for kinds with ``value_normalizer`` compare
+        normalized value with indexed ``value_canonical`` column of
+        :py:class:`~classifier.models.ClassifierValueAbstract`, so
+        ``phone='+38 (050) 123-45-67'`` finds ``+380501234567``.
+
+        :param related_name: name of reverse relation to value model
+        :param lookups: ``<kind>[__<lookup>]=<value>`` pairs
+        :raises ValueError: if kind is unknown or value for typed kind can't
+          be converted or normalized
+        """
+        relation = self.model._meta.get_field(related_name)
+        value_model = relation.related_model
+        owner_field = relation.field
+        label_field = get_classifier_label_related_field(value_model)
+        schema = registry.get_schema(label_field.related_model)
+        classifiers = dict(
+            (classifier.kind, classifier) for classifier in schema.classifiers
+        )
+
+        qs = self
+        for key, value in lookups.items():
+            kind, _, lookup = key.partition('__')
+            classifier = classifiers.get(kind)
+            if classifier is None:
+                raise ValueError('Unknown classifier kind "{}"'.format(kind))
+
+            labels = [
+                label.pk for label in schema.labels
+                if label.get_classifier_instance() is classifier
+            ]
+            values = (
+                value_model._default_manager
+                .filter(**{'{}__in'.format(label_field.name): labels})
+            )
+            if (
+                lookup in self.CANONICAL_LOOKUPS
+                and classifier.value_normalizer
+                and issubclass(value_model, ClassifierValueAbstract)
+            ):
+                column = 'value_canonical'
+                value = self._normalize(classifier, value)
+            else:
+                values, column = self._annotate_typed_value(
+                    values,
+                    classifier
+                )
+                if lookup.split('__')[-1] not in self.RAW_LOOKUPS:
+                    value = self._to_python(classifier, value)
+
+            values = values.filter(**{
+                '{}__{}'.format(column, lookup or 'exact'): value,
+            })
+            qs = qs.filter(**{
+                '{}__in'.format(owner_field.target_field.name):
+                    values.values(owner_field.attname),
+            })
+
+        return qs
+
+    def _annotate_typed_value(self, values, classifier):
+        """
+        :return: queryset of values and name of column with typed value
+        """
+        value_model = values.model
+        if issubclass(value_model, ClassifierValueAbstract):
+            column = value_model.get_typed_value_field(classifier.value_type)
+            return values, column or 'value'
+
+        typed_value, output_field = self.get_typed_value_expression(
+            value_model,
+            classifier.value_type
+        )
+        if isinstance(typed_value, models.F):
+            return values, typed_value.name
+
+        return values.annotate(classified_value=typed_value), 'classified_value'
+
+    @classmethod
+    def get_typed_value_expression(cls, value_model, value_type):
+        """
+        :return: expression of value converted to ``value_type`` in database
+          and its output field, typed columns of
+          :py:class:`~classifier.models.ClassifierValueAbstract` are used
+          when available
+        :raises ImproperlyConfigured: if raw value should be casted on
+          Django < 1.10
+        """
+        value_field = cls.CLASSIFIER_VALUE_FIELD
+        if issubclass(value_model, ClassifierValueAbstract):
+            column = value_model.get_typed_value_field(value_type)
+            if column is not None:
+                return (
+                    models.F(column),
+                    value_model._meta.get_field(column)
+                )
+            value_field = 'value'
+
+        if value_type in cls.CAST_FIELDS:
+            if Cast is None:
+                raise ImproperlyConfigured(
+                    'Casting of raw values requires Django 1.10+'
+                )
+            output_field = cls.CAST_FIELDS[value_type]()
+            return (
+                Cast(value_field, output_field=output_field),
+                output_field
+            )
+        elif value_type == ClassifierAbstract.TYPES.BOOLEAN:
+            output_field = models.BooleanField()
+            return (
+                models.Case(
+                    models.When(
+                        **{
+                            '{}__iregex'.format(value_field):
+                                cls.TRUE_VALUES_REGEX,
+                            'then': models.Value(True),
+                        }
+                    ),
+                    default=models.Value(False),
+                    output_field=output_field
+                ),
+                output_field
+            )
+
+        return models.F(value_field), value_model._meta.get_field(value_field)
+
+    @staticmethod
+    def _normalize(classifier, value):
+        if isinstance(value, (list, tuple, set)):
+            return [classifier.normalize(item) for item in value]
+
+        return classifier.normalize(value)
+
+    @staticmethod
+    def _to_python(classifier, value):
+        if classifier.value_type == ClassifierAbstract.TYPES.STRING:
+            return value
+
+        if isinstance(value, six.string_types):
+            return classifier.to_python(value)
+        elif isinstance(value, (list, tuple, set)):
+            return [
+                classifier.to_python(item)
+                if isinstance(item, six.string_types) else item
+                for item in value
+            ]
+
+        return value
+
+
+ClassifiedManager = models.Manager.from_queryset(ClassifiedQuerySet)
+
+
+if ModelIterable is not None:
+    class TypedValueIterable(ModelIterable):
+        """
+        Attach labels from :py:data:`~classifier.registry.registry` to values
+        and fill their typed values.
+        """
+
+        def __iter__(self):
+            model = self.queryset.model
+            descriptor = getattr(model, self.queryset.TYPED_VALUE_ATTR)
+            label_field = get_classifier_label_related_field(model)
+            schema = registry.get_schema(label_field.related_model)
+
+            for obj in super(TypedValueIterable, self).__iter__():
+                label = schema.get_label(getattr(obj, label_field.attname))
+                if label is None:
+                    classifier = descriptor.get_classifier(obj)
+                else:
+                    setattr(obj, label_field.name, label)
+                    classifier = label.get_classifier_instance()
+                descriptor.fill(obj, classifier)
+
+                yield obj
+else:
+    TypedValueIterable = None
+
+
+class InRange(models.Func):
+    """
+    ``1`` if ``start <= expression < end``, ``NULL`` otherwise. Lookups on
+    expressions aren't supported by ``When`` of all django versions.
+    """
+
+    output_field = models.IntegerField()
+
+    def __init__(self, expression, start, end):
+        super(InRange, self).__init__(expression, start, end)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sqls = []
+        params = []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.append(expression_params)
+
+        return (
+            'CASE WHEN ({0}) >= {1} AND ({0}) < {2} THEN 1 END'.format(*sqls),
+            params[0] + params[1] + params[0] + params[2]
+        )
+
+
+class TypedValueQuerySet(models.QuerySet):
+    """
+    QuerySet for value models, like models inherited from
+    :py:class:`~classifier.models.ClassifierValueAbstract`.
+    """
+
+    TYPED_VALUE_ATTR = 'typed_value'
+    """name of :py:class:`~classifier.models.TypedValueDescriptor`"""
+
+    AVG_TYPES = (ClassifierAbstract.TYPES.INT, ClassifierAbstract.TYPES.FLOAT)
+    """value types with average in :py:meth:`aggregate_classified`"""
+
+    def with_typed_values(self):
+        """
+        Fill typed values of objects while queryset is evaluated, labels and
+        classifiers are taken from :py:data:`~classifier.registry.registry`
+        without extra queries.
+
+        .. note::
+            on Django < 1.9 typed values are converted on first access
+        """
+        clone = self._clone()
+        if TypedValueIterable is not None:
+            clone._iterable_class = TypedValueIterable
+
+        return clone
+
+    def filter_canonical(self, kind, value):
+        """
+        Filter values of ``kind`` equal to ``value`` after normalization with
+        ``value_normalizer`` of classifier, by exact lookup on indexed
+        ``value_canonical`` column::
+
+            ContactValue.objects.filter_canonical('phone', '0038 050 123 4567')
+
+        :raises ValueError: if kind is unknown or value can't be normalized
+        """
+        label_field = get_classifier_label_related_field(self.model)
+        schema = registry.get_schema(label_field.related_model)
+
+        for classifier in schema.classifiers:
+            if classifier.kind == kind:
+                break
+        else:
+            raise ValueError('Unknown classifier kind "{}"'.format(kind))
+
+        label_pks = [
+            label.pk for label in schema.labels
+            if schema.get_classifier(label) is classifier
+        ]
+        if not label_pks:
+            return self.none()
+
+        return self.filter(**{
+            '{}__in'.format(label_field.attname): label_pks,
+            'value_canonical': classifier.normalize(value),
+        })
+
+    def aggregate_classified(self, group_by='kind', kinds=None,
+                             histograms=None):
+        """
+        Calculate aggregates of values converted to ``value_type`` of their
+        classifiers in database, for all kinds in one query::
+
+            ComputerProperty.objects.aggregate_classified(
+                histograms={'ram': [0, 4, 8, 16, 32]}
+            )
+            # {'ram': {'count': 10, 'min': 2, 'max': 16, 'avg': 7.2,
+            #          'histogram': [3, 4, 2, 1]}, ...}
+
+        ``avg`` is calculated for ``int`` and ``float`` kinds only, ``min``
+        and ``max`` aren't calculated for ``bool`` kinds. Typed
+        columns of :py:class:`~classifier.models.ClassifierValueAbstract`
+        are used when available, otherwise raw value is casted, so it should
+        be valid: invalid raw values break query on PostgreSQL and are casted
+        to zero on SQLite.
+
+        :param group_by: ``kind`` or ``label``
+        :param kinds: kinds of classifiers to aggregate, all by default
+        :param histograms: mapping of kind to edges of histogram bins, value
+          is counted in bin if ``edge[i] <= value < edge[i + 1]``
+        :return: mapping of kind, or of kind and label if grouped by label,
+          to dict with ``count``, ``min``, ``max``, ``avg`` and
+          ``histogram`` of values
+        """
+        if group_by not in ('kind', 'label'):
+            raise ValueError('group_by should be "kind" or "label"')
+
+        histograms = histograms or {}
+        label_field = get_classifier_label_related_field(self.model)
+        schema = registry.get_schema(label_field.related_model)
+
+        groups = OrderedDict()
+        for label in schema.labels:
+            classifier = schema.get_classifier(label)
+            if kinds is not None and classifier.kind not in kinds:
+                continue
+
+            key = classifier.kind
+            if group_by == 'label':
+                key = (classifier.kind, label.label)
+            groups.setdefault(key, (classifier, []))[1].append(label.pk)
+
+        aggregates = OrderedDict()
+        for i, (key, (classifier, label_pks)) in enumerate(groups.items()):
+            value_type = classifier.value_type
+            typed_value, output_field = (
+                ClassifiedQuerySet.get_typed_value_expression(
+                    self.model,
+                    value_type
+                )
+            )
+            condition = models.Q(**{
+                '{}__in'.format(label_field.attname): label_pks,
+            })
+            if Cast is not None and isinstance(typed_value, Cast):
+                condition &= ~models.Q(**{
+                    ClassifiedQuerySet.CLASSIFIER_VALUE_FIELD: '',
+                })
+
+            name = 'classified_{}'.format(i)
+            value = models.Case(
+                models.When(condition, then=typed_value),
+                output_field=output_field
+            )
+            aggregates['{}_count'.format(name)] = models.Count(value)
+            # PostgreSQL has no min() and max() for booleans
+            if value_type != ClassifierAbstract.TYPES.BOOLEAN:
+                aggregates['{}_min'.format(name)] = models.Min(value)
+                aggregates['{}_max'.format(name)] = models.Max(value)
+            if value_type in self.AVG_TYPES:
+                aggregates['{}_avg'.format(name)] = models.Avg(
+                    value,
+                    output_field=models.FloatField()
+                )
+
+            edges = ClassifiedQuerySet._to_python(
+                classifier,
+                histograms.get(classifier.kind, [])
+            )
+            for j, (start, end) in enumerate(zip(edges, edges[1:])):
+                aggregates['{}_bin_{}'.format(name, j)] = models.Count(
+                    InRange(
+                        value,
+                        models.Value(start, output_field=output_field),
+                        models.Value(end, output_field=output_field)
+                    )
+                )
+
+        result = OrderedDict()
+        if not groups:
+            return result
+
+        row = self.aggregate(**aggregates)
+        for i, (key, (classifier, label_pks)) in enumerate(groups.items()):
+            name = 'classified_{}'.format(i)
+            edges = histograms.get(classifier.kind, [])
+            aggregated = {
+                'count': row['{}_count'.format(name)],
+                'min': row.get('{}_min'.format(name)),
+                'max': row.get('{}_max'.format(name)),
+                'avg': row.get('{}_avg'.format(name)),
+                'histogram': [
+                    row['{}_bin_{}'.format(name, j)]
+                    for j in range(len(edges) - 1)
+                ],
+            }
+            if group_by == 'label':
+                result.setdefault(key[0], OrderedDict())[key[1]] = aggregated
+            else:
+                result[key] = aggregated
+
+        return result
+
+
+ClassifierValueManager = models.Manager.from_queryset(TypedValueQuerySet)
+
+
+def prefetch_classified(entities, related_name, to_attr='classified',
+                        value_field='value'):
+    """
+    Load values of ``entities`` with one query and attach mapping of
+    classifier kind to mapping of label to typed value to each entity::
+
+        users = prefetch_classified(User.objects.all()[:500], 'contacts')
+        users[0].classified  # {'phone': {'Mobile': '+380...'}, 'age': ...}
+
+    Labels and classifiers are taken from
+    :py:data:`~classifier.registry.registry` and attached to values, so
+    ``user.contacts.all()`` and ``contact.kind.get_classifier_instance()``
+    don't hit database. When entity has several values with same label, value
+    with greatest primary key is in mapping. Values which can't be converted
+    are kept raw.
+
+    :param entities: queryset or list of entities
+    :param related_name: name of reverse relation to value model
+    :param to_attr: attribute of entity to store mapping to
+    :param value_field: name of raw value field in value model
+    :return: list of entities
+    """
+    entities = list(entities)
+    if not entities:
+        return entities
+
+    relation = entities[0]._meta.get_field(related_name)
+    value_model = relation.related_model
+    label_field = get_classifier_label_related_field(value_model)
+    schema = registry.get_schema(label_field.related_model)
+
+    prefetch_related_objects(
+        entities,
+        models.Prefetch(
+            related_name,
+            queryset=value_model._default_manager.order_by('pk')
+        )
+    )
+
+    descriptor = get_typed_value_descriptor(value_model, value_field)
+
+    for entity in entities:
+        classified = OrderedDict()
+        for obj in getattr(entity, related_name).all():
+            label = schema.get_label(getattr(obj, label_field.attname))
+            if label is None:
+                # label was created after schema was loaded
+                label = getattr(obj, label_field.name)
+            else:
+                setattr(obj, label_field.name, label)
+
+            classifier = label.get_classifier_instance()
+            value = descriptor.fill(obj, classifier)
+
+            labels = classified.setdefault(classifier.kind, OrderedDict())
+            labels[label.label] = value
+
+        setattr(entity, to_attr, classified)
+
+    return entities
+
+
+def get_classifier_label_related_field(model):
+    """
+    :return: field of ``model`` related to model inherited from
+      :py:class:`~classifier.models.ClassifierLabelAbstract`
+    :raises ClassifierLabelModelNotFound: if related field wasn't found
+    """
+    field = get_related_field(model, ClassifierLabelAbstract)
+    if field is not None:
+        return field
+
+    raise ClassifierLabelModelNotFound(
+        '"{}" doesn\'t have relation to model inherited from "{}"'.format(
+            model.__name__,
+            ClassifierLabelAbstract.__name__
+        )
+    )
+
+
+def get_typed_value_descriptor(model, value_field='value'):
+    """
+    :return: :py:class:`~classifier.models.TypedValueDescriptor` of ``model``
+      for ``value_field``, new one if model doesn't have it
+    """
+    for klass in model.__mro__:
+        for candidate in vars(klass).values():
+            if (
+                isinstance(candidate, TypedValueDescriptor)
+                and candidate.value_field == value_field
+            ):
+                return candidate
+
+    return TypedValueDescriptor(value_field)
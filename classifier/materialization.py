@@ -0,0 +1,457 @@
+"""
+Denormalized "wide" tables with one typed column per classifier kind (or per
+label) and one row per entity, for reporting queries without joins::
+
+    CLASSIFIER_WIDE_TABLES = {
+        'shop.ProductAttribute': {},
+        'accounts.Contact': {'per_label': True, 'table_name': 'contacts_wide'},
+    }
+
+Rows are refreshed on save and delete of values, structure of table is
+created by ``classifier_rebuild_wide_tables`` command and should be rebuilt
+after classifiers or labels were added or removed. Values written with
+``bulk_create`` or ``update`` don't send signals, rebuild table after them
+too.
+"""
+import itertools
+import re
+import threading
+from collections import OrderedDict
+
+from django.apps import apps
+from django.apps.registry import Apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import connections, models, transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .instrumentation import stage
+from .managers import get_classifier_label_related_field
+from .models import ClassifierAbstract
+from .registry import registry
+
+COLUMN_FIELDS = {
+    ClassifierAbstract.TYPES.INT: models.BigIntegerField,
+    ClassifierAbstract.TYPES.FLOAT: models.FloatField,
+    ClassifierAbstract.TYPES.BOOLEAN: models.NullBooleanField,
+    ClassifierAbstract.TYPES.DATE: models.DateField,
+    ClassifierAbstract.TYPES.DATETIME: models.DateTimeField,
+}
+"""model fields of columns for value types, other types are stored as text"""
+
+
+class WideTable(object):
+    """
+    Wide table for values of ``model`` with primary key column ``owner``
+    which keeps primary key of entity.
+
+    When entity has several values of one kind, value with greatest primary
+    key is used.
+    """
+
+    CLASSIFIER_VALUE_FIELD = 'value'
+    """Name of field for value used in relation with classifier"""
+
+    OWNER_COLUMN = 'owner'
+
+    def __init__(self, model, per_label=False, table_name=None,
+                 owner_field=None, chunk_size=1000):
+        """
+        :param model: model of values
+        :param per_label: create column per label instead of kind
+        :param table_name: name of table, ``<table of model>_wide`` by default
+        :param owner_field: name of relation to entity, required if model
+          has several relations besides relation to label
+        :param chunk_size: number of rows inserted by one query on rebuild
+        """
+        self.model = model
+        self.per_label = per_label
+        self.table_name = table_name or '{}_wide'.format(model._meta.db_table)
+        self.chunk_size = chunk_size
+        self.label_field = get_classifier_label_related_field(model)
+        self.owner_field = self.get_owner_field(owner_field)
+        self._table_columns = None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        return self.model._default_manager.db
+
+    def get_owner_field(self, name):
+        if name is not None:
+            return self.model._meta.get_field(name)
+
+        fields = [
+            field for field in self.model._meta.concrete_fields
+            if field.is_relation and field is not self.label_field
+        ]
+        if len(fields) != 1:
+            raise ImproperlyConfigured(
+                'Set owner_field for wide table of "{}"'.format(
+                    self.model.__name__
+                )
+            )
+
+        return fields[0]
+
+    def get_columns(self):
+        """
+        :return: mapping of column name to ``(value_type, label primary
+          keys)`` for current classifier schema
+        """
+        schema = registry.get_schema(self.label_field.related_model)
+        columns = OrderedDict()
+        names = {}
+        taken = set([self.OWNER_COLUMN])
+        for label in schema.labels:
+            classifier = schema.get_classifier(label)
+            key = label.pk if self.per_label else classifier.pk
+            if key not in names:
+                parts = [classifier.kind]
+                if self.per_label:
+                    parts.append(label.label)
+                name = get_column_name(*parts)
+                if name in taken:
+                    name = '{}_{}'.format(name, key)
+                taken.add(name)
+                names[key] = name
+                columns[name] = (classifier.value_type, [])
+            columns[names[key]][1].append(label.pk)
+
+        return columns
+
+    def get_table_columns(self):
+        """
+        Table is introspected once per snapshot of classifier schema in
+        :py:data:`~classifier.registry.registry`, :py:meth:`rebuild`
+        invalidates schema, so processes sharing schema version through cache
+        introspect rebuilt table again.
+
+        :return: names of columns in existing table or ``None`` if table
+          doesn't exist
+        """
+        schema = registry.get_schema(self.label_field.related_model)
+        table_columns = self._table_columns
+        if table_columns is None or table_columns[0] is not schema:
+            connection = connections[self.db]
+            with connection.cursor() as cursor:
+                if self.table_name in (
+                    connection.introspection.table_names(cursor)
+                ):
+                    columns = frozenset(
+                        column.name for column in (
+                            connection.introspection.get_table_description(
+                                cursor,
+                                self.table_name
+                            )
+                        )
+                    )
+                else:
+                    columns = None
+            table_columns = (schema, columns)
+            self._table_columns = table_columns
+
+        return table_columns[1]
+
+    def get_model(self, columns=None):
+        """
+        :param columns: mapping returned by :py:meth:`get_columns`, columns
+          missing in existing table are skipped if not passed
+        :return: unmanaged model for table, ``None`` if table doesn't exist
+        """
+        if columns is None:
+            table_columns = self.get_table_columns()
+            if table_columns is None:
+                return None
+
+            columns = OrderedDict(
+                (name, column) for name, column in self.get_columns().items()
+                if name in table_columns
+            )
+
+        key = tuple((name, column[0]) for name, column in columns.items())
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = self.create_model(columns)
+
+            return self._models[key]
+
+    def create_model(self, columns):
+        owner_target = self.owner_field.target_field
+        # Django 1.10+
+        big_auto_field = getattr(models, 'BigAutoField', None)
+        if big_auto_field and isinstance(owner_target, big_auto_field):
+            owner = models.BigIntegerField(primary_key=True)
+        elif isinstance(owner_target, models.AutoField):
+            owner = models.IntegerField(primary_key=True)
+        else:
+            owner = owner_target.__class__(primary_key=True)
+
+        attrs = OrderedDict([
+            ('__module__', __name__),
+            ('Meta', type(str('Meta'), (object,), {
+                # isolated registry to keep global one untouched
+                'apps': Apps(),
+                'app_label': self.model._meta.app_label,
+                'db_table': self.table_name,
+                'managed': False,
+            })),
+            (self.OWNER_COLUMN, owner),
+        ])
+        for name, (value_type, label_pks) in columns.items():
+            field_class = COLUMN_FIELDS.get(value_type, models.TextField)
+            if field_class is models.NullBooleanField:
+                attrs[name] = field_class()
+            else:
+                attrs[name] = field_class(null=True)
+
+        return type(
+            str('{}Wide'.format(self.model.__name__)),
+            (models.Model,),
+            attrs
+        )
+
+    def get_value_columns(self, columns):
+        """
+        :return: mapping of label primary key to column name and classifier
+        """
+        schema = registry.get_schema(self.label_field.related_model)
+        value_columns = {}
+        for name, (value_type, label_pks) in columns.items():
+            for label_pk in label_pks:
+                value_columns[label_pk] = (
+                    name,
+                    schema.get_classifier(schema.get_label(label_pk))
+                )
+
+        return value_columns
+
+    def build_row(self, values, value_columns):
+        """
+        :param values: ``(label primary key, raw value)`` pairs ordered by
+          primary key of value
+        :return: mapping of column name to typed value
+        """
+        row = {}
+        for label_pk, value in values:
+            if label_pk not in value_columns:
+                continue
+
+            name, classifier = value_columns[label_pk]
+            try:
+                value = classifier.to_python(value) if value else None
+            except ValueError:
+                value = None
+
+            if (
+                classifier.value_type == ClassifierAbstract.TYPES.DATETIME
+                and settings.USE_TZ
+                and value is not None
+                and timezone.is_naive(value)
+            ):
+                value = timezone.make_aware(value)
+            row[name] = value
+
+        return row
+
+    def rebuild(self):
+        """
+        Drop and create table for current classifier schema and fill it.
+
+        :return: number of rows
+        """
+        columns = self.get_columns()
+        model = self.get_model(columns)
+        connection = connections[self.db]
+
+        self.drop()
+        with connection.schema_editor() as editor:
+            editor.create_model(model)
+
+        value_columns = self.get_value_columns(columns)
+        owner_attname = self.owner_field.attname
+        values = (
+            self.model._default_manager
+            .filter(**{'{}__isnull'.format(owner_attname): False})
+            .order_by(owner_attname, 'pk')
+            .values_list(
+                owner_attname,
+                self.label_field.attname,
+                self.CLASSIFIER_VALUE_FIELD
+            )
+        )
+
+        count = 0
+        with transaction.atomic(using=self.db):
+            rows = []
+            for owner, owner_values in itertools.groupby(
+                values.iterator(),
+                key=lambda value: value[0]
+            ):
+                row = self.build_row(
+                    ((label_pk, value) for _, label_pk, value in owner_values),
+                    value_columns
+                )
+                row[self.OWNER_COLUMN] = owner
+                rows.append(model(**row))
+                if len(rows) >= self.chunk_size:
+                    model.objects.using(self.db).bulk_create(rows)
+                    count += len(rows)
+                    rows = []
+
+            model.objects.using(self.db).bulk_create(rows)
+            count += len(rows)
+
+        self._table_columns = None
+        # other processes should introspect new table
+        registry.invalidate(self.label_field.related_model, using=self.db)
+
+        return count
+
+    def drop(self):
+        """
+        Drop table if it exists.
+        """
+        model = self.get_model()
+        if model is not None:
+            with connections[self.db].schema_editor() as editor:
+                editor.delete_model(model)
+        self._table_columns = None
+
+    def refresh(self, owner):
+        """
+        Update row of entity with primary key ``owner``, columns missing in
+        existing table are left untouched.
+        """
+        with stage('wide_table.refresh'):
+            model = self.get_model()
+            if model is None or owner is None:
+                return
+
+            columns = OrderedDict(
+                (field.name, None) for field in model._meta.concrete_fields
+                if field.name != self.OWNER_COLUMN
+            )
+            values = list(
+                self.model._default_manager
+                .filter(**{self.owner_field.attname: owner})
+                .order_by('pk')
+                .values_list(
+                    self.label_field.attname,
+                    self.CLASSIFIER_VALUE_FIELD
+                )
+            )
+
+            queryset = model.objects.using(self.db).filter(pk=owner)
+            if not values:
+                queryset.delete()
+                return
+
+            value_columns = self.get_value_columns(self.get_columns())
+            columns.update(
+                (name, value)
+                for name, value in self.build_row(values, value_columns).items()
+                if name in columns
+            )
+            with transaction.atomic(using=self.db):
+                if not queryset.update(**columns):
+                    model.objects.using(self.db).create(
+                        **dict(columns, **{self.OWNER_COLUMN: owner})
+                    )
+
+
+def get_column_name(*parts):
+    name = '_'.join(
+        re.sub(r'\W+', '_', slugify(part)).strip('_') for part in parts
+    ).strip('_').lower()
+
+    return name or 'column'
+
+
+_wide_tables = None
+
+
+def get_wide_tables():
+    """
+    :return: mapping of value model to :py:class:`WideTable` configured with
+      ``CLASSIFIER_WIDE_TABLES`` setting
+    """
+    global _wide_tables
+
+    if _wide_tables is None:
+        wide_tables = {}
+        config = getattr(settings, 'CLASSIFIER_WIDE_TABLES', None) or {}
+        for model_label, options in config.items():
+            model = apps.get_model(model_label)
+            wide_tables[model] = WideTable(model, **options)
+            post_init.connect(
+                remember_wide_table_owner,
+                sender=model,
+                dispatch_uid='classifier_remember_wide_table_owner'
+            )
+            post_save.connect(
+                refresh_wide_table,
+                sender=model,
+                dispatch_uid='classifier_refresh_wide_table_on_save'
+            )
+            post_delete.connect(
+                refresh_wide_table,
+                sender=model,
+                dispatch_uid='classifier_refresh_wide_table_on_delete'
+            )
+        _wide_tables = wide_tables
+
+    return _wide_tables
+
+
+def remember_wide_table_owner(sender, instance, **kwargs):
+    wide_table = get_wide_tables().get(sender)
+    if wide_table is not None:
+        # deferred owner isn't loaded
+        instance._wide_table_owner = instance.__dict__.get(
+            wide_table.owner_field.attname
+        )
+
+
+def refresh_wide_table(sender, instance, **kwargs):
+    wide_table = get_wide_tables().get(sender)
+    if wide_table is None or kwargs.get('raw'):
+        return
+
+    owner = getattr(instance, wide_table.owner_field.attname)
+    previous_owner = getattr(instance, '_wide_table_owner', None)
+    if previous_owner is not None and previous_owner != owner:
+        # value was moved to other owner
+        wide_table.refresh(previous_owner)
+    wide_table.refresh(owner)
+    instance._wide_table_owner = owner
+
+
+def reset_wide_tables(setting, **kwargs):
+    global _wide_tables
+
+    if setting != 'CLASSIFIER_WIDE_TABLES':
+        return
+
+    for model in _wide_tables or {}:
+        post_init.disconnect(
+            sender=model,
+            dispatch_uid='classifier_remember_wide_table_owner'
+        )
+        post_save.disconnect(
+            sender=model,
+            dispatch_uid='classifier_refresh_wide_table_on_save'
+        )
+        post_delete.disconnect(
+            sender=model,
+            dispatch_uid='classifier_refresh_wide_table_on_delete'
+        )
+    _wide_tables = None
+    get_wide_tables()
+
+
+setting_changed.connect(reset_wide_tables)
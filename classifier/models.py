@@ -1,10 +1,18 @@
-import six
+import functools
+import types
+
+from django.conf import settings
 from django.db import models
+from django.db.models.signals import class_prepared
 from django.utils.encoding import python_2_unicode_compatible
-from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
-from .exceptions import ClassifierModelNotFound
+from .exceptions import ClassifierLabelModelNotFound, ClassifierModelNotFound
+from .normalizers import normalizers
+from .validators import check_value, regex_cache, validate_regex
+from . import value_types as builtin_types
+from .value_types import value_types
 
 
 @python_2_unicode_compatible
@@ -20,9 +28,11 @@ class ClassifierAbstract(models.Model):
     ``value_type`` - expected type of value (like: string)
     ``value_validator`` - regex to validate extered value (like: \+\d{12})
     ``only_one_required`` - checkmark to make one on available lables required
+    ``value_normalizer`` - canonical form of value for lookups (like: e164)
 
     Supported types: ``int``, ``float``, ``string``, ``boolean``, ``date``,
-    ``datatime``.
+    ``datatime`` and types registered in
+    :py:data:`~classifier.value_types.value_types`.
 
     Labels with kind give posibility to create one type of record with
     different names, like kind is `phone` and available lables are
@@ -50,7 +60,7 @@ class ClassifierAbstract(models.Model):
     """custom identificator for classifier type (like: phone)"""
     value_type = models.CharField(
         max_length=20,
-        choices=TYPES.ALL,
+        choices=value_types.choices,
         verbose_name=_('Type of value')
     )
     """expected type of value (like: string)"""
@@ -59,7 +69,8 @@ class ClassifierAbstract(models.Model):
         null=True,
         blank=True,
         verbose_name=_('Value validator'),
-        help_text=_('Regex to validate value')
+        help_text=_('Regex to validate value'),
+        validators=[validate_regex]
     )
     """regex to validate extered value (like: \+\d{12})"""
     only_one_required = models.BooleanField(
@@ -67,6 +78,27 @@ class ClassifierAbstract(models.Model):
         verbose_name=_('only one of available labels is required')
     )
     """checkmark to make one on available lables required"""
+    value_normalizer = models.CharField(
+        max_length=20,
+        choices=normalizers.choices,
+        blank=True,
+        default='',
+        verbose_name=_('Normalizer of value'),
+        help_text=_('Canonical form of value used for exact lookups')
+    )
+    """
+    name of normalizer from :py:data:`~classifier.normalizers.normalizers`
+    (like: e164)
+    """
+    schema_version = models.PositiveIntegerField(default=1, editable=False)
+    """
+    incremented on change of ``value_type``, ``value_validator`` or
+    ``value_normalizer``, values validated against older version should be
+    revalidated
+    """
+
+    VERSIONED_FIELDS = ('value_type', 'value_validator', 'value_normalizer')
+    """fields which change increments ``schema_version``"""
 
     class Meta:
         abstract = True
@@ -74,49 +106,179 @@ class ClassifierAbstract(models.Model):
     def __str__(self):
         return self.kind
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(ClassifierAbstract, cls).from_db(
+            db,
+            field_names,
+            values
+        )
+        instance._loaded_versioned_values = instance.get_versioned_values()
+
+        return instance
+
+    def get_versioned_values(self):
+        return tuple(
+            self.__dict__.get(fieldname) for fieldname in self.VERSIONED_FIELDS
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        :raises django.core.exceptions.ValidationError: if ``value_validator``
+          is not correct regex
+        """
+        if self.value_validator:
+            validate_regex(self.value_validator)
+
+        loaded_values = getattr(self, '_loaded_versioned_values', None)
+        versioned_values = self.get_versioned_values()
+        version_changed = (
+            loaded_values is not None and loaded_values != versioned_values
+        )
+        if version_changed:
+            # incremented in database, so concurrent changes get own versions
+            self.schema_version = models.F('schema_version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = (
+                    list(kwargs['update_fields']) + ['schema_version']
+                )
+
+        super(ClassifierAbstract, self).save(*args, **kwargs)
+        if version_changed:
+            self.refresh_from_db(
+                using=kwargs.get('using'),
+                fields=['schema_version']
+            )
+        self._loaded_versioned_values = versioned_values
+        regex_cache.discard(self, keep_current=True)
+
+    def get_value_validator_regex(self):
+        """
+        :return: compiled ``value_validator`` or ``None`` if it is blank
+        """
+        return regex_cache.get(self)
+
     def to_python(self, value):
         """
         run convertor from string to type in ``value_type`` field
         """
-        cleaner = getattr(self, 'to_python_{}'.format(self.value_type))
-        return cleaner(value)
+        return self.get_converter(self.value_type)(value)
+
+    def to_python_many(self, values, as_array=False):
+        """
+        Convert many values at once, much faster than :py:meth:`to_python`
+        in loop for built-in types. Values are converted same way as by
+        :py:meth:`to_python`.
+
+        :param values: iterable of strings
+        :param as_array: return NumPy masked array instead of list, values
+          which can't be converted are masked. Supported by types with
+          ``dtype``: ``int``, ``float``, ``bool``, ``date`` and ``datetime``
+        :return: :py:class:`~classifier.value_types.BatchResult` with list of
+          values or array and mapping of indexes of wrong values to errors
+        :raises ImproperlyConfigured: if ``as_array`` is used without NumPy
+        """
+        values = list(values)
+        result = self.get_batch_converter(self.value_type)(values)
+        if not as_array:
+            return result
 
-    @staticmethod
-    def to_python_int(value):
-        return int(value)
+        dtype = value_types.get(self.value_type).dtype
+        if dtype is None:
+            raise ValueError(
+                'Value type "{}" doesn\'t support array output'.format(
+                    self.value_type
+                )
+            )
 
-    @staticmethod
-    def to_python_float(value):
-        return float(value)
+        return result._replace(values=builtin_types.to_array(result, dtype))
 
-    @staticmethod
-    def to_python_str(value):
-        return six.text_type(value)
+    def get_batch_converter(self, value_type):
+        """
+        :return: callable to convert list of strings to ``value_type``, which
+          converts values one by one if ``to_python_<value_type>`` is
+          overridden or type has no batch converter
+        """
+        converter = self.get_converter(value_type)
+        if value_type in value_types:
+            registered = value_types.get(value_type)
+            if (
+                converter is registered.converter
+                and registered.batch_converter is not None
+            ):
+                return registered.batch_converter
 
-    @staticmethod
-    def to_python_bool(value):
-        if value.lower() in ['on', 'yes', 'true']:
-            return True
-        elif value:
-            raise ValueError('Can\'t convert "{}" to boolean'.format(value))
+        return functools.partial(builtin_types.convert_many, converter)
 
-        return False
+    def normalize(self, value):
+        """
+        run normalizer from ``value_normalizer`` field
 
-    @staticmethod
-    def to_python_date(value):
-        date = parse_date(value)
-        if value and not date:
-            raise ValueError('Can\'t convert "{}" to date'.format(value))
+        :return: canonical form of value, value itself if normalizer is blank
+        :raises ValueError: if value can't be normalized
+        :raises NormalizerNotFound: if normalizer isn't registered
+        """
+        if not self.value_normalizer:
+            return value
+
+        return normalizers.get(self.value_normalizer).normalizer(value)
+
+    def get_converter(self, value_type):
+        """
+        Converters are resolved once per model and value type. Overridden
+        ``to_python_<value_type>`` methods have priority over converters from
+        :py:data:`~classifier.value_types.value_types`.
+
+        :return: callable to convert string to ``value_type``
+        :raises ValueTypeNotFound: if type isn't registered
+        """
+        converter, is_method = self.resolve_converter(value_type)
+        if is_method:
+            return types.MethodType(converter, self)
+
+        return converter
+
+    @classmethod
+    def resolve_converter(cls, value_type):
+        """
+        :return: converter for ``value_type`` and ``True`` if it is ordinary
+          method which should be bound to instance
+        :raises ValueTypeNotFound: if type isn't registered
+        """
+        converters = cls.__dict__.get('_converters')
+        if converters is None or converters[0] != value_types.generation:
+            converters = (value_types.generation, {})
+            cls._converters = converters
 
-        return date
+        try:
+            return converters[1][value_type]
+        except KeyError:
+            pass
 
-    @staticmethod
-    def to_python_datetime(value):
-        datetime = parse_datetime(value)
-        if value and not datetime:
-            raise ValueError('Can\'t convert "{}" to datetime'.format(value))
+        name = 'to_python_{}'.format(value_type)
+        for klass in cls.__mro__:
+            if name in vars(klass):
+                attr = vars(klass)[name]
+                break
+        else:
+            klass = attr = None
 
-        return datetime
+        if attr is None or klass is ClassifierAbstract:
+            resolved = (value_types.get(value_type).converter, False)
+        elif isinstance(attr, (staticmethod, classmethod)):
+            resolved = (getattr(cls, name), False)
+        else:
+            resolved = (attr, True)
+        converters[1][value_type] = resolved
+
+        return resolved
+
+    to_python_int = staticmethod(builtin_types.to_python_int)
+    to_python_float = staticmethod(builtin_types.to_python_float)
+    to_python_str = staticmethod(builtin_types.to_python_str)
+    to_python_bool = staticmethod(builtin_types.to_python_bool)
+    to_python_date = staticmethod(builtin_types.to_python_date)
+    to_python_datetime = staticmethod(builtin_types.to_python_datetime)
 
 
 @python_2_unicode_compatible
@@ -151,12 +313,9 @@ class ClassifierLabelAbstract(models.Model):
         .. caution::
             not field name
         """
-        for field in cls._meta.fields:
-            if (
-                field.related_model
-                and issubclass(field.related_model, ClassifierAbstract)
-            ):
-                return field
+        field = get_related_field(cls, ClassifierAbstract)
+        if field is not None:
+            return field
 
         raise ClassifierModelNotFound(
             '"{}" doesn\'t have relation to model inherited from "{}"'.format(
@@ -171,3 +330,368 @@ class ClassifierLabelAbstract(models.Model):
         :return: related model inherited from ClassifierAbstract
         """
         return cls.get_classifier_related_field().related_model
+
+
+class TypedValueDescriptor(object):
+    """
+    Value of model instance converted to ``value_type`` of classifier of its
+    label. Value is converted once per instance and converted again only
+    when raw value or label was changed. Raw value is returned if it can't be
+    converted.
+
+    :py:class:`ClassifierValueAbstract` has it as ``typed_value``, other
+    models with relation to label can add it too::
+
+        class Contact(models.Model):
+            ...
+            typed_value = TypedValueDescriptor('value')
+    """
+
+    cache_name = '_typed_value_cache'
+
+    def __init__(self, value_field='value'):
+        self.value_field = value_field
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        key = self.get_key(instance)
+        cache = instance.__dict__.get(self.cache_name)
+        if cache is None or cache[0] != key:
+            return self.fill(instance, self.get_classifier(instance))
+
+        return cache[1]
+
+    def get_key(self, instance):
+        label_field = get_related_field(type(instance), ClassifierLabelAbstract)
+
+        return (
+            getattr(instance, self.value_field),
+            getattr(instance, label_field.attname)
+        )
+
+    def get_classifier(self, instance):
+        from .registry import registry
+
+        label_field = get_related_field(type(instance), ClassifierLabelAbstract)
+        label = getattr(instance, label_field.name)
+
+        return (
+            registry.get_schema(label.__class__).get_classifier(label)
+            or label.get_classifier_instance()
+        )
+
+    def fill(self, instance, classifier):
+        """
+        Convert value of ``instance`` with ``classifier`` and remember it.
+
+        :return: typed value
+        """
+        value = getattr(instance, self.value_field)
+        if value:
+            try:
+                value = classifier.to_python(value)
+            except ValueError:
+                pass
+
+        instance.__dict__[self.cache_name] = (self.get_key(instance), value)
+
+        return value
+
+
+@python_2_unicode_compatible
+class ClassifierValueAbstract(models.Model):
+    """
+    Base model class for values of entity connected to classifier labels.
+
+    Besides raw string ``value`` keeps its copy converted with
+    :py:meth:`ClassifierAbstract.to_python` in indexed column for
+    ``value_type`` of classifier, so values can be filtered and ordered on
+    database side, like ``properties.filter(value_float__gt=2.0)``.
+
+    Model must contain :py:class:`~django.db.models.ForeignKey` to model
+    inherited from :py:class:`ClassifierLabelAbstract`. Add index on this
+    relation and ``validated_version`` to find stale values fast::
+
+        class Meta:
+            index_together = [('kind', 'validated_version')]
+    """
+
+    TYPED_VALUE_FIELDS = {
+        ClassifierAbstract.TYPES.INT: 'value_int',
+        ClassifierAbstract.TYPES.FLOAT: 'value_float',
+        ClassifierAbstract.TYPES.BOOLEAN: 'value_bool',
+        ClassifierAbstract.TYPES.DATE: 'value_date',
+        ClassifierAbstract.TYPES.DATETIME: 'value_datetime',
+    }
+    """mapping of ``value_type`` to name of typed column"""
+
+    value = models.CharField(max_length=500, verbose_name=_('Value'))
+    """raw value"""
+    value_int = models.BigIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
+    value_float = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
+    value_bool = models.NullBooleanField(editable=False, db_index=True)
+    value_date = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
+    value_datetime = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
+    validated_version = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
+    """
+    :py:attr:`ClassifierAbstract.schema_version` value was last checked
+    against, blank if value wasn't valid on save or was never checked.
+    :py:meth:`~classifier.revalidation.Revalidator.run_stale` reports blank
+    and older values and sets current version to all checked values
+    """
+    value_canonical = models.CharField(
+        max_length=500,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
+    """
+    ``value`` normalized with :py:meth:`ClassifierAbstract.normalize`, blank
+    if value can't be normalized
+    """
+
+    typed_value = TypedValueDescriptor()
+    """``value`` converted to ``value_type`` of classifier, memoized"""
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.value
+
+    def save(self, *args, **kwargs):
+        self.fill_typed_values()
+        self.fill_canonical_value()
+        self.fill_validated_version()
+        super(ClassifierValueAbstract, self).save(*args, **kwargs)
+
+    @classmethod
+    def get_classifier_label_related_field(cls):
+        """
+        :return: field related to model inherited from ClassifierLabelAbstract.
+        :raises ClassifierLabelModelNotFound: if related field wasn't found
+
+        .. caution::
+            not field name
+        """
+        field = get_related_field(cls, ClassifierLabelAbstract)
+        if field is not None:
+            return field
+
+        raise ClassifierLabelModelNotFound(
+            '"{}" doesn\'t have relation to model inherited from "{}"'.format(
+                cls.__name__,
+                ClassifierLabelAbstract.__name__
+            )
+        )
+
+    @classmethod
+    def get_typed_value_field(cls, value_type):
+        """
+        :return: name of typed column for ``value_type`` or ``None``
+        """
+        fieldname = cls.TYPED_VALUE_FIELDS.get(value_type)
+        if fieldname is None and value_type in value_types:
+            fieldname = value_types.get(value_type).typed_field
+
+        return fieldname
+
+    def get_classifier_label(self):
+        """
+        :return: instance of related label
+        """
+        return getattr(self, self.get_classifier_label_related_field().name)
+
+    def get_classifier_instance(self):
+        """
+        :return: classifier of related label
+        """
+        from .registry import registry
+
+        label = self.get_classifier_label()
+
+        return (
+            registry.get_schema(label.__class__).get_classifier(label)
+            or label.get_classifier_instance()
+        )
+
+    def fill_validated_version(self, classifier=None):
+        """
+        Set ``validated_version`` to current version of classifier if value
+        is valid, otherwise clear it, so value is reported by
+        :py:meth:`~classifier.revalidation.Revalidator.run_stale`.
+
+        :param classifier: classifier of related label, taken from registry
+          by default
+
+        .. note::
+            called on :py:meth:`save`, should be called manually before
+            ``bulk_create`` and ``bulk_update``
+        """
+        if classifier is None:
+            classifier = self.get_classifier_instance()
+        if check_value(classifier, self.value) is None:
+            self.validated_version = classifier.schema_version
+        else:
+            self.validated_version = None
+
+    def fill_canonical_value(self, classifier=None):
+        """
+        Fill ``value_canonical`` with normalized value, so values can be
+        found by exact lookup on index, like
+        ``contacts.filter(value_canonical='+380501234567')``.
+
+        :param classifier: classifier of related label, taken from registry
+          by default
+
+        .. note::
+            called on :py:meth:`save`, should be called manually before
+            ``bulk_create`` and ``bulk_update``
+        """
+        if classifier is None:
+            classifier = self.get_classifier_instance()
+        try:
+            self.value_canonical = classifier.normalize(self.value)
+        except ValueError:
+            self.value_canonical = None
+
+    def fill_typed_values(self, classifier=None):
+        """
+        Fill typed column for ``value_type`` of classifier and clear others.
+
+        Typed column stays blank if value can't be converted.
+
+        :param classifier: classifier of related label, taken from registry
+          by default
+
+        .. note::
+            called on :py:meth:`save`, should be called manually before
+            ``bulk_create`` and ``bulk_update``
+        """
+        for fieldname in set(self.TYPED_VALUE_FIELDS.values()):
+            setattr(self, fieldname, None)
+
+        if classifier is None:
+            classifier = self.get_classifier_instance()
+        fieldname = self.get_typed_value_field(classifier.value_type)
+        if not fieldname or not self.value:
+            return
+
+        try:
+            value = classifier.to_python(self.value)
+        except ValueError:
+            return
+
+        if (
+            classifier.value_type == ClassifierAbstract.TYPES.DATETIME
+            and settings.USE_TZ
+            and timezone.is_naive(value)
+        ):
+            value = timezone.make_aware(value)
+
+        setattr(self, fieldname, value)
+
+
+def get_related_field(model, related_base):
+    """
+    Relations are resolved once per model and stored on model class.
+
+    :param model: model to find relation in
+    :param related_base: abstract model, like :py:class:`ClassifierAbstract`
+    :return: first field of ``model`` related to model inherited from
+      ``related_base`` or ``None``
+    """
+    related_fields = model.__dict__.get('_classifier_related_fields')
+    if related_fields is None:
+        related_fields = {}
+        model._classifier_related_fields = related_fields
+
+    try:
+        return related_fields[related_base]
+    except KeyError:
+        pass
+
+    for field in model._meta.fields:
+        # Django 1.9+
+        if hasattr(field, 'remote_field'):
+            remote_field = field.remote_field
+        else:
+            remote_field = field.rel
+        related_model = getattr(remote_field, 'model', None)
+        if (
+            isinstance(related_model, type)
+            and issubclass(related_model, related_base)
+        ):
+            break
+    else:
+        field = None
+
+    related_fields[related_base] = field
+
+    return field
+
+
+CLASSIFIER_BASES = (ClassifierAbstract, ClassifierLabelAbstract)
+
+
+def prepare_related_fields(sender, **kwargs):
+    """
+    Resolve relations to classifier and label models when model class is
+    prepared and all related models are loaded.
+    """
+    if sender._meta.abstract:
+        return
+
+    related_models = [
+        field.remote_field.model for field in sender._meta.fields
+        if field.remote_field
+    ]
+    if not related_models:
+        return
+
+    def resolve(model, *related_models):
+        if any(
+            issubclass(related_model, CLASSIFIER_BASES)
+            for related_model in related_models
+        ):
+            for related_base in CLASSIFIER_BASES:
+                get_related_field(model, related_base)
+
+    lazy_related_operation(resolve, sender, *related_models)
+
+
+# Django 1.9+
+try:
+    from django.db.models.fields.related import lazy_related_operation
+except ImportError:
+    pass
+else:
+    class_prepared.connect(prepare_related_fields)
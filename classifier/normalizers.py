@@ -0,0 +1,143 @@
+import re
+import threading
+from collections import OrderedDict
+
+from django.utils.translation import ugettext_lazy as _
+
+from .exceptions import NormalizerNotFound
+
+NON_DIGITS_REGEX = re.compile(r'\D+')
+
+
+def normalize_strip(value):
+    return value.strip()
+
+
+def normalize_casefold(value):
+    value = value.strip()
+    # Python 3.3+
+    if hasattr(value, 'casefold'):
+        return value.casefold()
+
+    return value.lower()
+
+
+def normalize_digits(value):
+    return NON_DIGITS_REGEX.sub('', value)
+
+
+def normalize_e164(value):
+    """
+    Phone number in ``+<country code><number>`` format, international
+    prefix ``00`` is replaced with ``+``. Numbers without country code can't
+    be normalized.
+
+    :raises ValueError: if value isn't phone number with country code
+    """
+    value = value.strip()
+    digits = normalize_digits(value)
+    if not value.startswith('+'):
+        if not digits.startswith('00'):
+            raise ValueError(
+                'Phone number "{}" has no country code'.format(value)
+            )
+        digits = digits[2:]
+
+    # country codes don't start with zero, numbers are 15 digits at most
+    if not 7 <= len(digits) <= 15 or digits.startswith('0'):
+        raise ValueError('Wrong phone number "{}"'.format(value))
+
+    return '+' + digits
+
+
+class Normalizer(object):
+    """
+    Description of ``value_normalizer`` available for classifiers.
+    """
+
+    def __init__(self, name, normalizer, label=None):
+        self.name = name
+        """value stored in ``value_normalizer`` field"""
+        self.normalizer = normalizer
+        """
+        callable to convert raw string to canonical form, raises
+        ``ValueError`` if string can't be normalized
+        """
+        self.label = label or name
+        """human readable name"""
+
+    def __repr__(self):
+        return '<Normalizer: {}>'.format(self.name)
+
+
+class NormalizerRegistry(object):
+    """
+    Registry of normalizers of values, built-in normalizers are registered
+    by default::
+
+        from classifier.normalizers import normalizers
+
+        normalizers.register('upper', lambda value: value.strip().upper())
+
+    .. caution::
+        registered normalizers are added to choices of ``value_normalizer``
+        field, so they should be registered before migrations are created
+    """
+
+    def __init__(self):
+        self._normalizers = OrderedDict()
+        self._lock = threading.Lock()
+        self.choices = []
+        """choices for ``value_normalizer`` field, updated on registration"""
+
+    def register(self, name, normalizer, label=None):
+        """
+        Register new normalizer or replace existing one.
+
+        :return: registered :py:class:`Normalizer`
+        """
+        registered = Normalizer(name, normalizer, label=label)
+        with self._lock:
+            self._normalizers[name] = registered
+            self._update()
+
+        return registered
+
+    def unregister(self, name):
+        with self._lock:
+            del self._normalizers[name]
+            self._update()
+
+    def _update(self):
+        # choices list is shared with model fields, so it is updated in place
+        self.choices[:] = [
+            (normalizer.name, normalizer.label)
+            for normalizer in self._normalizers.values()
+        ]
+
+    def get(self, name):
+        """
+        :return: :py:class:`Normalizer` for ``name``
+        :raises NormalizerNotFound: if normalizer isn't registered
+        """
+        try:
+            return self._normalizers[name]
+        except KeyError:
+            raise NormalizerNotFound(
+                'Normalizer "{}" is not registered'.format(name)
+            )
+
+    def __contains__(self, name):
+        return name in self._normalizers
+
+    def __iter__(self):
+        return iter(list(self._normalizers.values()))
+
+
+normalizers = NormalizerRegistry()
+"""default registry of normalizers"""
+
+normalizers.register('strip', normalize_strip, _('Strip spaces'))
+normalizers.register('casefold', normalize_casefold, _('Ignore case'))
+normalizers.register('digits', normalize_digits, _('Digits only'))
+normalizers.register('e164', normalize_e164, _('Phone number (E.164)'))
@@ -0,0 +1,422 @@
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.models.signals import post_delete, post_save
+
+from .models import (
+    CLASSIFIER_BASES, ClassifierAbstract, ClassifierLabelAbstract
+)
+
+
+class ClassifierSchema(object):
+    """
+    Snapshot of all classifier and label records for one model inherited from
+    :py:class:`~classifier.models.ClassifierLabelAbstract`.
+
+    Loaded with one query. Labels keep their classifier attached, so
+    :py:meth:`~classifier.models.ClassifierLabelAbstract.get_classifier_instance`
+    never hits database for them.
+
+    .. caution::
+        instances in snapshot are shared between threads and requests and
+        should be treated as read-only
+    """
+
+    def __init__(self, label_model, labels=None):
+        """
+        :param labels: labels with attached classifiers, will be loaded from
+          database if ``None``
+        """
+        self.label_model = label_model
+        self.classifier_model = label_model.get_classifier_model()
+
+        related_name = label_model.get_classifier_related_field().name
+        if labels is None:
+            labels = (
+                label_model.objects
+                .select_related(related_name)
+                .order_by(*(label_model._meta.ordering or ['pk']))
+            )
+
+        classifiers = {}
+        for label in labels:
+            classifier = classifiers.setdefault(
+                label.get_classifier_instance().pk,
+                label.get_classifier_instance()
+            )
+            # all labels of one kind share same classifier instance
+            setattr(label, related_name, classifier)
+
+        self.labels = tuple(labels)
+        """all labels in default order"""
+        self._labels_by_pk = dict((label.pk, label) for label in self.labels)
+
+        self.classifiers = tuple(
+            classifiers[pk] for pk in sorted(classifiers)
+        )
+        """classifiers which have at least one label ordered by pk"""
+
+        self.required_labels = tuple(
+            label for label in self.labels if label.required
+        )
+        """labels marked as required"""
+
+        self.only_one_required = OrderedDict(
+            (
+                classifier,
+                tuple(
+                    label for label in self.labels
+                    if label.get_classifier_instance() is classifier
+                )
+            )
+            for classifier in self.classifiers
+            if classifier.only_one_required
+        )
+        """mapping of ``only_one_required`` classifier to its labels"""
+
+    def to_rows(self):
+        """
+        :return: picklable representation of snapshot for
+          :py:meth:`~ClassifierSchema.from_rows`
+        """
+        label_fields = get_attnames(self.label_model)
+        classifier_fields = get_attnames(self.classifier_model)
+
+        return {
+            'label_fields': label_fields,
+            'classifier_fields': classifier_fields,
+            'labels': [
+                tuple(getattr(label, name) for name in label_fields)
+                for label in self.labels
+            ],
+            'classifiers': [
+                tuple(getattr(classifier, name) for name in classifier_fields)
+                for classifier in self.classifiers
+            ],
+        }
+
+    @classmethod
+    def from_rows(cls, label_model, rows):
+        """
+        :param rows: result of :py:meth:`~ClassifierSchema.to_rows`
+        :return: snapshot or ``None`` if rows don't match current models
+        """
+        classifier_model = label_model.get_classifier_model()
+        label_fields = get_attnames(label_model)
+        classifier_fields = get_attnames(classifier_model)
+        if (
+            rows['label_fields'] != label_fields
+            or rows['classifier_fields'] != classifier_fields
+        ):
+            return None
+
+        classifiers = {}
+        for values in rows['classifiers']:
+            classifier = classifier_model.from_db(
+                DEFAULT_DB_ALIAS,
+                classifier_fields,
+                values
+            )
+            classifiers[classifier.pk] = classifier
+
+        related_field = label_model.get_classifier_related_field()
+        labels = []
+        for values in rows['labels']:
+            label = label_model.from_db(DEFAULT_DB_ALIAS, label_fields, values)
+            setattr(
+                label,
+                related_field.name,
+                classifiers[getattr(label, related_field.attname)]
+            )
+            labels.append(label)
+
+        return cls(label_model, labels)
+
+    def get_label(self, pk):
+        """
+        :return: label from snapshot or ``None`` if it absent
+        """
+        return self._labels_by_pk.get(pk)
+
+    def get_classifier(self, label):
+        """
+        :param label: label instance or its primary key
+        :return: classifier of label from snapshot or ``None`` if label absent
+        """
+        label = self.get_label(getattr(label, 'pk', label))
+        if label is None:
+            return None
+
+        return label.get_classifier_instance()
+
+
+class PendingInvalidation(object):
+    """
+    Invalidation of schemas postponed until commit of transaction which
+    changed classifiers or labels.
+
+    Until then the transaction uses own schemas loaded from database, other
+    threads and processes keep schemas of committed data.
+    """
+
+    def __init__(self, registry, model, connection):
+        self.registry = registry
+        self.model = model
+        self.connection = connection
+        self.done = False
+        self.schemas = {}
+        """schemas loaded inside of transaction"""
+
+    def __call__(self):
+        self.done = True
+        self.registry._commit_pending(self)
+
+    def is_active(self):
+        """
+        :return: ``False`` if transaction was committed or rolled back
+        """
+        if self.done:
+            return False
+
+        # callbacks of rolled back transactions and savepoints are dropped
+        return any(item[1] is self for item in self.connection.run_on_commit)
+
+
+class ClassifierRegistry(object):
+    """
+    Process-wide storage of :py:class:`ClassifierSchema` for each label model.
+
+    Schema is loaded on first access and invalidated on ``post_save`` and
+    ``post_delete`` of classifier and label models. Inside of transaction
+    invalidation is postponed until commit, while transaction itself uses
+    schemas with its own changes, which are dropped on rollback.
+
+    With ``CLASSIFIER_SCHEMA_CACHE`` setting (alias of cache from ``CACHES``)
+    snapshots are shared between processes through Django cache framework.
+    Every invalidation changes version key in cache, processes check it once
+    per request (or on :py:meth:`~ClassifierRegistry.check_version` call)
+    and load snapshot of new version from cache or database. Version is
+    changed after commit and snapshots loaded inside of transaction are
+    never written to cache.
+
+    .. caution::
+        ``QuerySet.update()`` and raw SQL don't send signals, call
+        :py:meth:`~ClassifierRegistry.invalidate` manually after them
+    """
+
+    VERSION_KEY = 'classifier:schema:version'
+    """cache key for current version of schemas"""
+
+    SCHEMA_KEY = 'classifier:schema:{version}:{label}'
+    """cache key template for snapshot of schema"""
+
+    def __init__(self):
+        self._schemas = {}
+        self._generation = 0
+        self._version = None
+        self._pending = []
+        self._lock = threading.RLock()
+
+    @property
+    def cache(self):
+        """
+        :return: cache for snapshots or ``None`` if it isn't configured
+        """
+        alias = getattr(settings, 'CLASSIFIER_SCHEMA_CACHE', None)
+        if alias is None:
+            return None
+
+        return caches[alias]
+
+    def get_schema(self, label_model):
+        """
+        :param label_model: model inherited from
+          :py:class:`~classifier.models.ClassifierLabelAbstract`
+        :return: :py:class:`ClassifierSchema` for ``label_model``
+        """
+        label_model = label_model._meta.concrete_model
+        pending = self._get_current_pending() if self._pending else None
+        if pending is not None:
+            schema = pending.schemas.get(label_model)
+            if schema is None:
+                schema = ClassifierSchema(label_model)
+                pending.schemas[label_model] = schema
+
+            return schema
+
+        schema = self._schemas.get(label_model)
+        if schema is not None:
+            return schema
+
+        with self._lock:
+            schema = self._schemas.get(label_model)
+            if schema is None:
+                generation = self._generation
+                schema = self._load_schema(label_model)
+                # don't store snapshot if it was invalidated during loading
+                if generation == self._generation:
+                    self._schemas[label_model] = schema
+
+        return schema
+
+    def _get_current_pending(self):
+        """
+        Drop invalidations of finished transactions.
+
+        :return: last active invalidation of transaction of current thread
+        """
+        with self._lock:
+            self._pending = [
+                pending for pending in self._pending if pending.is_active()
+            ]
+            for pending in reversed(self._pending):
+                # connections are thread-local
+                if connections[pending.connection.alias] is pending.connection:
+                    return pending
+
+        return None
+
+    def _load_schema(self, label_model):
+        cache = self.cache
+        if cache is None:
+            return ClassifierSchema(label_model)
+
+        if self._version is None:
+            self._version = self._get_cache_version(cache)
+
+        key = self.SCHEMA_KEY.format(
+            version=self._version,
+            label='{}.{}'.format(
+                label_model._meta.app_label,
+                label_model._meta.model_name
+            )
+        )
+        rows = cache.get(key)
+        schema = rows and ClassifierSchema.from_rows(label_model, rows)
+        if schema is None:
+            schema = ClassifierSchema(label_model)
+            connection = connections[router.db_for_read(label_model)]
+            # rows read inside of transaction can be rolled back
+            if not connection.in_atomic_block:
+                cache.set(key, schema.to_rows(), None)
+
+        return schema
+
+    def _get_cache_version(self, cache):
+        version = cache.get(self.VERSION_KEY)
+        if version is None:
+            cache.add(self.VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(self.VERSION_KEY)
+
+        return version
+
+    def check_version(self, **kwargs):
+        """
+        Drop stored schemas if version in cache was changed by other process.
+
+        Connected to ``request_started`` signal, should be called manually
+        in long running processes outside of requests.
+        """
+        cache = self.cache
+        if cache is None:
+            return
+
+        version = self._get_cache_version(cache)
+        if version != self._version:
+            with self._lock:
+                self._generation += 1
+                self._schemas.clear()
+                self._version = version
+
+    def invalidate(self, model=None, using=None):
+        """
+        Drop stored schemas, after commit if transaction is in progress.
+
+        :param model: classifier or label model to drop schemas related to,
+          all schemas will be dropped if ``None``
+        :param using: alias of database where model was changed
+        """
+        if using is None:
+            using = router.db_for_write(model) if model else DEFAULT_DB_ALIAS
+        connection = connections[using]
+
+        # Django 1.9+
+        if connection.in_atomic_block and hasattr(connection, 'run_on_commit'):
+            pending = PendingInvalidation(self, model, connection)
+            with self._lock:
+                self._pending.append(pending)
+            connection.on_commit(pending)
+            return
+
+        self._invalidate(model)
+
+    def _commit_pending(self, pending):
+        with self._lock:
+            if pending in self._pending:
+                self._pending.remove(pending)
+        self._invalidate(pending.model)
+
+    def _invalidate(self, model):
+        with self._lock:
+            self._generation += 1
+
+            cache = self.cache
+            if cache is not None:
+                self._version = uuid.uuid4().hex
+                cache.set(self.VERSION_KEY, self._version, None)
+                # all snapshots from cache have obsolete version now
+                self._schemas.clear()
+                return
+
+            if model is None:
+                self._schemas.clear()
+                return
+
+            model = model._meta.concrete_model
+            for label_model, schema in list(self._schemas.items()):
+                if model in (schema.label_model, schema.classifier_model):
+                    del self._schemas[label_model]
+
+
+registry = ClassifierRegistry()
+"""default registry used by forms and formsets"""
+
+
+def invalidate_schema(sender, **kwargs):
+    """
+    Receiver for ``post_save`` and ``post_delete`` signals to drop schemas
+    related to changed classifier or label.
+    """
+    if issubclass(sender, (ClassifierAbstract, ClassifierLabelAbstract)):
+        registry.invalidate(sender, using=kwargs.get('using'))
+
+
+def connect_signals():
+    """
+    Connect :py:func:`invalidate_schema` to signals of classifier and label
+    models. Receivers are connected to exact senders, receivers without
+    sender would disable fast deletes of all models in project.
+    """
+    for model in apps.get_models():
+        if not issubclass(model, CLASSIFIER_BASES):
+            continue
+
+        post_save.connect(
+            invalidate_schema,
+            sender=model,
+            dispatch_uid='classifier_invalidate_schema_on_save'
+        )
+        post_delete.connect(
+            invalidate_schema,
+            sender=model,
+            dispatch_uid='classifier_invalidate_schema_on_delete'
+        )
+
+
+def get_attnames(model):
+    return [field.attname for field in model._meta.concrete_fields]
@@ -0,0 +1,146 @@
+"""
+Reports over many owners of values, like users with contacts, calculated in
+database instead of formset per owner.
+
+Owners which miss required labels or all labels of ``only_one_required``
+classifiers are found with ``NOT EXISTS`` subqueries and returned in chunks
+ordered by primary key::
+
+    report = MissingRequiredReport(User.objects.filter(is_active=True),
+                                   'contacts')
+    for missing in report:
+        notify(missing.owner, missing.labels)
+"""
+from collections import namedtuple
+
+import six
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+
+try:
+    # Django 1.11+
+    from django.db.models import Exists, OuterRef
+except ImportError:
+    Exists = OuterRef = None
+
+from .managers import get_classifier_label_related_field
+from .registry import registry
+
+MissingRequired = namedtuple('MissingRequired', ['owner', 'labels'])
+"""
+primary key of owner and list of its missing labels, labels of
+``only_one_required`` classifier are grouped in tuple
+"""
+
+
+class MissingRequiredReport(object):
+    """
+    Find owners which miss values required by
+    :py:meth:`~classifier.formsets.ClassifierFormSet.validate_required`.
+    """
+
+    def __init__(self, owners, related_name, chunk_size=1000):
+        """
+        :param owners: queryset or model of owners
+        :param related_name: name of reverse relation to value model
+        :param chunk_size: number of owners fetched by one query
+        :raises ImproperlyConfigured: on Django < 1.11, which has no
+          ``Exists`` subqueries
+        """
+        if Exists is None:
+            raise ImproperlyConfigured(
+                'MissingRequiredReport requires Django 1.11+'
+            )
+
+        if not isinstance(owners, models.QuerySet):
+            owners = owners._default_manager.all()
+
+        relation = owners.model._meta.get_field(related_name)
+        self.owners = owners
+        self.chunk_size = chunk_size
+        self.value_model = relation.related_model
+        self.owner_field = relation.field
+        self.label_field = get_classifier_label_related_field(self.value_model)
+
+    def get_required(self):
+        """
+        :return: list of required labels and tuples of labels of
+          ``only_one_required`` classifiers
+        """
+        schema = registry.get_schema(self.label_field.related_model)
+
+        return (
+            list(schema.required_labels)
+            + list(schema.only_one_required.values())
+        )
+
+    def get_exists(self, labels):
+        """
+        :return: expression which is true if owner has value for one of
+          ``labels``
+        """
+        return Exists(
+            self.value_model._default_manager.filter(**{
+                self.owner_field.attname: OuterRef(
+                    self.owner_field.target_field.attname
+                ),
+                '{}__in'.format(self.label_field.attname): [
+                    label.pk for label in labels
+                ],
+            })
+        )
+
+    def get_queryset(self, required=None):
+        """
+        :return: owners which miss values of at least one of ``required``
+          labels, annotated with ``has_required_<index>`` flags
+        """
+        if required is None:
+            required = self.get_required()
+
+        annotations = {}
+        missing = models.Q()
+        for i, labels in enumerate(required):
+            if not isinstance(labels, tuple):
+                labels = (labels,)
+            name = 'has_required_{}'.format(i)
+            annotations[name] = self.get_exists(labels)
+            missing |= models.Q(**{name: False})
+
+        return (
+            self.owners
+            .annotate(**annotations)
+            .filter(missing)
+            .order_by('pk')
+        )
+
+    def __iter__(self):
+        """
+        :return: iterator of :py:class:`MissingRequired` ordered by primary
+          key of owner
+        """
+        required = self.get_required()
+        if not required:
+            return
+
+        names = ['has_required_{}'.format(i) for i in range(len(required))]
+        queryset = self.get_queryset(required).values_list('pk', *names)
+        last_pk = None
+        while True:
+            chunk = queryset
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            rows = list(chunk[:self.chunk_size])
+
+            for row in rows:
+                yield MissingRequired(row[0], [
+                    labels for labels, has_value in six.moves.zip(
+                        required,
+                        row[1:]
+                    )
+                    if not has_value
+                ])
+
+            if len(rows) < self.chunk_size:
+                break
+            last_pk = rows[-1][0]
@@ -0,0 +1,307 @@
+"""
+Revalidation of stored values after changes of ``value_validator`` or
+``value_type`` of classifiers.
+
+Table of values is split into ranges of primary keys which are validated
+independently, in worker processes when several processes are used::
+
+    revalidator = Revalidator(Contact, kinds=['phone'])
+    for invalid_values in revalidator.run(processes=4):
+        ...
+
+Values of models inherited from
+:py:class:`~classifier.models.ClassifierValueAbstract` keep
+``schema_version`` of classifier they were validated against, so only stale
+values can be revalidated in small batches, for example by periodic task::
+
+    for invalid_values in revalidator.run_stale(batch_size=500, max_batches=10):
+        ...
+"""
+import multiprocessing
+from collections import OrderedDict, namedtuple
+
+from django.apps import apps
+from django.db import connections, models, transaction
+from django.utils.module_loading import import_string
+
+from .managers import get_classifier_label_related_field
+from .models import ClassifierValueAbstract
+from .registry import registry
+from .validators import check_value
+
+InvalidValue = namedtuple('InvalidValue', ['pk', 'kind', 'value', 'error'])
+"""stored value which doesn't pass validation of its classifier"""
+
+
+class Revalidator(object):
+    """
+    Find values of ``model`` which are not valid for classifiers of their
+    labels anymore.
+
+    Model should have integer primary key. Worker processes import class of
+    revalidator by its dotted path, so subclasses should be defined on module
+    level and accept the same arguments.
+    """
+
+    CLASSIFIER_VALUE_FIELD = 'value'
+    """Name of field for value used in relation with classifier"""
+
+    VALIDATED_VERSION_FIELD = 'validated_version'
+    """
+    Name of field with ``schema_version`` of classifier value was validated
+    against
+    """
+
+    def __init__(self, model, kinds=None, chunk_size=10000):
+        """
+        :param model: model of values
+        :param kinds: kinds of classifiers to check, all by default
+        :param chunk_size: size of primary key range validated at once
+        """
+        self.model = model
+        self.kinds = list(kinds) if kinds else None
+        self.chunk_size = chunk_size
+        self.label_field = get_classifier_label_related_field(model)
+
+    def get_classifiers(self):
+        """
+        :return: mapping of label primary key to classifier of checked kinds
+        """
+        schema = registry.get_schema(self.label_field.related_model)
+        classifiers = {}
+        for label in schema.labels:
+            classifier = schema.get_classifier(label)
+            if self.kinds is None or classifier.kind in self.kinds:
+                classifiers[label.pk] = classifier
+
+        return classifiers
+
+    def get_queryset(self, classifiers=None):
+        if classifiers is None:
+            classifiers = self.get_classifiers()
+
+        return self.model._default_manager.filter(**{
+            '{}__in'.format(self.label_field.attname): list(classifiers),
+        })
+
+    def get_ranges(self):
+        """
+        :return: list of ``(start, end)`` ranges of primary keys, ``end`` is
+          not included
+        """
+        bounds = self.get_queryset().aggregate(
+            start=models.Min('pk'),
+            end=models.Max('pk')
+        )
+        if bounds['start'] is None:
+            return []
+
+        return [
+            (start, min(start + self.chunk_size, bounds['end'] + 1))
+            for start in range(
+                bounds['start'],
+                bounds['end'] + 1,
+                self.chunk_size
+            )
+        ]
+
+    def validate_range(self, start, end):
+        """
+        :return: list of :py:class:`InvalidValue` with primary key in range
+        """
+        classifiers = self.get_classifiers()
+        rows = (
+            self.get_queryset(classifiers)
+            .filter(pk__gte=start, pk__lt=end)
+            .values_list(
+                'pk',
+                self.label_field.attname,
+                self.CLASSIFIER_VALUE_FIELD
+            )
+        )
+
+        invalid_values = []
+        for pk, label_pk, value in rows:
+            classifier = classifiers[label_pk]
+            error = check_value(classifier, value)
+            if error is not None:
+                invalid_values.append(
+                    InvalidValue(pk, classifier.kind, value, error)
+                )
+
+        return invalid_values
+
+    def get_stale_queryset(self, classifier, label_pks):
+        """
+        :return: values of labels with ``label_pks`` validated against older
+          ``schema_version`` of ``classifier``
+        """
+        version_field = self.VALIDATED_VERSION_FIELD
+
+        return self.model._default_manager.filter(
+            models.Q(**{'{}__isnull'.format(version_field): True})
+            | models.Q(**{
+                '{}__lt'.format(version_field): classifier.schema_version,
+            }),
+            **{'{}__in'.format(self.label_field.attname): label_pks}
+        )
+
+    def get_refilled_fields(self):
+        """
+        :return: names of columns recalculated from value by
+          :py:meth:`run_stale`, typed and canonical columns of models
+          inherited from :py:class:`~classifier.models.ClassifierValueAbstract`
+        """
+        fields = set([self.VALIDATED_VERSION_FIELD])
+        if issubclass(self.model, ClassifierValueAbstract):
+            fields.update(self.model.TYPED_VALUE_FIELDS.values())
+            fields.add('value_canonical')
+
+        return sorted(fields)
+
+    def refill(self, classifier, objs):
+        """
+        Recalculate columns of checked ``objs`` from their values and save
+        them with ``bulk_update``.
+        """
+        for obj in objs:
+            if isinstance(obj, ClassifierValueAbstract):
+                obj.fill_typed_values(classifier)
+                obj.fill_canonical_value(classifier)
+            setattr(
+                obj,
+                self.VALIDATED_VERSION_FIELD,
+                classifier.schema_version
+            )
+
+        fields = self.get_refilled_fields()
+        manager = self.model._default_manager
+        # Django 2.2+
+        if hasattr(manager, 'bulk_update'):
+            manager.bulk_update(objs, fields)
+        else:
+            for obj in objs:
+                manager.filter(pk=obj.pk).update(**dict(
+                    (name, getattr(obj, name)) for name in fields
+                ))
+
+    def run_stale(self, batch_size=1000, max_batches=None):
+        """
+        Revalidate stale values in batches. Every checked value gets current
+        ``schema_version`` of its classifier, so it won't be checked again
+        until classifier is changed, typed and canonical columns are filled
+        again for new ``value_type`` and ``value_normalizer``.
+
+        :param batch_size: number of values checked in one transaction
+        :param max_batches: stop after this number of batches, remaining
+          values will be checked by next call
+        :return: iterator of lists of :py:class:`InvalidValue` per batch
+        """
+        labels = OrderedDict()
+        for label_pk, classifier in sorted(self.get_classifiers().items()):
+            labels.setdefault(classifier, []).append(label_pk)
+
+        batches = 0
+        for classifier, label_pks in labels.items():
+            queryset = self.get_stale_queryset(classifier, label_pks).only(
+                self.label_field.attname,
+                self.CLASSIFIER_VALUE_FIELD
+            )
+            while max_batches is None or batches < max_batches:
+                with transaction.atomic(using=queryset.db):
+                    objs = list(queryset[:batch_size])
+                    if not objs:
+                        break
+
+                    invalid_values = []
+                    for obj in objs:
+                        value = getattr(obj, self.CLASSIFIER_VALUE_FIELD)
+                        error = check_value(classifier, value)
+                        if error is not None:
+                            invalid_values.append(InvalidValue(
+                                obj.pk,
+                                classifier.kind,
+                                value,
+                                error
+                            ))
+
+                    self.refill(classifier, objs)
+
+                batches += 1
+                yield invalid_values
+
+    def run(self, processes=None):
+        """
+        Validate all ranges, in pool of ``processes`` worker processes if it
+        isn't ``1``.
+
+        :param processes: number of worker processes, number of CPUs by
+          default
+        :return: iterator of lists of :py:class:`InvalidValue` per range,
+          ranges are returned in order of completion
+        """
+        ranges = self.get_ranges()
+        if processes == 1 or len(ranges) < 2:
+            for start, end in ranges:
+                yield self.validate_range(start, end)
+            return
+
+        revalidator_path = '{}.{}'.format(
+            type(self).__module__,
+            type(self).__name__
+        )
+        tasks = [
+            (
+                revalidator_path,
+                self.model._meta.app_label,
+                self.model._meta.model_name,
+                self.kinds,
+                self.chunk_size,
+                start,
+                end,
+            )
+            for start, end in ranges
+        ]
+        pool = self.get_pool(processes)
+        try:
+            for invalid_values in pool.imap_unordered(validate_range, tasks):
+                yield invalid_values
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def get_pool(self, processes):
+        """
+        :return: pool of worker processes, workers create revalidator of same
+          class with same ``kinds`` and ``chunk_size``
+        """
+        # worker processes should open their own connections
+        connections.close_all()
+
+        return multiprocessing.Pool(processes, initializer=init_worker)
+
+
+def init_worker():
+    if not apps.ready:
+        # worker was spawned instead of forked
+        import django
+        django.setup()
+
+    connections.close_all()
+
+
+def validate_range(task):
+    (
+        revalidator_path,
+        app_label,
+        model_name,
+        kinds,
+        chunk_size,
+        start,
+        end,
+    ) = task
+    revalidator_class = import_string(revalidator_path)
+    model = apps.get_model(app_label, model_name)
+    revalidator = revalidator_class(model, kinds=kinds, chunk_size=chunk_size)
+
+    return revalidator.validate_range(start, end)
@@ -0,0 +1,117 @@
+import re
+import threading
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.utils.translation import ugettext_lazy as _
+
+
+def validate_regex(value):
+    """
+    Validate that value is correct regular expression.
+
+    :raises django.core.exceptions.ValidationError: if value can't be compiled
+    """
+    try:
+        re.compile(value)
+    except (re.error, TypeError):
+        raise ValidationError(
+            _('Wrong regular expression'),
+            code='invalid_regex'
+        )
+
+
+def check_value(classifier, value):
+    """
+    Check raw ``value`` against ``value_validator``, ``value_type`` and
+    ``value_normalizer`` of ``classifier`` same way as
+    :py:class:`~classifier.forms.ClassifierFormMixin` does it.
+
+    :return: ``'wrong_value_format'``, ``'wrong_type'`` or ``None`` if value is
+      valid
+    """
+    if not value:
+        return None
+
+    regex = classifier.get_value_validator_regex()
+    if regex and not regex.match(value):
+        return 'wrong_value_format'
+
+    try:
+        classifier.to_python(value)
+    except ValueError:
+        return 'wrong_type'
+
+    try:
+        classifier.normalize(value)
+    except ValueError:
+        return 'wrong_value_format'
+
+    return None
+
+
+class RegexCache(object):
+    """
+    Bounded LRU storage of compiled ``value_validator`` regexes.
+
+    Regexes are stored per classifier record and pattern, so pattern will be
+    compiled again only when it was changed for classifier.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._regexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(classifier, pattern):
+        opts = classifier._meta.concrete_model._meta
+        return (opts.app_label, opts.model_name, classifier.pk, pattern)
+
+    def get(self, classifier):
+        """
+        :param classifier: instance of model inherited from
+          :py:class:`~classifier.models.ClassifierAbstract`
+        :return: compiled ``value_validator`` of classifier or ``None`` if it
+          is blank
+        """
+        pattern = classifier.value_validator
+        if not pattern:
+            return None
+
+        if classifier.pk is None:
+            return re.compile(pattern)
+
+        key = self.get_key(classifier, pattern)
+        with self._lock:
+            try:
+                regex = self._regexes.pop(key)
+            except KeyError:
+                regex = re.compile(pattern)
+            self._regexes[key] = regex
+
+            while len(self._regexes) > self.maxsize:
+                self._regexes.popitem(last=False)
+
+        return regex
+
+    def discard(self, classifier, keep_current=False):
+        """
+        Drop compiled regexes of classifier.
+
+        :param keep_current: don't drop regex for current ``value_validator``
+        """
+        prefix = self.get_key(classifier, None)[:-1]
+        current = self.get_key(classifier, classifier.value_validator)
+        with self._lock:
+            for key in list(self._regexes):
+                if key[:-1] == prefix and not (keep_current and key == current):
+                    del self._regexes[key]
+
+    def clear(self):
+        with self._lock:
+            self._regexes.clear()
+
+
+regex_cache = RegexCache()
+"""default storage of compiled ``value_validator`` regexes"""
@@ -0,0 +1,349 @@
+import datetime as dt
+import threading
+from collections import OrderedDict, namedtuple
+
+import six
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.translation import ugettext_lazy as _
+
+from .exceptions import ValueTypeNotFound
+
+
+def to_python_int(value):
+    return int(value)
+
+
+def to_python_float(value):
+    return float(value)
+
+
+def to_python_str(value):
+    return six.text_type(value)
+
+
+def to_python_bool(value):
+    if value.lower() in ['on', 'yes', 'true']:
+        return True
+    elif value:
+        raise ValueError('Can\'t convert "{}" to boolean'.format(value))
+
+    return False
+
+
+def to_python_date(value):
+    date = parse_date(value)
+    if value and not date:
+        raise ValueError('Can\'t convert "{}" to date'.format(value))
+
+    return date
+
+
+def to_python_datetime(value):
+    datetime = parse_datetime(value)
+    if value and not datetime:
+        raise ValueError('Can\'t convert "{}" to datetime'.format(value))
+
+    return datetime
+
+
+BatchResult = namedtuple('BatchResult', ['values', 'errors'])
+"""
+result of batch conversion: list of converted values with ``None`` for
+values which can't be converted and mapping of their indexes to errors
+"""
+
+
+def convert_many(converter, values):
+    """
+    Convert ``values`` one by one, fallback for types without batch
+    converter.
+
+    :return: :py:class:`BatchResult`
+    """
+    results = []
+    errors = {}
+    for i, value in enumerate(values):
+        try:
+            results.append(converter(value))
+        except ValueError as e:
+            results.append(None)
+            errors[i] = e
+
+    return BatchResult(results, errors)
+
+
+def to_python_int_many(values):
+    try:
+        # values are usually valid, so all of them are converted in C first
+        return BatchResult(list(map(int, values)), {})
+    except ValueError:
+        return convert_many(to_python_int, values)
+
+
+def to_python_float_many(values):
+    try:
+        return BatchResult(list(map(float, values)), {})
+    except ValueError:
+        return convert_many(to_python_float, values)
+
+
+def to_python_str_many(values):
+    return BatchResult(list(map(six.text_type, values)), {})
+
+
+def _is_iso_date(value):
+    return len(value) == 10 and value[4] == value[7] == '-'
+
+
+def _is_iso_datetime(value):
+    length = len(value)
+    if length in (25, 32):
+        # offset in +HH:MM format
+        if value[-6] not in '+-' or value[-3] != ':':
+            return False
+        length -= 6
+
+    return (
+        (length == 19 or length == 26 and value[19] == '.')
+        and _is_iso_date(value[:10])
+        and value[10] in 'T '
+    )
+
+
+def _convert_iso_many(converter, parse, is_iso, values):
+    results = []
+    errors = {}
+    for i, value in enumerate(values):
+        try:
+            # ``fromisoformat`` is much faster than regular expressions of
+            # django, but it accepts more formats, so only canonical values
+            # are passed to it
+            if is_iso(value):
+                try:
+                    results.append(parse(value))
+                    continue
+                except ValueError:
+                    pass
+            results.append(converter(value))
+        except ValueError as e:
+            results.append(None)
+            errors[i] = e
+
+    return BatchResult(results, errors)
+
+
+def to_python_date_many(values):
+    # Python 3.7+
+    if not hasattr(dt.date, 'fromisoformat'):
+        return convert_many(to_python_date, values)
+
+    return _convert_iso_many(
+        to_python_date,
+        dt.date.fromisoformat,
+        _is_iso_date,
+        values
+    )
+
+
+def to_python_datetime_many(values):
+    # Python 3.7+
+    if not hasattr(dt.datetime, 'fromisoformat'):
+        return convert_many(to_python_datetime, values)
+
+    return _convert_iso_many(
+        to_python_datetime,
+        dt.datetime.fromisoformat,
+        _is_iso_datetime,
+        values
+    )
+
+
+def to_array(result, dtype):
+    """
+    Convert :py:class:`BatchResult` to NumPy masked array, values which
+    can't be converted are masked. Aware datetimes are converted to naive
+    ones in UTC.
+
+    :raises ImproperlyConfigured: if NumPy isn't installed
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImproperlyConfigured('NumPy is required for array output')
+
+    values = result.values
+    if dtype.startswith('datetime64'):
+        values = [
+            timezone.make_naive(value, timezone.utc)
+            if isinstance(value, dt.datetime) and timezone.is_aware(value)
+            else value
+            for value in values
+        ]
+    if result.errors:
+        fill = numpy.zeros(1, dtype)[0]
+        values = [
+            fill if i in result.errors else value
+            for i, value in enumerate(values)
+        ]
+
+    return numpy.ma.masked_array(
+        numpy.array(values, dtype=dtype),
+        mask=[i in result.errors for i in range(len(values))]
+    )
+
+
+class ValueType(object):
+    """
+    Description of ``value_type`` available for classifiers.
+    """
+
+    def __init__(self, name, converter, label=None, batch_converter=None,
+                 typed_field=None, dtype=None):
+        self.name = name
+        """value stored in ``value_type`` field"""
+        self.converter = converter
+        """callable to convert one string to real type"""
+        self.label = label or name
+        """human readable name"""
+        self.batch_converter = batch_converter
+        """
+        optional callable to convert list of strings at once, should return
+        :py:class:`BatchResult`
+        """
+        self.typed_field = typed_field
+        """
+        name of typed column in
+        :py:class:`~classifier.models.ClassifierValueAbstract` for this type
+        """
+        self.dtype = dtype
+        """NumPy dtype of array output of batch conversion"""
+
+    def __repr__(self):
+        return '<ValueType: {}>'.format(self.name)
+
+
+class ValueTypeRegistry(object):
+    """
+    Registry of value types, built-in types are registered by default::
+
+        from decimal import Decimal
+        from classifier.value_types import value_types
+
+        value_types.register('decimal', Decimal, _('Decimal'))
+
+    .. caution::
+        registered types are added to choices of ``value_type`` field, so
+        types should be registered before migrations are created
+    """
+
+    def __init__(self):
+        self._types = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        """changed on every registration to reset converters of models"""
+        self.choices = []
+        """choices for ``value_type`` field, updated on registration"""
+
+    def register(self, name, converter, label=None, batch_converter=None,
+                 typed_field=None, dtype=None):
+        """
+        Register new value type or replace existing one.
+
+        :return: registered :py:class:`ValueType`
+        """
+        value_type = ValueType(
+            name,
+            converter,
+            label=label,
+            batch_converter=batch_converter,
+            typed_field=typed_field,
+            dtype=dtype
+        )
+        with self._lock:
+            self._types[name] = value_type
+            self._update()
+
+        return value_type
+
+    def unregister(self, name):
+        with self._lock:
+            del self._types[name]
+            self._update()
+
+    def _update(self):
+        # choices list is shared with model fields, so it is updated in place
+        self.choices[:] = [
+            (value_type.name, value_type.label)
+            for value_type in self._types.values()
+        ]
+        self.generation += 1
+
+    def get(self, name):
+        """
+        :return: :py:class:`ValueType` for ``name``
+        :raises ValueTypeNotFound: if type isn't registered
+        """
+        try:
+            return self._types[name]
+        except KeyError:
+            raise ValueTypeNotFound(
+                'Value type "{}" is not registered'.format(name)
+            )
+
+    def __contains__(self, name):
+        return name in self._types
+
+    def __iter__(self):
+        return iter(list(self._types.values()))
+
+
+value_types = ValueTypeRegistry()
+"""default registry of value types"""
+
+value_types.register(
+    'int',
+    to_python_int,
+    _('Integer'),
+    batch_converter=to_python_int_many,
+    typed_field='value_int',
+    dtype='int64'
+)
+value_types.register(
+    'float',
+    to_python_float,
+    _('Float'),
+    batch_converter=to_python_float_many,
+    typed_field='value_float',
+    dtype='float64'
+)
+value_types.register(
+    'str',
+    to_python_str,
+    _('String'),
+    batch_converter=to_python_str_many
+)
+value_types.register(
+    'bool',
+    to_python_bool,
+    _('Boolean'),
+    typed_field='value_bool',
+    dtype='bool'
+)
+value_types.register(
+    'date',
+    to_python_date,
+    _('Date'),
+    batch_converter=to_python_date_many,
+    typed_field='value_date',
+    dtype='datetime64[D]'
+)
+value_types.register(
+    'datetime',
+    to_python_datetime,
+    _('Date time'),
+    batch_converter=to_python_datetime_many,
+    typed_field='value_datetime',
+    dtype='datetime64[us]'
+)
@@ -3,7 +3,7 @@ from django.contrib.auth import get_user_model
 
 from classifier.forms import ClassifierFormMixin
 
-from .models import Contact
+from .models import Contact, PrimaryContact
 
 
 class ContactForm(ClassifierFormMixin, forms.ModelForm):
@@ -14,6 +14,14 @@ class ContactForm(ClassifierFormMixin, forms.ModelForm):
         fields = '__all__'
 
 
+class PrimaryContactForm(ClassifierFormMixin, forms.ModelForm):
+    CLASSIFIER_VALUE_FIELD = 'value'
+
+    class Meta:
+        model = PrimaryContact
+        fields = '__all__'
+
+
 class UserForm(ClassifierFormMixin, forms.ModelForm):
 
     class Meta:
@@ -1,7 +1,10 @@
 from django.conf import settings
 from django.db import models
 from django.utils.encoding import python_2_unicode_compatible
-from classifier.models import ClassifierAbstract, ClassifierLabelAbstract
+from classifier.managers import ClassifiedManager, ClassifierValueManager
+from classifier.models import (
+    ClassifierAbstract, ClassifierLabelAbstract, ClassifierValueAbstract
+)
 
 
 @python_2_unicode_compatible
@@ -18,11 +21,36 @@ class Contact(models.Model):
         return '{}: {}'.format(self.kind, self.value)
 
 
+@python_2_unicode_compatible
+class PrimaryContact(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='primary_contacts',
+        on_delete=models.CASCADE
+    )
+    kind = models.ForeignKey('ContactClassifierLabel', on_delete=models.CASCADE)
+    value = models.CharField(max_length=200)
+
+    class Meta:
+        unique_together = [('user', 'kind')]
+
+    def __str__(self):
+        return '{}: {}'.format(self.kind, self.value)
+
+
 # Contact - right structure with related_name in label
 class ContactClassifier(ClassifierAbstract):
     pass
 
 
+class DoubledContactClassifier(ContactClassifier):
+    class Meta:
+        proxy = True
+
+    def to_python_int(self, value):
+        return int(value) * 2
+
+
 class ContactClassifierLabel(ClassifierLabelAbstract):
     classifier = models.ForeignKey(
         ContactClassifier,
@@ -40,6 +68,30 @@ class PropertyClassifierLabel(ClassifierLabelAbstract):
     kind = models.ForeignKey(PropertyClassifier, on_delete=models.CASCADE)
 
 
+@python_2_unicode_compatible
+class Computer(models.Model):
+    name = models.CharField(max_length=200)
+
+    objects = ClassifiedManager()
+
+    def __str__(self):
+        return self.name
+
+
+class ComputerProperty(ClassifierValueAbstract):
+    computer = models.ForeignKey(
+        Computer,
+        related_name='properties',
+        on_delete=models.CASCADE
+    )
+    kind = models.ForeignKey(PropertyClassifierLabel, on_delete=models.CASCADE)
+
+    objects = ClassifierValueManager()
+
+    class Meta:
+        index_together = [('kind', 'validated_version')]
+
+
 # Magic - wrong structure, no ForeignKey from label to classifier
 class MagicClassifier(ClassifierAbstract):
     pass
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+
+from django.forms import modelformset_factory
+from django.test import TransactionTestCase
+
+from classifier import aio
+from classifier.aio import AsyncClassifierFormMixin, AsyncClassifierFormSet
+
+from testapp.forms import ContactForm
+from testapp.models import Contact, ContactClassifier
+from testapp.tests.factories import (
+    UserFactory, ContactClassifierFactory, ContactClassifierLabelFactory
+)
+
+
+class AsyncContactForm(AsyncClassifierFormMixin, ContactForm):
+    pass
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class AsyncValidationTest(TransactionTestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        classifier = ContactClassifierFactory(
+            value_type=ContactClassifier.TYPES.INT
+        )
+        self.label = ContactClassifierLabelFactory(
+            classifier=classifier,
+            required=True
+        )
+        self.ContactFormSet = modelformset_factory(
+            Contact,
+            formset=AsyncClassifierFormSet,
+            form=ContactForm,
+            fields=('id', 'user', 'kind', 'value', )
+        )
+
+    def get_data(self, value):
+        return {
+            'form-TOTAL_FORMS': 1,
+            'form-INITIAL_FORMS': 0,
+            'form-MIN_NUM_FORMS': 0,
+            'form-MAX_NUM_FORMS': 1000,
+            'form-0-user': self.user.pk,
+            'form-0-kind': self.label.pk,
+            'form-0-value': value,
+        }
+
+    def test_formset_valid(self):
+        async def validate():
+            formset = await self.ContactFormSet.acreate(
+                self.get_data('123'),
+                queryset=Contact.objects.all()
+            )
+            return await formset.ais_valid()
+
+        self.assertTrue(run(validate()))
+
+    def test_formset_invalid(self):
+        async def validate():
+            formset = await self.ContactFormSet.acreate(
+                self.get_data('abc'),
+                queryset=Contact.objects.all()
+            )
+            errors = await formset.aclean()
+            return errors, await formset.ais_valid()
+
+        errors, is_valid = run(validate())
+        self.assertFalse(is_valid)
+        self.assertIn('value', errors[0])
+
+    def test_unbound_formset_forms(self):
+        async def create():
+            return await self.ContactFormSet.acreate(
+                queryset=Contact.objects.all()
+            )
+
+        formset = run(create())
+        self.assertEqual(
+            [form.initial for form in formset.forms],
+            [{'kind': self.label.pk}]
+        )
+
+    def test_form(self):
+        form = AsyncContactForm({
+            'user': self.user.pk,
+            'kind': self.label.pk,
+            'value': 'abc',
+        })
+
+        self.assertFalse(run(form.ais_valid()))
+        self.assertIn('value', form.errors)
+
+    def test_connections_of_thread_closed(self):
+        try:
+            import asgiref  # noqa
+        except ImportError:
+            pass
+        else:
+            self.skipTest('asgiref keeps connection of request thread')
+
+        calls = []
+        self.addCleanup(
+            setattr,
+            aio,
+            'close_old_connections',
+            aio.close_old_connections
+        )
+        aio.close_old_connections = lambda: calls.append(
+            threading.current_thread()
+        )
+
+        def func(value):
+            calls.append(value)
+            return value
+
+        async def call():
+            return await aio.run_sync(func, 1)
+
+        self.assertEqual(run(call()), 1)
+        self.assertEqual(calls[1], 1)
+        self.assertIs(calls[0], calls[2])
+        self.assertIsNot(calls[0], threading.current_thread())
@@ -3,7 +3,8 @@ from django.contrib.auth import get_user_model
 
 from testapp.models import (
     ContactClassifier, ContactClassifierLabel,
-    PropertyClassifier, PropertyClassifierLabel
+    PropertyClassifier, PropertyClassifierLabel,
+    Computer, ComputerProperty
 )
 
 
@@ -41,9 +42,25 @@ class PropertyClassifierFactory(factory.django.DjangoModelFactory):
 
 
 class PropertyClassifierLabelFactory(factory.django.DjangoModelFactory):
-    kind = factory.SubFactory(ContactClassifierFactory)
+    kind = factory.SubFactory(PropertyClassifierFactory)
     label = factory.Iterator(['CPU', 'RAM', 'HDD'])
     required = False
 
     class Meta:
         model = PropertyClassifierLabel
+
+
+class ComputerFactory(factory.django.DjangoModelFactory):
+    name = factory.Sequence(lambda n: 'Computer {}'.format(n))
+
+    class Meta:
+        model = Computer
+
+
+class ComputerPropertyFactory(factory.django.DjangoModelFactory):
+    computer = factory.SubFactory(ComputerFactory)
+    kind = factory.SubFactory(PropertyClassifierLabelFactory)
+    value = ''
+
+    class Meta:
+        model = ComputerProperty
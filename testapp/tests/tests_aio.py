@@ -0,0 +1,5 @@
+import sys
+
+# coroutines of classifier.aio can't be compiled before Python 3.5
+if sys.version_info >= (3, 5):
+    from testapp.tests.aio_cases import AsyncValidationTest  # noqa
@@ -0,0 +1,143 @@
+import json
+from datetime import date
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from classifier.exporters import ValueExporter, write_csv, write_jsonl
+from classifier.importers import ValueImporter, read_csv, read_jsonl
+
+from testapp.models import Contact, ContactClassifier, ComputerProperty
+from testapp.tests.factories import (
+    UserFactory, ContactClassifierFactory, ContactClassifierLabelFactory,
+    PropertyClassifierFactory, PropertyClassifierLabelFactory,
+    ComputerPropertyFactory
+)
+
+
+class ValueExporterTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.age = ContactClassifierLabelFactory(
+            label='Age',
+            classifier=ContactClassifierFactory(
+                kind='age',
+                value_type=ContactClassifier.TYPES.INT
+            )
+        )
+        self.phone = ContactClassifierLabelFactory(
+            label='Mobile',
+            classifier=ContactClassifierFactory(kind='phone')
+        )
+        Contact.objects.create(user=self.user, kind=self.age, value='30')
+        Contact.objects.create(user=self.user, kind=self.phone, value='+380')
+        Contact.objects.create(user=self.user, kind=self.age, value='abc')
+
+    def test_rows(self):
+        rows = list(ValueExporter(Contact.objects.order_by('pk')).rows())
+
+        self.assertEqual(
+            [(row['user'], row['kind'], row['value']) for row in rows],
+            [
+                (self.user.pk, 'Age', 30),
+                (self.user.pk, 'Mobile', '+380'),
+                (self.user.pk, 'Age', 'abc'),
+            ]
+        )
+
+    def test_one_query(self):
+        exporter = ValueExporter(Contact, chunk_size=1)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(list(exporter.rows())), 3)
+
+    def test_converter_cached(self):
+        exporter = ValueExporter(Contact)
+        list(exporter.rows())
+
+        self.assertEqual(
+            sorted(exporter._converters),
+            [
+                (self.age.classifier.pk, ContactClassifier.TYPES.INT),
+                (self.phone.classifier.pk, ContactClassifier.TYPES.STRING),
+            ]
+        )
+
+    def test_label_attr(self):
+        rows = ValueExporter(Contact, label_attr='pk').rows()
+        self.assertEqual(
+            set(row['kind'] for row in rows),
+            {self.age.pk, self.phone.pk}
+        )
+
+    def test_round_trip(self):
+        f = StringIO()
+        write_jsonl(ValueExporter(Contact.objects.order_by('pk')).rows(), f)
+        Contact.objects.all().delete()
+        f.seek(0)
+
+        result = ValueImporter(Contact).run(read_jsonl(f))
+
+        # invalid value is rejected on import
+        self.assertEqual(result, (2, 1))
+        self.assertEqual(
+            list(Contact.objects.order_by('pk').values_list('value', flat=True)),
+            ['30', '+380']
+        )
+
+    def test_write_csv(self):
+        f = StringIO()
+        count = write_csv(ValueExporter(Contact.objects.order_by('pk')).rows(), f)
+        f.seek(0)
+
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            [row['value'] for row in read_csv(f)],
+            ['30', '+380', 'abc']
+        )
+
+    def test_typed_value_model(self):
+        label = PropertyClassifierLabelFactory(kind=PropertyClassifierFactory(
+            kind='released',
+            value_type=ContactClassifier.TYPES.DATE
+        ))
+        ComputerPropertyFactory(kind=label, value='2016-08-29')
+
+        row = next(ValueExporter(ComputerProperty).rows())
+        self.assertEqual(row['value'], date(2016, 8, 29))
+        self.assertEqual(list(row), ['value', 'computer', 'kind'])
+
+    def test_round_trip_to_same_table(self):
+        label = PropertyClassifierLabelFactory(kind=PropertyClassifierFactory(
+            kind='ram',
+            value_type=ContactClassifier.TYPES.INT
+        ))
+        ComputerPropertyFactory(kind=label, value='8')
+        rows = list(ValueExporter(ComputerProperty).rows())
+
+        result = ValueImporter(ComputerProperty).run(rows)
+
+        self.assertEqual(result, (1, 0))
+        self.assertEqual(
+            list(ComputerProperty.objects.values_list('value_int', flat=True)),
+            [8, 8]
+        )
+
+
+class ExportCommandTest(TestCase):
+
+    def test_stdout(self):
+        label = ContactClassifierLabelFactory(
+            label='Age',
+            classifier=ContactClassifierFactory(
+                kind='age',
+                value_type=ContactClassifier.TYPES.INT
+            )
+        )
+        Contact.objects.create(user=UserFactory(), kind=label, value='30')
+        stdout = StringIO()
+        call_command('classifier_export', 'testapp.Contact', stdout=stdout)
+
+        rows = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([row['value'] for row in rows], [30])
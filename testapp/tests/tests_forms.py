@@ -77,6 +77,37 @@ class ClassifierFormValidateTypeTest(TestCase):
         self.assertTrue(form.is_valid())
 
 
+class ClassifierFormValidateNormalizerTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        classifier = ContactClassifierFactory(value_normalizer='e164')
+        self.label = ContactClassifierLabelFactory(classifier=classifier)
+
+    def test_validate_normalizer(self):
+        form = ContactForm({
+            'user': self.user.pk,
+            'kind': self.label.pk,
+            'value': '050 123 45 67',
+        })
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.errors['value'],
+            [six.text_type(form.error_messages['wrong_value_format'])]
+        )
+
+    def test_validate_normalizer_ok(self):
+        form = ContactForm({
+            'user': self.user.pk,
+            'kind': self.label.pk,
+            'value': '+38 (050) 123-45-67',
+        })
+
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['value'], '+38 (050) 123-45-67')
+
+
 class ClassifierFormValidateRegexTest(TestCase):
 
     def setUp(self):
@@ -1,12 +1,19 @@
 import six
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test import TestCase
 from django.forms import modelformset_factory
 
 from classifier.exceptions import ClassifierLabelModelNotFound
 from classifier.formsets import ClassifierFormSet
+from classifier.registry import registry
 
-from testapp.models import ContactClassifierLabel, Contact
+from testapp.forms import ContactForm, PrimaryContactForm
+from testapp.models import (
+    ContactClassifier, ContactClassifierLabel, Contact, PrimaryContact
+)
 from testapp.tests.factories import (
     UserFactory,
     ContactClassifierFactory, ContactClassifierLabelFactory
@@ -102,6 +109,50 @@ class FormSetRequiredExtraFormsTest(TestCase):
         )
 
 
+class FormSetRequiredExtraFormsQueriesTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        ContactClassifierLabelFactory(
+            classifier=ContactClassifierFactory(kind='phone'),
+            required=True
+        )
+
+    def create_required_classifiers(self, start, count):
+        for i in range(start, start + count):
+            classifier = ContactClassifierFactory(
+                kind='kind{}'.format(i),
+                only_one_required=True
+            )
+            label = ContactClassifierLabelFactory(classifier=classifier)
+            ContactClassifierLabelFactory(classifier=classifier)
+            Contact.objects.create(user=self.user, kind=label, value='1')
+
+    def assertConstructionQueries(self, num):
+        ContactFormSet = modelformset_factory(
+            Contact,
+            formset=ClassifierFormSet,
+            fields=('id', 'user', 'kind', 'value', )
+        )
+        registry.get_schema(ContactClassifierLabel)
+
+        with self.assertNumQueries(num):
+            contact_formset = ContactFormSet(queryset=Contact.objects.all())
+            forms = contact_formset.forms
+
+        return forms
+
+    def test_queries_not_depend_on_kinds_count(self):
+        # formset queryset and labels shared between forms
+        self.create_required_classifiers(0, 2)
+        forms = self.assertConstructionQueries(2)
+        self.assertEqual(len(forms), 3)
+
+        self.create_required_classifiers(2, 5)
+        forms = self.assertConstructionQueries(2)
+        self.assertEqual(len(forms), 8)
+
+
 class FormSetInitialTest(TestCase):
 
     def setUp(self):
@@ -363,6 +414,296 @@ class FormSetRequiredValidationTest(TestCase):
         )
 
 
+class FormSetRequiredValidationQueriesTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.labels = []
+        for i in range(5):
+            classifier = ContactClassifierFactory(
+                kind='kind{}'.format(i),
+                only_one_required=bool(i % 2)
+            )
+            self.labels.append(ContactClassifierLabelFactory(
+                classifier=classifier,
+                required=not i % 2
+            ))
+            ContactClassifierLabelFactory(classifier=classifier)
+
+    def get_formset(self, labels):
+        ContactFormSet = modelformset_factory(
+            Contact,
+            formset=ClassifierFormSet,
+            fields=('id', 'user', 'kind', 'value', )
+        )
+
+        data = {
+            'form-TOTAL_FORMS': len(labels),
+            'form-INITIAL_FORMS': 0,
+            'form-MIN_NUM_FORMS': 0,
+            'form-MAX_NUM_FORMS': 1000,
+        }
+        for i, label in enumerate(labels):
+            data.update({
+                'form-{}-user'.format(i): self.user.pk,
+                'form-{}-kind'.format(i): label.pk,
+                'form-{}-value'.format(i): 'value',
+            })
+
+        return ContactFormSet(data, queryset=Contact.objects.all())
+
+    def test_no_queries_when_valid(self):
+        contact_formset = self.get_formset(self.labels)
+        self.assertTrue(contact_formset.is_valid())
+
+        with self.assertNumQueries(0):
+            contact_formset.validate_required()
+
+    def test_no_queries_when_data_absent(self):
+        contact_formset = self.get_formset(self.labels[:1])
+        self.assertFalse(contact_formset.is_valid())
+        self.assertEqual(len(contact_formset.non_form_errors()), 1)
+
+        with self.assertNumQueries(0):
+            self.assertRaises(
+                ValidationError,
+                contact_formset.validate_required
+            )
+
+
+class FormSetSharedLabelChoicesTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.classifier = ContactClassifierFactory()
+        self.labels = [
+            ContactClassifierLabelFactory(classifier=self.classifier)
+            for i in range(3)
+        ]
+        self.ContactFormSet = modelformset_factory(
+            Contact,
+            formset=ClassifierFormSet,
+            form=ContactForm,
+            fields=('id', 'kind', 'value', ),
+            extra=10
+        )
+        registry.get_schema(ContactClassifierLabel)
+
+    def test_render_with_one_labels_query(self):
+        contact_formset = self.ContactFormSet(queryset=Contact.objects.none())
+
+        with self.assertNumQueries(1):
+            html = contact_formset.as_p()
+
+        self.assertEqual(html.count('value="{}"'.format(self.labels[0].pk)), 10)
+
+    def test_clean_with_one_labels_query(self):
+        data = {
+            'form-TOTAL_FORMS': 10,
+            'form-INITIAL_FORMS': 0,
+            'form-MIN_NUM_FORMS': 0,
+            'form-MAX_NUM_FORMS': 1000,
+        }
+        for i in range(10):
+            data.update({
+                'form-{}-kind'.format(i): self.labels[i % 3].pk,
+                'form-{}-value'.format(i): 'value',
+            })
+        contact_formset = self.ContactFormSet(
+            data,
+            queryset=Contact.objects.none()
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            contact_formset.is_valid()
+
+        labels_table = ContactClassifierLabel._meta.db_table
+        classifiers_table = ContactClassifier._meta.db_table
+        selects = [
+            query['sql'] for query in queries
+            if 'FROM "{}"'.format(labels_table) in query['sql']
+        ]
+        self.assertEqual(len(selects), 1)
+        self.assertFalse([
+            query['sql'] for query in queries
+            if 'FROM "{}"'.format(classifiers_table) in query['sql']
+        ])
+        self.assertIs(
+            contact_formset.forms[0].cleaned_data['kind'],
+            contact_formset.forms[3].cleaned_data['kind']
+        )
+
+    def test_wrong_label(self):
+        data = {
+            'form-TOTAL_FORMS': 1,
+            'form-INITIAL_FORMS': 0,
+            'form-MIN_NUM_FORMS': 0,
+            'form-MAX_NUM_FORMS': 1000,
+            'form-0-kind': 'abc',
+            'form-0-value': 'value',
+        }
+        contact_formset = self.ContactFormSet(
+            data,
+            queryset=Contact.objects.none()
+        )
+
+        self.assertFalse(contact_formset.is_valid())
+        self.assertIn('kind', contact_formset.forms[0].errors)
+
+
+class FormSetUniqueLabelTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.label = ContactClassifierLabelFactory(
+            classifier=ContactClassifierFactory()
+        )
+        self.PrimaryContactFormSet = modelformset_factory(
+            PrimaryContact,
+            formset=ClassifierFormSet,
+            form=PrimaryContactForm,
+            fields=('id', 'user', 'kind', 'value', )
+        )
+
+    def get_data(self, *values):
+        data = {
+            'form-TOTAL_FORMS': len(values),
+            'form-INITIAL_FORMS': 0,
+            'form-MIN_NUM_FORMS': 0,
+            'form-MAX_NUM_FORMS': 1000,
+        }
+        for i, value in enumerate(values):
+            data.update({
+                'form-{}-user'.format(i): self.user.pk,
+                'form-{}-kind'.format(i): self.label.pk,
+                'form-{}-value'.format(i): value,
+            })
+
+        return data
+
+    def test_duplicate_in_formset(self):
+        formset = self.PrimaryContactFormSet(
+            self.get_data('a', 'b'),
+            queryset=PrimaryContact.objects.none()
+        )
+
+        self.assertFalse(formset.is_valid())
+        self.assertTrue(formset.non_form_errors())
+
+    def test_duplicate_in_database(self):
+        PrimaryContact.objects.create(
+            user=self.user,
+            kind=self.label,
+            value='a'
+        )
+        formset = self.PrimaryContactFormSet(
+            self.get_data('b'),
+            queryset=PrimaryContact.objects.none()
+        )
+
+        self.assertFalse(formset.is_valid())
+        self.assertIn('__all__', formset.forms[0].errors)
+
+
+class BulkClassifierFormSet(ClassifierFormSet):
+    bulk_save = True
+
+
+class FormSetBulkSaveTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.label = ContactClassifierLabelFactory(
+            classifier=ContactClassifierFactory()
+        )
+        self.changed = Contact.objects.create(
+            user=self.user,
+            kind=self.label,
+            value='old'
+        )
+        self.deleted = Contact.objects.create(
+            user=self.user,
+            kind=self.label,
+            value='deleted'
+        )
+        self.ContactFormSet = modelformset_factory(
+            Contact,
+            formset=BulkClassifierFormSet,
+            form=ContactForm,
+            can_delete=True,
+            max_num=1000
+        )
+
+    def get_data(self, new_count):
+        data = {
+            'form-TOTAL_FORMS': 2 + new_count,
+            'form-INITIAL_FORMS': 2,
+            'form-MIN_NUM_FORMS': 0,
+            'form-MAX_NUM_FORMS': 1000,
+        }
+        for i, (contact, value) in enumerate([
+            (self.changed, 'new'),
+            (self.deleted, 'deleted'),
+        ]):
+            data.update({
+                'form-{}-id'.format(i): contact.pk,
+                'form-{}-user'.format(i): self.user.pk,
+                'form-{}-kind'.format(i): self.label.pk,
+                'form-{}-value'.format(i): value,
+            })
+        data['form-1-DELETE'] = 'on'
+        for i in range(2, 2 + new_count):
+            data.update({
+                'form-{}-user'.format(i): self.user.pk,
+                'form-{}-kind'.format(i): self.label.pk,
+                'form-{}-value'.format(i): 'value{}'.format(i),
+            })
+
+        return data
+
+    def test_save(self):
+        formset = self.ContactFormSet(
+            self.get_data(100),
+            queryset=Contact.objects.order_by('pk')
+        )
+        self.assertTrue(formset.is_valid())
+
+        # savepoint, insert, update, delete and release of savepoint
+        with self.assertNumQueries(5):
+            objects = formset.save()
+
+        self.assertEqual(len(objects), 101)
+        self.assertEqual(
+            sorted(Contact.objects.values_list('value', flat=True))[:3],
+            ['new', 'value10', 'value100']
+        )
+        self.assertEqual(Contact.objects.count(), 101)
+        self.assertEqual(formset.deleted_objects, [self.deleted])
+
+    def test_commit_false(self):
+        formset = self.ContactFormSet(
+            self.get_data(1),
+            queryset=Contact.objects.order_by('pk')
+        )
+        self.assertTrue(formset.is_valid())
+
+        with self.assertNumQueries(0):
+            formset.save(commit=False)
+
+    def test_not_changed(self):
+        data = self.get_data(0)
+        data['form-0-value'] = 'old'
+        del data['form-1-DELETE']
+        formset = self.ContactFormSet(
+            data,
+            queryset=Contact.objects.order_by('pk')
+        )
+        self.assertTrue(formset.is_valid())
+
+        with self.assertNumQueries(2):
+            self.assertEqual(formset.save(), [])
+
+
 class FormSetRelationMethodsTest(TestCase):
 
     def test_no_relation_to_label(self):
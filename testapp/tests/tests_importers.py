@@ -0,0 +1,287 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from classifier.importers import (
+    CsvErrorWriter, JsonErrorWriter, ValueImporter, read_csv, read_jsonl
+)
+
+from testapp.models import (
+    Contact, ContactClassifier, ComputerProperty, PropertyClassifier
+)
+from testapp.tests.factories import (
+    UserFactory, ContactClassifierFactory, ContactClassifierLabelFactory,
+    PropertyClassifierFactory, PropertyClassifierLabelFactory,
+    ComputerFactory
+)
+
+
+class ValueImporterTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.phone = ContactClassifierLabelFactory(
+            label='Mobile',
+            classifier=ContactClassifierFactory(
+                kind='phone',
+                value_type=ContactClassifier.TYPES.STRING,
+                value_validator=r'^\+\d+$'
+            )
+        )
+        self.age = ContactClassifierLabelFactory(
+            label='Age',
+            classifier=ContactClassifierFactory(
+                kind='age',
+                value_type=ContactClassifier.TYPES.INT
+            )
+        )
+        self.errors = []
+
+    def run_import(self, rows, **kwargs):
+        importer = ValueImporter(
+            Contact,
+            errors=lambda row, error: self.errors.append((row, error)),
+            **kwargs
+        )
+
+        return importer.run(rows)
+
+    def row(self, kind, value, user=None):
+        return {
+            'user': user or self.user.pk,
+            'kind': kind,
+            'value': value,
+        }
+
+    def test_import(self):
+        result = self.run_import([
+            self.row('Mobile', '+380501234567'),
+            self.row('Age', '30'),
+        ])
+
+        self.assertEqual(result, (2, 0))
+        self.assertEqual(
+            sorted(Contact.objects.values_list('kind', 'value')),
+            [(self.phone.pk, '+380501234567'), (self.age.pk, '30')]
+        )
+
+    def test_rejected(self):
+        rows = [
+            self.row('Mobile', '0501234567'),
+            self.row('Age', 'thirty'),
+            self.row('Fax', '+380501234567'),
+            self.row('Age', ''),
+            self.row('Age', '30', user=self.user.pk + 100),
+            dict(self.row('Age', '30'), color='red'),
+            'not an object',
+        ]
+        result = self.run_import(rows)
+
+        self.assertEqual(result, (0, len(rows)))
+        self.assertFalse(Contact.objects.exists())
+        self.assertEqual(
+            [error for row, error in self.errors],
+            [
+                'Wrong value format',
+                'Wrong type of value',
+                'Unknown label "Fax"',
+                'Field "value" is required',
+                'Unknown field "color"',
+                'Row should be an object',
+                'Field "user": object with key "{}" not found'.format(
+                    self.user.pk + 100
+                ),
+            ]
+        )
+
+    def test_ambiguous_label(self):
+        ContactClassifierLabelFactory(label='Mobile', classifier=self.age.classifier)
+        result = self.run_import([self.row('Mobile', '+380501234567')])
+
+        self.assertEqual(result, (0, 1))
+        self.assertEqual(self.errors[0][1], 'Several labels found for "Mobile"')
+
+    def test_label_attr(self):
+        result = self.run_import(
+            [self.row(self.age.pk, '30')],
+            label_attr='pk'
+        )
+
+        self.assertEqual(result, (1, 0))
+
+    def test_queries_per_chunk(self):
+        rows = [self.row('Age', str(i)) for i in range(10)]
+        importer = ValueImporter(Contact, chunk_size=5)
+
+        # check of users and insert for each chunk
+        with self.assertNumQueries(4):
+            result = importer.run(iter(rows))
+
+        self.assertEqual(result, (10, 0))
+
+    def test_typed_values(self):
+        label = PropertyClassifierLabelFactory(
+            label='Released',
+            kind=PropertyClassifierFactory(
+                kind='released',
+                value_type=PropertyClassifier.TYPES.DATE
+            )
+        )
+        computer = ComputerFactory()
+        result = ValueImporter(ComputerProperty).run([
+            {'computer': computer.pk, 'kind': 'Released', 'value': '2016-08-29'},
+        ])
+
+        self.assertEqual(result, (1, 0))
+        self.assertEqual(
+            ComputerProperty.objects.get(kind=label).value_date,
+            date(2016, 8, 29)
+        )
+
+
+    def test_ignored_fields(self):
+        existing = Contact.objects.create(
+            user=self.user,
+            kind=self.age,
+            value='30'
+        )
+        row = dict(self.row('Age', '31'), id=existing.pk)
+
+        self.assertEqual(self.run_import([row]), (1, 0))
+        self.assertEqual(Contact.objects.count(), 2)
+
+        label = PropertyClassifierLabelFactory(
+            label='RAM',
+            kind=PropertyClassifierFactory(
+                kind='ram',
+                value_type=PropertyClassifier.TYPES.INT
+            )
+        )
+        result = ValueImporter(ComputerProperty).run([{
+            'computer': ComputerFactory().pk,
+            'kind': 'RAM',
+            'value': '8',
+            'value_int': 16,
+            'validated_version': 100,
+        }])
+
+        self.assertEqual(result, (1, 0))
+        obj = ComputerProperty.objects.get(kind=label)
+        self.assertEqual(obj.value_int, 8)
+        self.assertEqual(obj.validated_version, 1)
+
+
+class ReadersWritersTest(TestCase):
+
+    def test_read_csv(self):
+        f = StringIO('user,kind,value\n1,Mobile,+380501234567\n')
+        self.assertEqual(
+            [dict(row) for row in read_csv(f)],
+            [{'user': '1', 'kind': 'Mobile', 'value': '+380501234567'}]
+        )
+
+    def test_read_jsonl(self):
+        f = StringIO('{"user": 1}\n\nwrong\n')
+        self.assertEqual(list(read_jsonl(f)), [{'user': 1}, 'wrong'])
+
+    def test_csv_error_writer(self):
+        f = StringIO()
+        writer = CsvErrorWriter(f)
+        writer({'value': 'a'}, 'Wrong type of value')
+        writer({'value': 'b'}, 'Wrong value format')
+
+        self.assertEqual(
+            list(read_csv(StringIO(f.getvalue()))),
+            [
+                {'value': 'a', 'error': 'Wrong type of value'},
+                {'value': 'b', 'error': 'Wrong value format'},
+            ]
+        )
+
+    def test_json_error_writer(self):
+        f = StringIO()
+        JsonErrorWriter(f)('wrong', 'Row should be an object')
+
+        self.assertEqual(
+            json.loads(f.getvalue()),
+            {'row': 'wrong', 'error': 'Row should be an object'}
+        )
+
+
+class ImportCommandTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        ContactClassifierLabelFactory(
+            label='Age',
+            classifier=ContactClassifierFactory(
+                kind='age',
+                value_type=ContactClassifier.TYPES.INT
+            )
+        )
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+        return path
+
+    def test_csv(self):
+        path = self.write(
+            'contacts.csv',
+            u'user,kind,value\n{0},Age,30\n{0},Age,abc\n'.format(self.user.pk)
+        )
+        errors = os.path.join(self.tmpdir, 'errors.csv')
+        stdout = StringIO()
+        call_command(
+            'classifier_import',
+            'testapp.Contact',
+            path,
+            errors=errors,
+            stdout=stdout
+        )
+
+        self.assertIn('Imported: 1, rejected: 1', stdout.getvalue())
+        with io.open(errors, encoding='utf-8') as f:
+            self.assertEqual(
+                [row['error'] for row in read_csv(f)],
+                ['Wrong type of value']
+            )
+
+    def test_jsonl(self):
+        path = self.write(
+            'contacts.txt',
+            u'{{"user": {}, "kind": "Age", "value": "30"}}\n'.format(
+                self.user.pk
+            )
+        )
+        call_command(
+            'classifier_import',
+            'testapp.Contact',
+            path,
+            format='jsonl',
+            stdout=StringIO()
+        )
+
+        self.assertEqual(Contact.objects.get().value, '30')
+
+    def test_unknown_format(self):
+        path = self.write('contacts.txt', u'')
+        self.assertRaises(
+            CommandError,
+            call_command,
+            'classifier_import',
+            'testapp.Contact',
+            path
+        )
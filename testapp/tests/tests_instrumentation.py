@@ -0,0 +1,96 @@
+from django.forms import modelformset_factory
+from django.test import TestCase, override_settings
+
+from classifier import instrumentation
+from classifier.formsets import ClassifierFormSet
+from classifier.instrumentation import (
+    MemoryCollector, NULL_STAGE, get_collector, set_collector, stage
+)
+
+from testapp.forms import ContactForm
+from testapp.models import Contact, ContactClassifier
+from testapp.tests.factories import (
+    UserFactory, ContactClassifierFactory, ContactClassifierLabelFactory
+)
+
+collector = MemoryCollector()
+
+
+class InstrumentationDisabledTest(TestCase):
+
+    def test_null_stage(self):
+        self.assertIsNone(get_collector())
+        self.assertIs(stage('formset.validate_required'), NULL_STAGE)
+
+
+@override_settings(
+    CLASSIFIER_INSTRUMENTATION_COLLECTOR=(
+        'testapp.tests.tests_instrumentation.collector'
+    )
+)
+class InstrumentationSettingsTest(TestCase):
+
+    def setUp(self):
+        collector.clear()
+
+    def test_collector_from_settings(self):
+        self.assertIs(get_collector(), collector)
+
+        with stage('test'):
+            Contact.objects.count()
+
+        self.assertEqual(len(collector.records), 1)
+        self.assertEqual(collector.records[0].stage, 'test')
+        self.assertEqual(collector.records[0].queries, 1)
+
+
+class InstrumentationStagesTest(TestCase):
+
+    def setUp(self):
+        self.collector = MemoryCollector()
+        set_collector(self.collector)
+
+        self.user = UserFactory()
+        classifier = ContactClassifierFactory(
+            value_type=ContactClassifier.TYPES.INT,
+            value_validator=r'\d+'
+        )
+        self.label = ContactClassifierLabelFactory(
+            classifier=classifier,
+            required=True
+        )
+
+    def tearDown(self):
+        instrumentation._collector = instrumentation._UNSET
+
+    def test_formset_stages(self):
+        ContactFormSet = modelformset_factory(
+            Contact,
+            formset=ClassifierFormSet,
+            form=ContactForm
+        )
+        data = {
+            'form-TOTAL_FORMS': 2,
+            'form-INITIAL_FORMS': 0,
+            'form-MIN_NUM_FORMS': 0,
+            'form-MAX_NUM_FORMS': 1000,
+        }
+        for i in range(2):
+            data.update({
+                'form-{}-user'.format(i): self.user.pk,
+                'form-{}-kind'.format(i): self.label.pk,
+                'form-{}-value'.format(i): '123',
+            })
+
+        contact_formset = ContactFormSet(data, queryset=Contact.objects.none())
+        self.assertTrue(contact_formset.is_valid())
+
+        summary = self.collector.summary()
+        self.assertEqual(summary['formset.add_required_to_extra']['calls'], 1)
+        self.assertEqual(summary['formset.validate_required']['calls'], 1)
+        self.assertEqual(summary['formset.validate_required']['queries'], 0)
+        self.assertEqual(summary['form.validate_value_field']['calls'], 2)
+        self.assertEqual(summary['form.regex']['calls'], 2)
+        self.assertEqual(summary['form.to_python']['calls'], 2)
+        for totals in summary.values():
+            self.assertGreaterEqual(totals['duration'], 0)
@@ -0,0 +1,376 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from classifier.managers import (
+    ClassifiedQuerySet, TypedValueQuerySet, prefetch_classified
+)
+from classifier.registry import registry
+
+from testapp.models import (
+    Computer, ComputerProperty, Contact, ContactClassifier,
+    ContactClassifierLabel, PropertyClassifier
+)
+from testapp.tests.factories import (
+    UserFactory, ContactClassifierFactory, ContactClassifierLabelFactory,
+    PropertyClassifierFactory, PropertyClassifierLabelFactory,
+    ComputerFactory, ComputerPropertyFactory
+)
+
+
+class ClassifiedTypedColumnsTest(TestCase):
+
+    def setUp(self):
+        self.ram = PropertyClassifierLabelFactory(kind=PropertyClassifierFactory(
+            kind='ram',
+            value_type=PropertyClassifier.TYPES.INT
+        ))
+        self.cpu = PropertyClassifierLabelFactory(kind=PropertyClassifierFactory(
+            kind='cpu',
+            value_type=PropertyClassifier.TYPES.STRING
+        ))
+        self.released = PropertyClassifierLabelFactory(
+            kind=PropertyClassifierFactory(
+                kind='released',
+                value_type=PropertyClassifier.TYPES.DATE
+            )
+        )
+
+        self.laptop = self.create_computer('4', 'i5', '2015-01-10')
+        self.desktop = self.create_computer('16', 'i7', '2017-05-20')
+        self.server = self.create_computer('64', 'xeon', '2016-03-01')
+
+    def create_computer(self, ram, cpu, released):
+        computer = ComputerFactory()
+        ComputerPropertyFactory(computer=computer, kind=self.ram, value=ram)
+        ComputerPropertyFactory(computer=computer, kind=self.cpu, value=cpu)
+        ComputerPropertyFactory(
+            computer=computer,
+            kind=self.released,
+            value=released
+        )
+
+        return computer
+
+    def test_numeric_lookup(self):
+        self.assertEqual(
+            set(Computer.objects.classified('properties', ram__gte=16)),
+            {self.desktop, self.server}
+        )
+
+    def test_string_value_converted(self):
+        self.assertEqual(
+            list(Computer.objects.classified('properties', ram__lt='10')),
+            [self.laptop]
+        )
+
+    def test_several_kinds_in_one_query(self):
+        with self.assertNumQueries(1):
+            computers = list(Computer.objects.classified(
+                'properties',
+                ram__gte=8,
+                cpu__startswith='i',
+                released__gt=date(2016, 1, 1),
+            ))
+
+        self.assertEqual(computers, [self.desktop])
+
+    def test_in_lookup(self):
+        self.assertEqual(
+            set(Computer.objects.classified('properties', ram__in=['4', 64])),
+            {self.laptop, self.server}
+        )
+
+    def test_unknown_kind(self):
+        with self.assertRaisesMessage(ValueError, '"gpu"'):
+            Computer.objects.classified('properties', gpu='gtx')
+
+
+class ClassifiedCastTest(TestCase):
+
+    def setUp(self):
+        age = ContactClassifierLabelFactory(classifier=ContactClassifierFactory(
+            kind='age',
+            value_type=ContactClassifier.TYPES.INT
+        ))
+        phone = ContactClassifierLabelFactory(
+            classifier=ContactClassifierFactory(kind='phone')
+        )
+        subscribed = ContactClassifierLabelFactory(
+            classifier=ContactClassifierFactory(
+                kind='subscribed',
+                value_type=ContactClassifier.TYPES.BOOLEAN
+            )
+        )
+
+        self.user1 = UserFactory(username='user1')
+        self.user1.contacts.create(kind=age, value='25')
+        self.user1.contacts.create(kind=phone, value='+380501234567')
+        self.user1.contacts.create(kind=subscribed, value='yes')
+
+        self.user2 = UserFactory(username='user2')
+        self.user2.contacts.create(kind=age, value='35')
+        self.user2.contacts.create(kind=phone, value='+380671234567')
+        self.user2.contacts.create(kind=subscribed, value='')
+
+        self.users = ClassifiedQuerySet(get_user_model())
+
+    def test_cast_int(self):
+        self.assertEqual(
+            list(self.users.classified(
+                'contacts',
+                phone__startswith='+380',
+                age__gte=30
+            )),
+            [self.user2]
+        )
+
+    def test_bool(self):
+        self.assertEqual(
+            list(self.users.classified('contacts', subscribed=True)),
+            [self.user1]
+        )
+
+
+class CanonicalLookupTest(TestCase):
+
+    def setUp(self):
+        self.mac = PropertyClassifierLabelFactory(kind=PropertyClassifierFactory(
+            kind='mac',
+            value_normalizer='casefold'
+        ))
+        self.computer1 = ComputerFactory()
+        self.value1 = ComputerPropertyFactory(
+            computer=self.computer1,
+            kind=self.mac,
+            value='00:1A:2B'
+        )
+        self.computer2 = ComputerFactory()
+        self.value2 = ComputerPropertyFactory(
+            computer=self.computer2,
+            kind=self.mac,
+            value='00:1a:2c'
+        )
+
+    def test_filter_canonical(self):
+        self.assertEqual(
+            list(ComputerProperty.objects.filter_canonical('mac', '00:1a:2b ')),
+            [self.value1]
+        )
+        with self.assertRaisesMessage(ValueError, '"cpu"'):
+            ComputerProperty.objects.filter_canonical('cpu', '00:1a:2b')
+
+    def test_classified(self):
+        computers = Computer.objects.all()
+        self.assertEqual(
+            list(computers.classified('properties', mac=' 00:1A:2C')),
+            [self.computer2]
+        )
+        self.assertEqual(
+            list(computers.classified(
+                'properties',
+                mac__in=['00:1A:2B', '00:1A:2C']
+            ).order_by('pk')),
+            [self.computer1, self.computer2]
+        )
+        # other lookups use raw value
+        self.assertEqual(
+            list(computers.classified('properties', mac__regex='^00:1A')),
+            [self.computer1]
+        )
+
+
+class AggregateClassifiedTest(TestCase):
+
+    def setUp(self):
+        ram = PropertyClassifierFactory(
+            kind='ram',
+            value_type=PropertyClassifier.TYPES.INT
+        )
+        self.ram = PropertyClassifierLabelFactory(kind=ram, label='RAM')
+        self.swap = PropertyClassifierLabelFactory(kind=ram, label='Swap')
+        self.released = PropertyClassifierLabelFactory(
+            kind=PropertyClassifierFactory(
+                kind='released',
+                value_type=PropertyClassifier.TYPES.DATE
+            )
+        )
+        self.cpu = PropertyClassifierLabelFactory(kind=PropertyClassifierFactory(
+            kind='cpu',
+            value_type=PropertyClassifier.TYPES.STRING
+        ))
+
+        for value in ['2', '4', '8', '16', 'wrong']:
+            ComputerPropertyFactory(kind=self.ram, value=value)
+        ComputerPropertyFactory(kind=self.swap, value='32')
+        ComputerPropertyFactory(kind=self.released, value='2017-05-01')
+        ComputerPropertyFactory(kind=self.released, value='2018-01-02')
+        ComputerPropertyFactory(kind=self.cpu, value='i5')
+        ComputerPropertyFactory(kind=self.cpu, value='i7')
+
+    def test_by_kind(self):
+        with self.assertNumQueries(1):
+            result = ComputerProperty.objects.aggregate_classified(
+                histograms={'ram': ['0', 4, 16, 64]}
+            )
+
+        self.assertEqual(list(result), ['ram', 'released', 'cpu'])
+        self.assertEqual(result['ram'], {
+            'count': 5,
+            'min': 2,
+            'max': 32,
+            'avg': 12.4,
+            'histogram': [1, 2, 2],
+        })
+        self.assertEqual(result['released'], {
+            'count': 2,
+            'min': date(2017, 5, 1),
+            'max': date(2018, 1, 2),
+            'avg': None,
+            'histogram': [],
+        })
+        self.assertEqual(result['cpu']['min'], 'i5')
+        self.assertEqual(result['cpu']['max'], 'i7')
+
+    def test_by_label(self):
+        result = ComputerProperty.objects.filter(
+            value_int__lt=16
+        ).aggregate_classified(group_by='label', kinds=['ram'])
+
+        self.assertEqual(list(result), ['ram'])
+        self.assertEqual(result['ram']['RAM']['count'], 3)
+        self.assertEqual(result['ram']['RAM']['avg'], 14 / 3.0)
+        self.assertEqual(result['ram']['Swap']['count'], 0)
+        self.assertIsNone(result['ram']['Swap']['max'])
+
+    def test_cast(self):
+        age = ContactClassifierLabelFactory(classifier=ContactClassifierFactory(
+            kind='age',
+            value_type=ContactClassifier.TYPES.INT
+        ))
+        user = UserFactory()
+        user.contacts.create(kind=age, value='25')
+        user.contacts.create(kind=age, value='35')
+        user.contacts.create(kind=age, value='')
+
+        result = TypedValueQuerySet(Contact).aggregate_classified()
+
+        self.assertEqual(result['age']['count'], 2)
+        self.assertEqual(result['age']['min'], 25)
+        self.assertEqual(result['age']['avg'], 30.0)
+
+    def test_bool(self):
+        ssd = PropertyClassifierLabelFactory(kind=PropertyClassifierFactory(
+            kind='ssd',
+            value_type=PropertyClassifier.TYPES.BOOLEAN
+        ))
+        ComputerPropertyFactory(kind=ssd, value='true')
+        ComputerPropertyFactory(kind=ssd, value='yes')
+
+        with CaptureQueriesContext(connection) as queries:
+            result = ComputerProperty.objects.aggregate_classified(
+                kinds=['ssd']
+            )
+
+        self.assertEqual(result['ssd'], {
+            'count': 2,
+            'min': None,
+            'max': None,
+            'avg': None,
+            'histogram': [],
+        })
+        self.assertNotIn('MIN(', queries[0]['sql'])
+        self.assertNotIn('MAX(', queries[0]['sql'])
+
+    def test_wrong_group_by(self):
+        self.assertRaises(
+            ValueError,
+            ComputerProperty.objects.aggregate_classified,
+            group_by='computer'
+        )
+
+    def test_no_kinds(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                ComputerProperty.objects.aggregate_classified(kinds=[]),
+                {}
+            )
+
+
+class PrefetchClassifiedTest(TestCase):
+
+    def setUp(self):
+        self.age = ContactClassifierLabelFactory(
+            label='Age',
+            classifier=ContactClassifierFactory(
+                kind='age',
+                value_type=ContactClassifier.TYPES.INT
+            )
+        )
+        phone = ContactClassifierFactory(kind='phone')
+        self.mobile = ContactClassifierLabelFactory(
+            label='Mobile',
+            classifier=phone
+        )
+        self.work = ContactClassifierLabelFactory(label='Work', classifier=phone)
+
+        self.user1 = UserFactory(username='user1')
+        self.user1.contacts.create(kind=self.age, value='25')
+        self.user1.contacts.create(kind=self.mobile, value='+380501234567')
+        self.user1.contacts.create(kind=self.work, value='+380441234567')
+
+        self.user2 = UserFactory(username='user2')
+        self.user2.contacts.create(kind=self.age, value='unknown')
+
+        self.user3 = UserFactory(username='user3')
+        registry.get_schema(ContactClassifierLabel)
+
+    def get_users(self):
+        return get_user_model().objects.order_by('pk')
+
+    def test_mapping(self):
+        user1, user2, user3 = prefetch_classified(self.get_users(), 'contacts')
+
+        self.assertEqual(
+            user1.classified,
+            {
+                'age': {'Age': 25},
+                'phone': {
+                    'Mobile': '+380501234567',
+                    'Work': '+380441234567',
+                },
+            }
+        )
+        self.assertEqual(user2.classified, {'age': {'Age': 'unknown'}})
+        self.assertEqual(user3.classified, {})
+
+    def test_queries(self):
+        with self.assertNumQueries(2):
+            users = prefetch_classified(self.get_users(), 'contacts')
+            for user in users:
+                for contact in user.contacts.all():
+                    contact.kind.get_classifier_instance()
+
+    def test_to_attr(self):
+        user = prefetch_classified(
+            [self.user2],
+            'contacts',
+            to_attr='contacts_map'
+        )[0]
+        self.assertEqual(user.contacts_map, {'age': {'Age': 'unknown'}})
+
+    def test_last_value_of_label(self):
+        self.user1.contacts.create(kind=self.age, value='26')
+        user = prefetch_classified([self.user1], 'contacts')[0]
+
+        self.assertEqual(user.classified['age'], {'Age': 26})
+
+    def test_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                prefetch_classified(self.get_users().none(), 'contacts'),
+                []
+            )
@@ -0,0 +1,193 @@
+from datetime import date
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from classifier.materialization import WideTable, get_wide_tables
+
+from testapp.models import ComputerProperty, PropertyClassifier
+from testapp.tests.factories import (
+    PropertyClassifierFactory, PropertyClassifierLabelFactory,
+    ComputerFactory, ComputerPropertyFactory
+)
+
+
+@override_settings(CLASSIFIER_WIDE_TABLES={'testapp.ComputerProperty': {}})
+class WideTableTest(TransactionTestCase):
+
+    def setUp(self):
+        self.ram = PropertyClassifierLabelFactory(
+            label='RAM',
+            kind=PropertyClassifierFactory(
+                kind='ram',
+                value_type=PropertyClassifier.TYPES.INT
+            )
+        )
+        self.released = PropertyClassifierLabelFactory(
+            label='Released',
+            kind=PropertyClassifierFactory(
+                kind='released',
+                value_type=PropertyClassifier.TYPES.DATE
+            )
+        )
+        self.computer = ComputerFactory()
+        ComputerPropertyFactory(
+            computer=self.computer,
+            kind=self.ram,
+            value='16'
+        )
+        ComputerPropertyFactory(
+            computer=self.computer,
+            kind=self.released,
+            value='2016-08-29'
+        )
+
+        self.wide_table = get_wide_tables()[ComputerProperty]
+        self.addCleanup(self.wide_table.drop)
+
+    def get_rows(self):
+        return list(
+            self.wide_table.get_model().objects
+            .order_by('owner')
+            .values('owner', 'ram', 'released')
+        )
+
+    def test_no_table(self):
+        self.assertIsNone(self.wide_table.get_model())
+        # refresh without table does nothing
+        ComputerPropertyFactory(computer=self.computer, kind=self.ram, value='8')
+
+    def test_rebuild(self):
+        self.assertEqual(self.wide_table.rebuild(), 1)
+        self.assertEqual(
+            self.get_rows(),
+            [{'owner': self.computer.pk, 'ram': 16, 'released': date(2016, 8, 29)}]
+        )
+
+    def test_refresh_on_save(self):
+        self.wide_table.rebuild()
+        computer = ComputerFactory()
+        obj = ComputerPropertyFactory(computer=computer, kind=self.ram, value='8')
+
+        self.assertEqual(
+            self.get_rows()[1],
+            {'owner': computer.pk, 'ram': 8, 'released': None}
+        )
+
+        obj.value = '32'
+        obj.save()
+        self.assertEqual(self.get_rows()[1]['ram'], 32)
+
+    def test_owner_changed(self):
+        self.wide_table.rebuild()
+        computer = ComputerFactory()
+        obj = ComputerProperty.objects.get(kind=self.ram)
+
+        obj.computer = computer
+        obj.save()
+
+        self.assertEqual(
+            [(row['owner'], row['ram']) for row in self.get_rows()],
+            [(self.computer.pk, None), (computer.pk, 16)]
+        )
+
+    def test_aware_datetime(self):
+        booted = PropertyClassifierLabelFactory(
+            label='Booted',
+            kind=PropertyClassifierFactory(
+                kind='booted',
+                value_type=PropertyClassifier.TYPES.DATETIME
+            )
+        )
+        value_columns = self.wide_table.get_value_columns(
+            self.wide_table.get_columns()
+        )
+
+        row = self.wide_table.build_row(
+            [(booted.pk, '2018-01-02T10:20:30')],
+            value_columns
+        )
+
+        self.assertTrue(timezone.is_aware(row['booted']))
+
+    def test_last_value_used(self):
+        self.wide_table.rebuild()
+        ComputerPropertyFactory(computer=self.computer, kind=self.ram, value='8')
+
+        self.assertEqual(self.get_rows()[0]['ram'], 8)
+
+    def test_refresh_on_delete(self):
+        self.wide_table.rebuild()
+        ComputerProperty.objects.get(kind=self.ram).delete()
+        self.assertIsNone(self.get_rows()[0]['ram'])
+
+        ComputerProperty.objects.get(kind=self.released).delete()
+        self.assertEqual(self.get_rows(), [])
+
+    def test_new_kind_before_rebuild(self):
+        self.wide_table.rebuild()
+        cpu = PropertyClassifierLabelFactory(
+            label='CPU',
+            kind=PropertyClassifierFactory(kind='cpu')
+        )
+        ComputerPropertyFactory(computer=self.computer, kind=cpu, value='i7')
+        self.assertEqual(self.get_rows()[0]['ram'], 16)
+
+        self.wide_table.rebuild()
+        self.assertEqual(
+            self.wide_table.get_model().objects.get().cpu,
+            'i7'
+        )
+
+    def test_rebuilt_by_other_process(self):
+        self.wide_table.rebuild()
+        hdd = PropertyClassifierLabelFactory(
+            label='HDD',
+            kind=PropertyClassifierFactory(
+                kind='hdd',
+                value_type=PropertyClassifier.TYPES.INT
+            )
+        )
+        ComputerPropertyFactory(computer=self.computer, kind=hdd, value='250')
+
+        WideTable(ComputerProperty).rebuild()
+        ComputerPropertyFactory(computer=self.computer, kind=hdd, value='500')
+
+        self.assertEqual(self.wide_table.get_model().objects.get().hdd, 500)
+
+    def test_no_table_introspected_once(self):
+        self.assertIsNone(self.wide_table.get_model())
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.wide_table.get_model())
+
+    def test_per_label(self):
+        PropertyClassifierLabelFactory(label='Memory', kind=self.ram.kind)
+        wide_table = WideTable(
+            ComputerProperty,
+            per_label=True,
+            table_name='testapp_computer_labels'
+        )
+
+        self.assertEqual(
+            list(wide_table.get_columns()),
+            ['ram_ram', 'released_released', 'ram_memory']
+        )
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('classifier_rebuild_wide_tables', stdout=stdout)
+
+        self.assertEqual(
+            stdout.getvalue(),
+            'testapp_computerproperty_wide: 1 rows\n'
+        )
+        self.assertRaises(
+            CommandError,
+            call_command,
+            'classifier_rebuild_wide_tables',
+            'testapp.Contact'
+        )
@@ -1,15 +1,32 @@
 from datetime import date, datetime
+from decimal import Decimal
+import uuid
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.test import TestCase
-from classifier.exceptions import ClassifierModelNotFound
+from django.utils import timezone
+from classifier.exceptions import (
+    ClassifierLabelModelNotFound, ClassifierModelNotFound, NormalizerNotFound,
+    ValueTypeNotFound
+)
+from classifier.models import (
+    ClassifierAbstract, ClassifierLabelAbstract, ClassifierValueAbstract,
+    TypedValueDescriptor
+)
+from classifier.normalizers import (
+    normalize_casefold, normalize_digits, normalize_e164, normalize_strip,
+    normalizers
+)
+from classifier.value_types import value_types
 
 from testapp.models import (
-    ContactClassifier, ContactClassifierLabel,
+    ContactClassifier, ContactClassifierLabel, DoubledContactClassifier,
     PropertyClassifier, PropertyClassifierLabel,
-    MagicClassifierLabel
+    MagicClassifierLabel, ComputerProperty, Contact
 )
 from testapp.tests.factories import (
     ContactClassifierFactory, ContactClassifierLabelFactory,
-    PropertyClassifierFactory, PropertyClassifierLabelFactory
+    PropertyClassifierFactory, PropertyClassifierLabelFactory,
+    ComputerPropertyFactory
 )
 
 
@@ -103,6 +120,58 @@ class ClassifierToDateTimeTest(TestCase):
         self.assertRaises(ValueError, self.classifier.to_python, 'abc')
 
 
+class ClassifierValueValidatorTest(TestCase):
+
+    def setUp(self):
+        self.classifier = ContactClassifierFactory(value_validator=r'\d+')
+
+    def test_compiled_once(self):
+        regex = self.classifier.get_value_validator_regex()
+
+        self.assertTrue(regex.match('123'))
+        self.assertIs(self.classifier.get_value_validator_regex(), regex)
+        self.assertIs(
+            ContactClassifier.objects.get().get_value_validator_regex(),
+            regex
+        )
+
+    def test_save_without_changes(self):
+        regex = self.classifier.get_value_validator_regex()
+        self.classifier.save()
+
+        self.assertIs(self.classifier.get_value_validator_regex(), regex)
+
+    def test_save_with_changed_validator(self):
+        self.classifier.get_value_validator_regex()
+        self.classifier.value_validator = r'[a-z]+'
+        self.classifier.save()
+
+        regex = self.classifier.get_value_validator_regex()
+        self.assertEqual(regex.pattern, r'[a-z]+')
+
+    def test_blank_validator(self):
+        self.classifier.value_validator = ''
+
+        self.assertIsNone(self.classifier.get_value_validator_regex())
+
+    def test_wrong_validator_rejected_on_save(self):
+        self.classifier.value_validator = r'(\d+'
+
+        self.assertRaises(ValidationError, self.classifier.save)
+        self.assertEqual(
+            ContactClassifier.objects.get().value_validator,
+            r'\d+'
+        )
+
+    def test_wrong_validator_rejected_on_full_clean(self):
+        self.classifier.value_validator = r'[a-'
+
+        with self.assertRaises(ValidationError) as cm:
+            self.classifier.full_clean()
+
+        self.assertIn('value_validator', cm.exception.message_dict)
+
+
 class ClassifierLabelRelationMethodsTest(TestCase):
 
     def test_with_related_name_get_classifier_model(self):
@@ -146,3 +215,529 @@ class ClassifierLabelRelationMethodsTest(TestCase):
             ClassifierModelNotFound,
             MagicClassifierLabel.get_classifier_model
         )
+
+
+class ClassifierValueTypedColumnsTest(TestCase):
+
+    def create_property(self, value_type, value):
+        classifier = PropertyClassifierFactory(value_type=value_type)
+        label = PropertyClassifierLabelFactory(kind=classifier)
+
+        return ComputerPropertyFactory(kind=label, value=value)
+
+    def assertTypedValue(self, obj, fieldname, value):
+        obj.refresh_from_db()
+        for typed_fieldname in ComputerProperty.TYPED_VALUE_FIELDS.values():
+            self.assertEqual(
+                getattr(obj, typed_fieldname),
+                value if typed_fieldname == fieldname else None
+            )
+
+    def test_int(self):
+        obj = self.create_property(PropertyClassifier.TYPES.INT, '11')
+        self.assertTypedValue(obj, 'value_int', 11)
+
+    def test_float(self):
+        obj = self.create_property(PropertyClassifier.TYPES.FLOAT, '2.5')
+        self.assertTypedValue(obj, 'value_float', 2.5)
+
+    def test_bool(self):
+        obj = self.create_property(PropertyClassifier.TYPES.BOOLEAN, 'yes')
+        self.assertTypedValue(obj, 'value_bool', True)
+
+    def test_date(self):
+        obj = self.create_property(PropertyClassifier.TYPES.DATE, '2016-08-29')
+        self.assertTypedValue(obj, 'value_date', date(2016, 8, 29))
+
+    def test_datetime(self):
+        obj = self.create_property(
+            PropertyClassifier.TYPES.DATETIME,
+            '2016-08-29 10:13:29'
+        )
+        self.assertTypedValue(
+            obj,
+            'value_datetime',
+            timezone.make_aware(datetime(2016, 8, 29, 10, 13, 29))
+        )
+
+    def test_string(self):
+        obj = self.create_property(PropertyClassifier.TYPES.STRING, 'abc')
+        self.assertTypedValue(obj, None, None)
+
+    def test_wrong_value(self):
+        obj = self.create_property(PropertyClassifier.TYPES.INT, 'abc')
+        self.assertTypedValue(obj, None, None)
+
+    def test_value_type_changed(self):
+        obj = self.create_property(PropertyClassifier.TYPES.INT, '11')
+        classifier = obj.kind.kind
+        classifier.value_type = PropertyClassifier.TYPES.FLOAT
+        classifier.save()
+
+        obj = ComputerProperty.objects.get(pk=obj.pk)
+        obj.save()
+        self.assertTypedValue(obj, 'value_float', 11.)
+
+    def test_range_lookup(self):
+        classifier = PropertyClassifierFactory(
+            value_type=PropertyClassifier.TYPES.FLOAT
+        )
+        label = PropertyClassifierLabelFactory(kind=classifier)
+        for value in ['1.6', '2.0', '2.4', '3.0']:
+            ComputerPropertyFactory(kind=label, value=value)
+
+        self.assertEqual(
+            sorted(
+                ComputerProperty.objects
+                .filter(value_float__gt=2.0)
+                .values_list('value', flat=True)
+            ),
+            ['2.4', '3.0']
+        )
+
+
+class ClassifierSchemaVersionTest(TestCase):
+
+    def setUp(self):
+        ContactClassifierFactory()
+        self.classifier = ContactClassifier.objects.get()
+
+    def assertVersion(self, version):
+        self.assertEqual(self.classifier.schema_version, version)
+        self.classifier.refresh_from_db()
+        self.assertEqual(self.classifier.schema_version, version)
+
+    def test_new(self):
+        self.assertVersion(1)
+
+    def test_value_type_changed(self):
+        self.classifier.value_type = ContactClassifier.TYPES.INT
+        self.classifier.save()
+        self.assertVersion(2)
+
+    def test_concurrent_changes(self):
+        other = ContactClassifier.objects.get(pk=self.classifier.pk)
+        self.classifier.value_type = ContactClassifier.TYPES.INT
+        self.classifier.save()
+        other.value_validator = r'^\d+$'
+        other.save()
+
+        self.assertEqual(other.schema_version, 3)
+        self.classifier.refresh_from_db()
+        self.assertEqual(self.classifier.schema_version, 3)
+
+    def test_value_validator_changed(self):
+        self.classifier.value_validator = r'^\d+$'
+        self.classifier.save(update_fields=['value_validator'])
+        self.assertVersion(2)
+
+        self.classifier.value_validator = r'^\d+$'
+        self.classifier.save()
+        self.assertVersion(2)
+
+    def test_other_field_changed(self):
+        self.classifier.kind = 'email'
+        self.classifier.save()
+        self.assertVersion(1)
+
+    def test_validated_version(self):
+        self.classifier.value_type = ContactClassifier.TYPES.INT
+        self.classifier.save()
+        label = PropertyClassifierLabelFactory(kind=PropertyClassifierFactory(
+            value_type=PropertyClassifier.TYPES.INT,
+            schema_version=3
+        ))
+
+        valid = ComputerPropertyFactory(kind=label, value='1')
+        invalid = ComputerPropertyFactory(kind=label, value='a')
+
+        self.assertEqual(valid.validated_version, 3)
+        self.assertIsNone(invalid.validated_version)
+
+
+class TypedValueTest(TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def to_python_counted(value):
+            self.calls.append(value)
+            return int(value)
+
+        value_types.register('counted', to_python_counted)
+        self.addCleanup(value_types.unregister, 'counted')
+
+        self.label = PropertyClassifierLabelFactory(
+            kind=PropertyClassifierFactory(kind='ram', value_type='counted')
+        )
+        self.obj = ComputerPropertyFactory(kind=self.label, value='8')
+        self.calls[:] = []
+
+    def test_memoized(self):
+        obj = ComputerProperty.objects.get(pk=self.obj.pk)
+
+        self.assertEqual(obj.typed_value, 8)
+        self.assertEqual(obj.typed_value, 8)
+        self.assertEqual(self.calls, ['8'])
+
+    def test_value_changed(self):
+        self.assertEqual(self.obj.typed_value, 8)
+        self.obj.value = '16'
+
+        self.assertEqual(self.obj.typed_value, 16)
+        self.assertEqual(self.calls, ['8', '16'])
+
+    def test_label_changed(self):
+        self.assertEqual(self.obj.typed_value, 8)
+        self.obj.kind = PropertyClassifierLabelFactory(
+            kind=PropertyClassifierFactory(
+                kind='model',
+                value_type=PropertyClassifier.TYPES.STRING
+            )
+        )
+
+        self.assertEqual(self.obj.typed_value, '8')
+
+    def test_wrong_value(self):
+        self.obj.value = 'abc'
+        self.assertEqual(self.obj.typed_value, 'abc')
+
+    def test_with_typed_values(self):
+        ComputerPropertyFactory(kind=self.label, value='16')
+        self.calls[:] = []
+
+        with self.assertNumQueries(1):
+            objs = list(
+                ComputerProperty.objects.with_typed_values().order_by('pk')
+            )
+            self.assertEqual([obj.typed_value for obj in objs], [8, 16])
+            self.assertEqual(objs[0].kind.kind.kind, 'ram')
+
+        self.assertEqual(self.calls, ['8', '16'])
+
+    def test_other_model(self):
+        label = ContactClassifierLabelFactory(classifier=ContactClassifierFactory(
+            kind='age',
+            value_type=ContactClassifier.TYPES.INT
+        ))
+        contact = Contact(kind=label, value='30')
+
+        self.assertEqual(TypedValueDescriptor().__get__(contact, Contact), 30)
+
+
+class BatchConversionTest(TestCase):
+
+    def assertSameAsSingle(self, value_type, values):
+        classifier = ContactClassifier(kind='test', value_type=value_type)
+        result = classifier.to_python_many(iter(values))
+
+        expected = []
+        errors = []
+        for i, value in enumerate(values):
+            try:
+                expected.append(classifier.to_python(value))
+            except ValueError:
+                expected.append(None)
+                errors.append(i)
+        self.assertEqual(result.values, expected)
+        self.assertEqual(sorted(result.errors), errors)
+
+        return result
+
+    def test_int(self):
+        result = self.assertSameAsSingle('int', ['1', ' 2', '-3'])
+        self.assertEqual(result.errors, {})
+
+        result = self.assertSameAsSingle('int', ['1', 'abc', '', '4'])
+        self.assertEqual(sorted(result.errors), [1, 2])
+        self.assertIsInstance(result.errors[1], ValueError)
+
+    def test_float(self):
+        self.assertSameAsSingle('float', ['1.5', '2', 'x'])
+
+    def test_str(self):
+        self.assertSameAsSingle('str', ['a', ''])
+
+    def test_bool(self):
+        self.assertSameAsSingle('bool', ['yes', 'On', '', 'maybe'])
+
+    def test_date(self):
+        result = self.assertSameAsSingle('date', [
+            '2018-01-02',
+            '2018-1-2',
+            '20180102',
+            '2018-02-30',
+            '2018-aa-01',
+            '',
+        ])
+        self.assertEqual(result.values[0], date(2018, 1, 2))
+
+    def test_datetime(self):
+        result = self.assertSameAsSingle('datetime', [
+            '2018-01-02T10:20:30',
+            '2018-01-02 10:20:30.123456',
+            '2018-01-02T10:20:30+02:00',
+            '2018-01-02T10:20:30.123456-01:30',
+            '2018-01-02T10:20:30Z',
+            '2018-01-02T10:20',
+            '2018-01-02T25:20:30',
+            '2018-01-02',
+        ])
+        self.assertEqual(
+            result.values[2],
+            datetime(2018, 1, 2, 8, 20, 30, tzinfo=timezone.utc)
+        )
+
+    def test_overridden_converter(self):
+        class Classifier(ClassifierAbstract):
+            class Meta:
+                abstract = True
+
+            @staticmethod
+            def to_python_int(value):
+                return int(value) * 2
+
+        converter, is_method = Classifier.resolve_converter('int')
+        self.assertFalse(is_method)
+        self.assertEqual(converter('1'), 2)
+
+    def test_overridden_converter_method(self):
+        classifier = DoubledContactClassifier(kind='test', value_type='int')
+        self.assertEqual(classifier.to_python('2'), 4)
+
+        result = classifier.to_python_many(['1', 'a'])
+        self.assertEqual(result.values, [2, None])
+        self.assertEqual(list(result.errors), [1])
+
+    def test_registered_without_batch_converter(self):
+        value_types.register('uuid', uuid.UUID)
+        self.addCleanup(value_types.unregister, 'uuid')
+
+        result = self.assertSameAsSingle('uuid', [
+            '12345678-1234-5678-1234-567812345678',
+            'abc',
+        ])
+        self.assertEqual(list(result.errors), [1])
+
+    def test_array_without_dtype(self):
+        classifier = ContactClassifier(kind='test', value_type='str')
+        self.assertRaises(
+            ValueError,
+            classifier.to_python_many,
+            ['a'],
+            as_array=True
+        )
+
+    def test_array(self):
+        try:
+            import numpy
+        except ImportError:
+            classifier = ContactClassifier(kind='test', value_type='int')
+            self.assertRaises(
+                ImproperlyConfigured,
+                classifier.to_python_many,
+                ['1'],
+                as_array=True
+            )
+            return
+
+        classifier = ContactClassifier(kind='test', value_type='int')
+        result = classifier.to_python_many(['1', 'a', '3'], as_array=True)
+        self.assertEqual(result.values.dtype, numpy.int64)
+        self.assertEqual(result.values.sum(), 4)
+        self.assertEqual(list(result.values.mask), [False, True, False])
+
+        classifier = ContactClassifier(kind='test', value_type='datetime')
+        result = classifier.to_python_many(
+            ['2018-01-02T10:20:30+02:00'],
+            as_array=True
+        )
+        self.assertEqual(
+            result.values[0],
+            numpy.datetime64('2018-01-02T08:20:30')
+        )
+
+
+class ValueTypeRegistryTest(TestCase):
+
+    def setUp(self):
+        value_types.register(
+            'decimal',
+            Decimal,
+            'Decimal',
+            typed_field='value_float'
+        )
+        self.addCleanup(value_types.unregister, 'decimal')
+
+    def test_choices(self):
+        choices = ContactClassifier._meta.get_field('value_type').choices
+        self.assertIn(('decimal', 'Decimal'), choices)
+
+    def test_to_python(self):
+        classifier = ContactClassifier(kind='test', value_type='decimal')
+        self.assertEqual(classifier.to_python('1.10'), Decimal('1.10'))
+
+    def test_builtin_converter(self):
+        classifier = ContactClassifier(kind='test', value_type='int')
+        self.assertIs(
+            classifier.get_converter('int'),
+            value_types.get('int').converter
+        )
+        self.assertEqual(classifier.to_python('11'), 11)
+
+    def test_replaced_converter(self):
+        original = value_types.get('int')
+        value_types.register('int', lambda value: 0)
+        self.addCleanup(
+            value_types.register,
+            original.name,
+            original.converter,
+            original.label,
+            batch_converter=original.batch_converter,
+            typed_field=original.typed_field,
+            dtype=original.dtype
+        )
+
+        classifier = ContactClassifier(kind='test', value_type='int')
+        self.assertEqual(classifier.get_converter('int')('11'), 0)
+
+    def test_not_registered(self):
+        classifier = ContactClassifier(kind='test', value_type='uuid')
+        self.assertRaises(ValueTypeNotFound, classifier.to_python, 'abc')
+
+    def test_unregistered(self):
+        classifier = ContactClassifier(kind='test', value_type='decimal')
+        classifier.get_converter('decimal')
+        value_types.unregister('decimal')
+        self.addCleanup(value_types.register, 'decimal', Decimal)
+
+        self.assertRaises(
+            ValueTypeNotFound,
+            classifier.get_converter,
+            'decimal'
+        )
+
+    def test_typed_column(self):
+        classifier = PropertyClassifierFactory(value_type='decimal')
+        label = PropertyClassifierLabelFactory(kind=classifier)
+        obj = ComputerPropertyFactory(kind=label, value='2.5')
+        obj.refresh_from_db()
+
+        self.assertEqual(obj.value_float, 2.5)
+
+
+class NormalizersTest(TestCase):
+
+    def test_builtin(self):
+        self.assertEqual(normalize_strip(' a b '), 'a b')
+        self.assertEqual(normalize_casefold(' Foo@Example.COM '), 'foo@example.com')
+        self.assertEqual(normalize_digits('AB-12 34'), '1234')
+
+    def test_e164(self):
+        for value in ['+38 (050) 123-45-67', '0038 050 1234567']:
+            self.assertEqual(normalize_e164(value), '+380501234567')
+
+        for value in ['050 123 45 67', '+0501234567', '+123', 'abc']:
+            self.assertRaises(ValueError, normalize_e164, value)
+
+    def test_classifier(self):
+        classifier = ContactClassifier(kind='email')
+        self.assertEqual(classifier.normalize(' A@b.c '), ' A@b.c ')
+
+        classifier.value_normalizer = 'casefold'
+        self.assertEqual(classifier.normalize(' A@b.c '), 'a@b.c')
+
+        classifier.value_normalizer = 'unknown'
+        self.assertRaises(NormalizerNotFound, classifier.normalize, 'a')
+
+    def test_register(self):
+        normalizers.register('upper', lambda value: value.upper(), 'Upper')
+        self.addCleanup(normalizers.unregister, 'upper')
+
+        choices = ContactClassifier._meta.get_field('value_normalizer').choices
+        self.assertIn(('upper', 'Upper'), choices)
+        self.assertEqual(
+            ContactClassifier(value_normalizer='upper').normalize('a'),
+            'A'
+        )
+
+    def test_schema_version(self):
+        classifier = PropertyClassifierFactory()
+        classifier = PropertyClassifier.objects.get(pk=classifier.pk)
+        classifier.value_normalizer = 'strip'
+        classifier.save()
+
+        self.assertEqual(classifier.schema_version, 2)
+
+    def test_canonical_column(self):
+        classifier = PropertyClassifierFactory(
+            kind='mac',
+            value_normalizer='casefold'
+        )
+        label = PropertyClassifierLabelFactory(kind=classifier)
+        obj = ComputerPropertyFactory(kind=label, value=' 00:1A:2B ')
+        self.assertEqual(obj.value_canonical, '00:1a:2b')
+
+        classifier.value_normalizer = 'e164'
+        classifier.save()
+        obj = ComputerProperty.objects.get(pk=obj.pk)
+        obj.save()
+        self.assertIsNone(obj.value_canonical)
+        self.assertIsNone(obj.validated_version)
+
+
+class ClassifierValueRelationMethodsTest(TestCase):
+
+    def test_get_classifier_label_related_field(self):
+        self.assertEqual(
+            ComputerProperty.get_classifier_label_related_field().name,
+            'kind'
+        )
+
+    def test_get_classifier_instance(self):
+        classifier = PropertyClassifierFactory()
+        label = PropertyClassifierLabelFactory(kind=classifier)
+        obj = ComputerPropertyFactory(kind=label)
+
+        self.assertEqual(obj.get_classifier_label(), label)
+        self.assertEqual(obj.get_classifier_instance(), classifier)
+
+    def test_no_relation_to_label(self):
+        self.assertRaises(
+            ClassifierLabelModelNotFound,
+            ClassifierValueAbstract.get_classifier_label_related_field
+        )
+
+
+class ClassifierRelationsPreparedTest(TestCase):
+
+    def get_prepared(self, model):
+        return model.__dict__['_classifier_related_fields']
+
+    def test_label_relation_prepared(self):
+        prepared = self.get_prepared(PropertyClassifierLabel)
+
+        self.assertEqual(prepared[ClassifierAbstract].name, 'kind')
+        self.assertIs(
+            PropertyClassifierLabel.get_classifier_related_field(),
+            prepared[ClassifierAbstract]
+        )
+
+    def test_relation_to_model_defined_later_prepared(self):
+        prepared = self.get_prepared(Contact)
+
+        self.assertEqual(prepared[ClassifierLabelAbstract].name, 'kind')
+        self.assertIsNone(prepared[ClassifierAbstract])
+
+    def test_value_relation_prepared(self):
+        prepared = self.get_prepared(ComputerProperty)
+
+        self.assertIs(
+            ComputerProperty.get_classifier_label_related_field(),
+            prepared[ClassifierLabelAbstract]
+        )
+
+    def test_not_related_models_untouched(self):
+        from django.contrib.auth.models import Permission
+
+        self.assertNotIn('_classifier_related_fields', Permission.__dict__)
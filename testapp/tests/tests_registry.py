@@ -0,0 +1,306 @@
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from classifier.registry import ClassifierRegistry, ClassifierSchema, registry
+
+from testapp.forms import ContactForm
+from testapp.models import Contact, ContactClassifier, ContactClassifierLabel
+from testapp.tests.factories import (
+    UserFactory, ContactClassifierFactory, ContactClassifierLabelFactory
+)
+
+
+class ClassifierSchemaTest(TestCase):
+
+    def setUp(self):
+        self.registry = ClassifierRegistry()
+        self.classifier = ContactClassifierFactory(only_one_required=True)
+        self.label_mobile = ContactClassifierLabelFactory(
+            classifier=self.classifier,
+            label='Mobile'
+        )
+        self.label_work = ContactClassifierLabelFactory(
+            classifier=self.classifier,
+            label='Work',
+            required=True
+        )
+
+    def test_load_with_one_query(self):
+        with self.assertNumQueries(1):
+            schema = self.registry.get_schema(ContactClassifierLabel)
+            self.assertEqual(schema.classifier_model, ContactClassifier)
+            self.assertEqual(
+                schema.get_classifier(self.label_mobile.pk),
+                self.classifier
+            )
+            self.assertEqual(
+                schema.get_label(self.label_work.pk).get_classifier_instance(),
+                self.classifier
+            )
+
+    def test_required_labels(self):
+        schema = self.registry.get_schema(ContactClassifierLabel)
+
+        self.assertEqual(schema.required_labels, (self.label_work, ))
+        self.assertEqual(
+            list(schema.only_one_required.items()),
+            [(self.classifier, (self.label_mobile, self.label_work))]
+        )
+
+    def test_schema_is_stored(self):
+        schema = self.registry.get_schema(ContactClassifierLabel)
+
+        with self.assertNumQueries(0):
+            self.assertIs(
+                self.registry.get_schema(ContactClassifierLabel),
+                schema
+            )
+
+    def test_absent_label(self):
+        schema = self.registry.get_schema(ContactClassifierLabel)
+
+        self.assertIsNone(schema.get_label(-1))
+        self.assertIsNone(schema.get_classifier(-1))
+
+    def test_invalidate_by_classifier_model(self):
+        schema = self.registry.get_schema(ContactClassifierLabel)
+        self.registry.invalidate(ContactClassifier)
+
+        self.assertIsNot(
+            self.registry.get_schema(ContactClassifierLabel),
+            schema
+        )
+
+
+class ClassifierRegistrySignalsTest(TestCase):
+
+    def setUp(self):
+        self.classifier = ContactClassifierFactory()
+        self.label = ContactClassifierLabelFactory(classifier=self.classifier)
+
+    def test_invalidate_on_label_save(self):
+        schema = registry.get_schema(ContactClassifierLabel)
+        self.label.required = True
+        self.label.save()
+
+        new_schema = registry.get_schema(ContactClassifierLabel)
+        self.assertIsNot(new_schema, schema)
+        self.assertEqual(new_schema.required_labels, (self.label, ))
+
+    def test_invalidate_on_classifier_save(self):
+        schema = registry.get_schema(ContactClassifierLabel)
+        self.classifier.value_validator = r'\d+'
+        self.classifier.save()
+
+        new_schema = registry.get_schema(ContactClassifierLabel)
+        self.assertIsNot(new_schema, schema)
+        self.assertEqual(
+            new_schema.get_classifier(self.label).value_validator,
+            r'\d+'
+        )
+
+    def test_invalidate_on_label_delete(self):
+        registry.get_schema(ContactClassifierLabel)
+        label_pk = self.label.pk
+        self.label.delete()
+
+        self.assertIsNone(
+            registry.get_schema(ContactClassifierLabel).get_label(label_pk)
+        )
+
+    def test_rollback(self):
+        registry.get_schema(ContactClassifierLabel)
+
+        with self.assertRaises(RollbackError):
+            with transaction.atomic():
+                label = ContactClassifierLabelFactory(
+                    classifier=self.classifier,
+                    required=True
+                )
+                self.assertEqual(
+                    registry.get_schema(ContactClassifierLabel).required_labels,
+                    (label, )
+                )
+                raise RollbackError()
+
+        schema = registry.get_schema(ContactClassifierLabel)
+        self.assertEqual(schema.required_labels, ())
+        self.assertEqual(schema.labels, (self.label, ))
+
+    def test_rollback_of_savepoint(self):
+        with transaction.atomic():
+            self.label.required = True
+            self.label.save()
+            with self.assertRaises(RollbackError):
+                with transaction.atomic():
+                    ContactClassifierLabelFactory(classifier=self.classifier)
+                    self.assertEqual(
+                        len(registry.get_schema(ContactClassifierLabel).labels),
+                        2
+                    )
+                    raise RollbackError()
+
+            schema = registry.get_schema(ContactClassifierLabel)
+            self.assertEqual(schema.labels, (self.label, ))
+            self.assertEqual(schema.required_labels, (self.label, ))
+
+    def test_fast_delete_of_other_models(self):
+        user = UserFactory()
+        Contact.objects.create(user=user, kind=self.label, value='1')
+
+        # receivers are connected to classifier models only, so contacts
+        # are deleted without fetching them
+        with self.assertNumQueries(1):
+            Contact.objects.all().delete()
+
+
+class ClassifierRegistryCommitTest(TransactionTestCase):
+
+    def setUp(self):
+        self.classifier = ContactClassifierFactory()
+        self.label = ContactClassifierLabelFactory(classifier=self.classifier)
+
+    def tearDown(self):
+        registry.invalidate()
+
+    def test_invalidate_on_commit(self):
+        schema = registry.get_schema(ContactClassifierLabel)
+        with transaction.atomic():
+            label = ContactClassifierLabelFactory(classifier=self.classifier)
+            # schema of committed data is still used outside of transaction
+            self.assertIs(registry._schemas[ContactClassifierLabel], schema)
+
+        self.assertEqual(
+            registry.get_schema(ContactClassifierLabel).labels,
+            (self.label, label)
+        )
+
+
+class RollbackError(Exception):
+    pass
+
+
+class ClassifierFormRegistryTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        classifier = ContactClassifierFactory(value_validator=r'\+\d{5}')
+        self.label = ContactClassifierLabelFactory(classifier=classifier)
+
+    def test_classifier_read_from_registry(self):
+        registry.get_schema(ContactClassifierLabel)
+        form = ContactForm({
+            'user': self.user.pk,
+            'kind': self.label.pk,
+            'value': '+01234567890',
+        })
+
+        # user and label lookups and their validation on model level only
+        with self.assertNumQueries(4):
+            self.assertTrue(form.is_valid())
+
+
+@override_settings(
+    CLASSIFIER_SCHEMA_CACHE='schema',
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'schema': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'classifier-schema',
+        },
+    }
+)
+class ClassifierRegistryCacheTest(TransactionTestCase):
+
+    def setUp(self):
+        caches['schema'].clear()
+        self.classifier = ContactClassifierFactory(only_one_required=True)
+        self.label = ContactClassifierLabelFactory(classifier=self.classifier)
+        # registries of two different processes
+        self.registry1 = ClassifierRegistry()
+        self.registry2 = ClassifierRegistry()
+
+    def tearDown(self):
+        caches['schema'].clear()
+        registry.invalidate()
+
+    def test_snapshot_shared_between_processes(self):
+        self.registry1.get_schema(ContactClassifierLabel)
+
+        with self.assertNumQueries(0):
+            schema = self.registry2.get_schema(ContactClassifierLabel)
+            self.assertEqual(schema.labels, (self.label, ))
+            self.assertEqual(schema.get_classifier(self.label), self.classifier)
+            self.assertEqual(
+                list(schema.only_one_required),
+                [self.classifier]
+            )
+
+    def test_version_not_changed(self):
+        schema = self.registry2.get_schema(ContactClassifierLabel)
+        self.registry2.check_version()
+
+        self.assertIs(self.registry2.get_schema(ContactClassifierLabel), schema)
+
+    def test_version_changed_in_other_process(self):
+        schema = self.registry2.get_schema(ContactClassifierLabel)
+
+        # post_save signal invalidates default registry of this process
+        self.label.required = True
+        self.label.save()
+        self.registry2.check_version()
+
+        new_schema = self.registry2.get_schema(ContactClassifierLabel)
+        self.assertIsNot(new_schema, schema)
+        self.assertEqual(new_schema.required_labels, (self.label, ))
+
+    def test_rollback(self):
+        version = caches['schema'].get(ClassifierRegistry.VERSION_KEY)
+
+        with self.assertRaises(RollbackError):
+            with transaction.atomic():
+                ContactClassifierLabelFactory(
+                    classifier=self.classifier,
+                    label='Phantom'
+                )
+                self.assertEqual(
+                    len(self.registry1.get_schema(ContactClassifierLabel).labels),
+                    2
+                )
+                # version is changed on commit only
+                self.assertEqual(
+                    caches['schema'].get(ClassifierRegistry.VERSION_KEY),
+                    version
+                )
+                raise RollbackError()
+
+        self.assertEqual(
+            ClassifierRegistry().get_schema(ContactClassifierLabel).labels,
+            (self.label, )
+        )
+
+    def test_version_changed_on_commit(self):
+        version = caches['schema'].get(ClassifierRegistry.VERSION_KEY)
+        with transaction.atomic():
+            label = ContactClassifierLabelFactory(classifier=self.classifier)
+
+        self.assertNotEqual(
+            caches['schema'].get(ClassifierRegistry.VERSION_KEY),
+            version
+        )
+        self.registry2.check_version()
+        self.assertEqual(
+            self.registry2.get_schema(ContactClassifierLabel).labels,
+            (self.label, label)
+        )
+
+    def test_rows_of_other_models_structure(self):
+        rows = self.registry1.get_schema(ContactClassifierLabel).to_rows()
+        rows['label_fields'] = rows['label_fields'][:-1]
+
+        self.assertIsNone(
+            ClassifierSchema.from_rows(ContactClassifierLabel, rows)
+        )
@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from classifier import reports
+from classifier.reports import MissingRequired, MissingRequiredReport
+
+from testapp.tests.factories import (
+    UserFactory, ContactClassifierFactory, ContactClassifierLabelFactory
+)
+
+
+class MissingRequiredReportTest(TestCase):
+
+    def setUp(self):
+        self.email = ContactClassifierLabelFactory(
+            label='Email',
+            required=True,
+            classifier=ContactClassifierFactory(kind='email')
+        )
+        phone = ContactClassifierFactory(kind='phone', only_one_required=True)
+        self.mobile = ContactClassifierLabelFactory(
+            label='Mobile',
+            classifier=phone
+        )
+        self.home = ContactClassifierLabelFactory(label='Home', classifier=phone)
+        ContactClassifierLabelFactory(
+            label='Skype',
+            classifier=ContactClassifierFactory(kind='skype')
+        )
+
+        self.complete = UserFactory(username='complete')
+        self.complete.contacts.create(kind=self.email, value='a@example.com')
+        self.complete.contacts.create(kind=self.home, value='123456')
+
+        self.no_phone = UserFactory(username='no_phone')
+        self.no_phone.contacts.create(kind=self.email, value='b@example.com')
+
+        self.empty = UserFactory(username='empty')
+
+        self.no_email = UserFactory(username='no_email')
+        self.no_email.contacts.create(kind=self.mobile, value='123456')
+        self.no_email.contacts.create(kind=self.home, value='654321')
+
+    def test_missing(self):
+        report = MissingRequiredReport(get_user_model(), 'contacts')
+
+        # schema and owners
+        with self.assertNumQueries(2):
+            self.assertEqual(list(report), [
+                MissingRequired(self.no_phone.pk, [(self.mobile, self.home)]),
+                MissingRequired(self.empty.pk, [
+                    self.email,
+                    (self.mobile, self.home),
+                ]),
+                MissingRequired(self.no_email.pk, [self.email]),
+            ])
+
+    def test_chunks(self):
+        report = MissingRequiredReport(
+            get_user_model().objects.exclude(pk=self.empty.pk),
+            'contacts',
+            chunk_size=1
+        )
+
+        # schema and three chunks, last one is empty
+        with self.assertNumQueries(4):
+            self.assertEqual(
+                [missing.owner for missing in report],
+                [self.no_phone.pk, self.no_email.pk]
+            )
+
+    def test_nothing_required(self):
+        self.email.required = False
+        self.email.save()
+        self.mobile.classifier.only_one_required = False
+        self.mobile.classifier.save()
+
+        report = MissingRequiredReport(get_user_model(), 'contacts')
+        with self.assertNumQueries(1):
+            self.assertEqual(list(report), [])
+
+    def test_without_exists(self):
+        # Django < 1.11
+        self.addCleanup(setattr, reports, 'Exists', reports.Exists)
+        reports.Exists = None
+
+        self.assertRaises(
+            ImproperlyConfigured,
+            MissingRequiredReport,
+            get_user_model(),
+            'contacts'
+        )
+
+
+class MissingRequiredCommandTest(TestCase):
+
+    def setUp(self):
+        ContactClassifierLabelFactory(
+            label='Email',
+            required=True,
+            classifier=ContactClassifierFactory(kind='email')
+        )
+        self.user = UserFactory()
+
+    def test_report(self):
+        stdout = StringIO()
+        call_command(
+            'classifier_missing_required',
+            'auth.User',
+            'contacts',
+            stdout=stdout,
+            stderr=StringIO()
+        )
+
+        self.assertEqual(
+            stdout.getvalue().splitlines(),
+            ['pk,missing', '{},Email'.format(self.user.pk)]
+        )
+
+    def test_wrong_relation(self):
+        self.assertRaises(
+            CommandError,
+            call_command,
+            'classifier_missing_required',
+            'auth.User',
+            'properties',
+            stdout=StringIO(),
+            stderr=StringIO()
+        )
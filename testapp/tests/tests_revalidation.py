@@ -0,0 +1,321 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from classifier.revalidation import InvalidValue, Revalidator, validate_range
+
+from testapp.models import (
+    Contact, ContactClassifier, Computer, ComputerProperty, PropertyClassifier
+)
+from testapp.tests.factories import (
+    UserFactory, ContactClassifierFactory, ContactClassifierLabelFactory,
+    PropertyClassifierFactory, PropertyClassifierLabelFactory,
+    ComputerPropertyFactory
+)
+
+
+class InProcessPool(object):
+    """pool which runs tasks in current process"""
+
+    tasks = []
+
+    def imap_unordered(self, func, tasks):
+        for task in tasks:
+            self.tasks.append(task)
+            yield func(task)
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class AgeRevalidator(Revalidator):
+    """revalidator of ages only, its workers run in current process"""
+
+    def get_classifiers(self):
+        return dict(
+            (label_pk, classifier)
+            for label_pk, classifier in (
+                super(AgeRevalidator, self).get_classifiers().items()
+            )
+            if classifier.kind == 'age'
+        )
+
+    def get_pool(self, processes):
+        return InProcessPool()
+
+
+class RevalidatorTest(TestCase):
+
+    def setUp(self):
+        user = UserFactory()
+        self.phone = ContactClassifierFactory(kind='phone')
+        self.age = ContactClassifierFactory(
+            kind='age',
+            value_type=ContactClassifier.TYPES.INT
+        )
+        phone_label = ContactClassifierLabelFactory(classifier=self.phone)
+        age_label = ContactClassifierLabelFactory(classifier=self.age)
+
+        self.contacts = [
+            Contact.objects.create(user=user, kind=phone_label, value=value)
+            for value in ['+380501234567', '0501234567', '+380']
+        ] + [
+            Contact.objects.create(user=user, kind=age_label, value=value)
+            for value in ['30', 'abc']
+        ]
+
+        # classifiers were changed after values were saved
+        self.phone.value_validator = r'^\+\d{12}$'
+        self.phone.save()
+
+    def get_invalid_values(self, revalidator):
+        return sorted(
+            invalid_value
+            for invalid_values in revalidator.run(processes=1)
+            for invalid_value in invalid_values
+        )
+
+    def test_run(self):
+        revalidator = Revalidator(Contact, chunk_size=2)
+
+        self.assertEqual(
+            self.get_invalid_values(revalidator),
+            [
+                InvalidValue(
+                    self.contacts[1].pk,
+                    'phone',
+                    '0501234567',
+                    'wrong_value_format'
+                ),
+                InvalidValue(
+                    self.contacts[2].pk,
+                    'phone',
+                    '+380',
+                    'wrong_value_format'
+                ),
+                InvalidValue(self.contacts[4].pk, 'age', 'abc', 'wrong_type'),
+            ]
+        )
+
+    def test_kinds(self):
+        revalidator = Revalidator(Contact, kinds=['age'])
+
+        self.assertEqual(
+            [invalid_value.pk for invalid_value in self.get_invalid_values(
+                revalidator
+            )],
+            [self.contacts[4].pk]
+        )
+
+    def test_ranges(self):
+        start = self.contacts[0].pk
+        self.assertEqual(
+            Revalidator(Contact, chunk_size=2).get_ranges(),
+            [(start, start + 2), (start + 2, start + 4), (start + 4, start + 5)]
+        )
+
+    def test_no_values(self):
+        self.assertEqual(Revalidator(Contact, kinds=['email']).get_ranges(), [])
+
+    def test_pool(self):
+        InProcessPool.tasks = []
+        revalidator = AgeRevalidator(Contact, chunk_size=1)
+
+        self.assertEqual(
+            [
+                invalid_value.pk
+                for invalid_values in revalidator.run(processes=2)
+                for invalid_value in invalid_values
+            ],
+            [self.contacts[4].pk]
+        )
+        self.assertEqual(len(InProcessPool.tasks), 2)
+        self.assertEqual(
+            set(task[:5] for task in InProcessPool.tasks),
+            set([(
+                'testapp.tests.tests_revalidation.AgeRevalidator',
+                'testapp',
+                'contact',
+                None,
+                1,
+            )])
+        )
+
+    def test_worker(self):
+        start = self.contacts[0].pk
+        invalid_values = validate_range((
+            'classifier.revalidation.Revalidator',
+            'testapp',
+            'contact',
+            ['age'],
+            10000,
+            start,
+            start + 5,
+        ))
+
+        self.assertEqual(
+            [invalid_value.pk for invalid_value in invalid_values],
+            [self.contacts[4].pk]
+        )
+
+
+class StaleRevalidationTest(TestCase):
+
+    def setUp(self):
+        self.classifier = PropertyClassifierFactory(
+            kind='ram',
+            value_type=PropertyClassifier.TYPES.STRING
+        )
+        label = PropertyClassifierLabelFactory(kind=self.classifier)
+        self.properties = [
+            ComputerPropertyFactory(kind=label, value=value)
+            for value in ['4', '8', '16 GB']
+        ]
+        self.revalidator = Revalidator(ComputerProperty)
+
+    def test_nothing_stale(self):
+        self.assertEqual(list(self.revalidator.run_stale()), [])
+
+    def test_stale(self):
+        self.classifier.value_type = PropertyClassifier.TYPES.INT
+        self.classifier.save()
+
+        batches = list(self.revalidator.run_stale(batch_size=2))
+
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(
+            [invalid_value.pk for batch in batches for invalid_value in batch],
+            [self.properties[2].pk]
+        )
+        self.assertEqual(
+            set(ComputerProperty.objects.values_list(
+                'validated_version',
+                flat=True
+            )),
+            {2}
+        )
+        self.assertEqual(list(self.revalidator.run_stale()), [])
+
+    def test_invalid_on_save(self):
+        self.classifier.value_type = PropertyClassifier.TYPES.INT
+        self.classifier.save()
+        list(self.revalidator.run_stale())
+
+        obj = ComputerPropertyFactory(kind=self.properties[0].kind, value='a')
+
+        self.assertEqual(
+            [
+                invalid_value.pk
+                for invalid_values in self.revalidator.run_stale()
+                for invalid_value in invalid_values
+            ],
+            [obj.pk]
+        )
+        self.assertEqual(list(self.revalidator.run_stale()), [])
+
+    def test_stale_typed_values(self):
+        self.classifier.value_type = PropertyClassifier.TYPES.INT
+        self.classifier.save()
+        computers = Computer.objects.classified('properties', ram__gte=8)
+        self.assertFalse(computers.exists())
+
+        list(self.revalidator.run_stale())
+
+        self.assertEqual(
+            list(
+                ComputerProperty.objects
+                .order_by('pk')
+                .values_list('value_int', 'value_canonical')
+            ),
+            [(4, '4'), (8, '8'), (None, '16 GB')]
+        )
+        self.assertEqual(
+            list(computers.all()),
+            [self.properties[1].computer]
+        )
+
+    def test_stale_canonical_values(self):
+        self.classifier.value_normalizer = 'casefold'
+        self.classifier.save()
+
+        list(self.revalidator.run_stale())
+
+        self.assertEqual(
+            list(ComputerProperty.objects.filter_canonical('ram', '16 gb')),
+            [self.properties[2]]
+        )
+
+    def test_max_batches(self):
+        self.classifier.value_validator = r'^\d+$'
+        self.classifier.save()
+
+        self.assertEqual(
+            len(list(self.revalidator.run_stale(batch_size=1, max_batches=2))),
+            2
+        )
+        self.assertEqual(
+            ComputerProperty.objects.filter(validated_version=1).count(),
+            1
+        )
+
+    def test_stale_queries(self):
+        self.classifier.value_validator = r'^\d+$'
+        self.classifier.save()
+
+        # schema, select and update in savepoint for batch, then select of
+        # empty batch in savepoint
+        with self.assertNumQueries(1 + 4 + 3):
+            list(self.revalidator.run_stale(batch_size=3))
+
+
+class RevalidateCommandTest(TestCase):
+
+    def setUp(self):
+        user = UserFactory()
+        label = ContactClassifierLabelFactory(classifier=ContactClassifierFactory(
+            kind='age',
+            value_type=ContactClassifier.TYPES.INT
+        ))
+        self.valid = Contact.objects.create(user=user, kind=label, value='30')
+        self.invalid = Contact.objects.create(user=user, kind=label, value='a')
+
+    def call_command(self, *args, **kwargs):
+        stdout = StringIO()
+        call_command(
+            'classifier_revalidate',
+            'testapp.Contact',
+            processes=1,
+            stdout=stdout,
+            stderr=StringIO(),
+            *args,
+            **kwargs
+        )
+
+        return stdout.getvalue().splitlines()
+
+    def test_report(self):
+        self.assertEqual(
+            self.call_command(),
+            [
+                'pk,kind,value,error',
+                '{},age,a,wrong_type'.format(self.invalid.pk),
+            ]
+        )
+        self.assertEqual(Contact.objects.count(), 2)
+
+    def test_delete(self):
+        self.call_command(action='delete')
+        self.assertEqual(list(Contact.objects.all()), [self.valid])
+
+    def test_flag_field_required(self):
+        self.assertRaises(CommandError, self.call_command, action='flag')
+        self.assertRaises(
+            CommandError,
+            self.call_command,
+            action='flag',
+            flag_field='invalid'
+        )